@@ -0,0 +1 @@
+"""Benchmarks for DGAP. Run from the repository root, e.g. `python -m benchmarks.ledger_writes`."""
@@ -0,0 +1,73 @@
+"""Checksum backend benchmark: MB/sec of each `compute_checksum` backend and read size.
+
+Hashes the same synthetic files (or every .parquet under `--raw-root`) with every
+backend available here, timing each through the `(digest, bytes_hashed, duration_ms)`
+result, and checks that all backends agree on every digest. With `--cold` the files'
+pages are dropped from the page cache (posix_fadvise DONTNEED) before each pass.
+
+    python -m benchmarks.hash_backends --files 8 --file-size-mb 64 --chunk-kb 256,1024,4096
+"""
+import argparse
+import os
+import tempfile
+from pathlib import Path
+from typing import List
+
+from benchmarks import synthetic
+from dgap.idempotency import available_hash_backends, compute_checksum
+
+
+def _drop_cache(files: List[Path]) -> None:
+    for p in files:
+        fd = os.open(p, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def bench(files: List[Path], backend: str, chunk_size: int, cold: bool) -> tuple:
+    if cold:
+        _drop_cache(files)
+    else:
+        for p in files:  # warm-up pass, so every backend starts from a populated cache
+            compute_checksum(p, backend="readinto")
+    digests, nbytes, ms = [], 0, 0
+    for p in files:
+        digest, bytes_hashed, duration_ms = compute_checksum(p, backend=backend, chunk_size=chunk_size)
+        digests.append(digest)
+        nbytes += bytes_hashed
+        ms += duration_ms
+    return digests, nbytes, ms
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark compute_checksum backends")
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--file-size-mb", type=float, default=64)
+    parser.add_argument("--chunk-kb", default="1024", help="Comma-separated read sizes in KiB (default: 1024)")
+    parser.add_argument("--raw-root", help="Hash the .parquet files under this directory instead of synthetic ones")
+    parser.add_argument("--cold", action="store_true", help="Drop the files from the page cache before each pass (Linux)")
+    args = parser.parse_args()
+    if args.cold and not hasattr(os, "posix_fadvise"):
+        parser.error("--cold needs posix_fadvise")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.raw_root:
+            files = sorted(Path(args.raw_root).rglob("*.parquet"))
+        else:
+            files = synthetic.make_raw_root(Path(tmp), ["bench"], args.files, int(args.file_size_mb * 1024 * 1024))
+        reference = None
+        print(f"files: {len(files)}  ({'cold' if args.cold else 'warm'} page cache)")
+        for chunk_kb in (int(c) for c in args.chunk_kb.split(",")):
+            for backend in available_hash_backends():
+                digests, nbytes, ms = bench(files, backend, chunk_kb * 1024, args.cold)
+                reference = reference or digests
+                if digests != reference:
+                    raise SystemExit(f"{backend} produced different digests")
+                label = f"{backend} ({chunk_kb} KiB)" if backend != "file_digest" else f"{backend} (own size)"
+                print(f"{label:<24}: {ms / 1000:8.2f}s  {nbytes / max(ms, 1) / 1000:8.1f} MB/sec")
+
+
+if __name__ == "__main__":
+    main()
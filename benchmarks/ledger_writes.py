@@ -0,0 +1,67 @@
+"""Ledger write benchmark: per-row commits vs. batched transactions.
+
+Compares the original ingest path (one `get_registry_entry` SELECT and one committed
+`insert_file_registry` per file) with the batched path (`load_registry_index` once,
+then `RegistryWriter` executemany batches), on a fresh ledger in a temp directory.
+
+    python -m benchmarks.ledger_writes --rows 100000 --batch-size 500
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from dgap.metadata import RegistryWriter, get_registry_entry, init_db, insert_file_registry, insert_run_start, load_registry_index
+
+
+def _rows(n: int, run_id: str):
+    for i in range(n):
+        raw_path = f"source=tlc/dataset=bench/year={2000 + i // 12000:04d}/month={i // 1000 % 12 + 1:02d}/bench_{i:07d}.parquet"
+        yield (raw_path, Path(raw_path).name, f"{i:064x}", 1024, 1024, 0, None, "2026-01-01T00:00:00+00:00", run_id, i, i, 1)
+
+
+def bench_per_row(db_path: Path, n: int) -> float:
+    conn = init_db(db_path)
+    insert_run_start(conn, "bench", "2026-01-01T00:00:00+00:00")
+    start = time.perf_counter()
+    for row in _rows(n, "bench"):
+        if get_registry_entry(conn, row[0]) is None:
+            insert_file_registry(conn, *row)
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed
+
+
+def bench_batched(db_path: Path, n: int, batch_size: int) -> float:
+    conn = init_db(db_path)
+    insert_run_start(conn, "bench", "2026-01-01T00:00:00+00:00")
+    start = time.perf_counter()
+    registry = load_registry_index(conn)
+    writer = RegistryWriter(conn, batch_size)
+    for row in _rows(n, "bench"):
+        if registry.get(row[0]) is None:
+            writer.insert(*row)
+    writer.flush()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark file_registry write paths")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        before = bench_per_row(Path(tmp) / "per_row.db", args.rows)
+        after = bench_batched(Path(tmp) / "batched.db", args.rows, args.batch_size)
+
+    print(f"rows: {args.rows}")
+    print(f"per-row commit : {before:8.2f}s  {args.rows / before:10.0f} rows/sec")
+    print(f"batched ({args.batch_size:>5}): {after:8.2f}s  {args.rows / after:10.0f} rows/sec")
+    print(f"speedup        : {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""Throughput benchmark suite for fetch, sync, discovery, hashing and ledger writes.
+
+Generates synthetic data, serves it from a local stand-in for the TLC CDN, runs each
+phase in a fresh child process (so peak RSS is per phase) and writes one JSON document
+that can be diffed across commits.
+
+    python -m benchmarks.suite --datasets 2 --months 24 --file-size-mb 8 \
+        --concurrency 4 --workers 4 --output bench.json
+
+Each phase reports files/sec, MB/sec, p50/p99 latency and peak RSS:
+- fetch: `fetch_range` from the local server; latency is per downloaded file.
+- refresh: `fetch_range(refresh=True)` over the fetched months, all unchanged upstream,
+  so every month should come back as a 304; latency is per re-validated month. Runs
+  only together with fetch.
+- sync: `Ingestor.sync` (fused fetch → register) from the local server into a separate
+  raw root and ledger; latency is per downloaded file. Compare its seconds with
+  fetch + hashing to see how much of the two passes overlaps.
+- discovery: `discover_raw_files` over the raw root; latency is per full walk.
+- hashing: `compute_checksum` over every file on `--workers` threads with
+  `--hash-backend`/`--hash-chunk-kb`; latency per file. `benchmarks.hash_backends`
+  compares all backends side by side.
+- ledger: `RegistryWriter` inserting `--ledger-rows` synthetic rows; latency per batch.
+Files were just written, so hashing and discovery usually run from the page cache.
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks import synthetic
+
+PHASES = ["fetch", "refresh", "sync", "discovery", "hashing", "ledger"]
+
+
+def _peak_rss_kb() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return round(ordered[rank], 3)
+
+
+def _result(files: int, nbytes: int, seconds: float, latencies_ms: List[float]) -> Dict:
+    return {
+        "files": files,
+        "bytes": nbytes,
+        "seconds": round(seconds, 4),
+        "files_per_sec": round(files / seconds, 2) if seconds else None,
+        "mb_per_sec": round(nbytes / seconds / 1e6, 2) if seconds else None,
+        "latency_ms": {"p50": _percentile(latencies_ms, 50), "p99": _percentile(latencies_ms, 99)},
+        "peak_rss_kb": _peak_rss_kb(),
+    }
+
+
+def phase_fetch(source_root: str, raw_root: str, datasets: List[str], months: int, concurrency: int) -> Dict:
+    from dgap.events import EventSink
+    from dgap.fetch_raw import fetch_range
+
+    server, base_url = synthetic.serve(Path(source_root))
+    url_template = base_url + synthetic.URL_PATH
+    end_year, end_month = list(synthetic.months(months))[-1]
+    out = io.StringIO()
+    start = time.perf_counter()
+    try:
+        with EventSink(stream=out) as events:
+            for dataset in datasets:
+                fetch_range(Path(raw_root), dataset, 2015, 1, end_year, end_month, concurrency=concurrency, url_template=url_template, events=events)
+    finally:
+        seconds = time.perf_counter() - start
+        server.shutdown()
+    records = [json.loads(line) for line in out.getvalue().splitlines() if line.startswith("{")]
+    ok = [r for r in records if r.get("status") == "success"]
+    return _result(len(ok), sum(r["bytes"] for r in ok), seconds, [float(r["duration_ms"]) for r in ok])
+
+
+def phase_refresh(source_root: str, raw_root: str, datasets: List[str], months: int, concurrency: int) -> Dict:
+    from dgap.events import EventSink
+    from dgap.fetch_raw import fetch_range
+
+    server, base_url = synthetic.serve(Path(source_root))
+    url_template = base_url + synthetic.URL_PATH
+    end_year, end_month = list(synthetic.months(months))[-1]
+    out = io.StringIO()
+    start = time.perf_counter()
+    try:
+        with EventSink(stream=out) as events:
+            for dataset in datasets:
+                fetch_range(Path(raw_root), dataset, 2015, 1, end_year, end_month, concurrency=concurrency, url_template=url_template, events=events, refresh=True)
+    finally:
+        seconds = time.perf_counter() - start
+        server.shutdown()
+    records = [json.loads(line) for line in out.getvalue().splitlines() if line.startswith("{")]
+    unchanged = [r for r in records if r.get("reason") == "not_modified"]
+    result = _result(len(unchanged), 0, seconds, [float(r["duration_ms"]) for r in unchanged])
+    result["downloaded"] = sum(1 for r in records if r.get("status") == "success")
+    return result
+
+
+def phase_sync(source_root: str, raw_root: str, db_path: str, datasets: List[str], months: int, concurrency: int, workers: int) -> Dict:
+    from dgap.api import Fetcher, Ingestor
+
+    server, base_url = synthetic.serve(Path(source_root))
+    end = list(synthetic.months(months))[-1]
+    files = []
+    start = time.perf_counter()
+    try:
+        with Fetcher(Path(raw_root), url_template=base_url + synthetic.URL_PATH, concurrency=concurrency) as fetcher, Ingestor(
+            Path(raw_root), Path(db_path), workers=workers, batch_size=1
+        ) as ingestor:
+            for dataset in datasets:
+                result = ingestor.sync(fetcher, dataset, (2015, 1), end)
+                files += [m for m in result.fetch.months if m.status == "success"]
+    finally:
+        seconds = time.perf_counter() - start
+        server.shutdown()
+    return _result(len(files), sum(m.bytes for m in files), seconds, [float(m.duration_ms) for m in files])
+
+
+def phase_discovery(raw_root: str, repeat: int) -> Dict:
+    from dgap.ingest_raw import discover_raw_files
+
+    latencies = []
+    files: List[Path] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        files = discover_raw_files(Path(raw_root))
+        latencies.append((time.perf_counter() - start) * 1000)
+    seconds = sum(latencies) / 1000 / repeat
+    return _result(len(files), 0, seconds, latencies)
+
+
+def phase_hashing(raw_root: str, workers: int, backend: str, chunk_size: Optional[int]) -> Dict:
+    from dgap.idempotency import compute_checksum, configure_hashing, map_ordered
+    from dgap.ingest_raw import discover_raw_files
+
+    configure_hashing(backend, chunk_size)
+    files = discover_raw_files(Path(raw_root))
+    start = time.perf_counter()
+    results = list(map_ordered(compute_checksum, files, workers))
+    seconds = time.perf_counter() - start
+    result = _result(len(results), sum(r[1] for r in results), seconds, [float(r[2]) for r in results])
+    result["backend"] = backend
+    return result
+
+
+def phase_ledger(db_path: str, rows: int, batch_size: int) -> Dict:
+    from dgap.metadata import RegistryWriter, init_db, insert_run_start
+
+    conn = init_db(Path(db_path))
+    insert_run_start(conn, "bench", "2026-01-01T00:00:00+00:00")
+    writer = RegistryWriter(conn, batch_size)
+    latencies = []
+    start = time.perf_counter()
+    batch_start = start
+    for i in range(rows):
+        raw_path = f"source=tlc/dataset=bench/year={2000 + i // 12000:04d}/month={i // 1000 % 12 + 1:02d}/bench_{i:08d}.parquet"
+        writer.insert(raw_path, raw_path.rsplit("/", 1)[1], f"{i:064x}", 1024, 1024, 0, None, "2026-01-01T00:00:00+00:00", "bench", i, i, 1)
+        if writer.pending == 0:
+            now = time.perf_counter()
+            latencies.append((now - batch_start) * 1000)
+            batch_start = now
+    writer.flush()
+    seconds = time.perf_counter() - start
+    conn.close()
+    return _result(rows, 0, seconds, latencies)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run(args: argparse.Namespace) -> Dict:
+    datasets = [f"bench{i}_tripdata" for i in range(args.datasets)]
+    file_size = int(args.file_size_mb * 1024 * 1024)
+    phases = [p for p in args.phases.split(",") if p]
+    results: Dict[str, Dict] = {}
+
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory(dir=args.workdir) as tmp:
+        work = Path(tmp)
+        raw_root = work / "raw"
+
+        def in_child(fn, *fn_args):
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                return pool.submit(fn, *fn_args).result()
+
+        if "fetch" in phases or "sync" in phases:
+            synthetic.make_source_tree(work / "cdn", datasets, args.months, file_size)
+        if "sync" in phases:
+            results["sync"] = in_child(
+                phase_sync, str(work / "cdn"), str(work / "sync_raw"), str(work / "sync.db"), datasets, args.months, args.concurrency, args.workers,
+            )
+        if "fetch" in phases:
+            results["fetch"] = in_child(phase_fetch, str(work / "cdn"), str(raw_root), datasets, args.months, args.concurrency)
+            if "refresh" in phases:
+                results["refresh"] = in_child(phase_refresh, str(work / "cdn"), str(raw_root), datasets, args.months, args.concurrency)
+        else:
+            synthetic.make_raw_root(raw_root, datasets, args.months, file_size)
+        if "discovery" in phases:
+            results["discovery"] = in_child(phase_discovery, str(raw_root), args.repeat)
+        if "hashing" in phases:
+            chunk_size = args.hash_chunk_kb * 1024 if args.hash_chunk_kb else None
+            results["hashing"] = in_child(phase_hashing, str(raw_root), args.workers, args.hash_backend, chunk_size)
+        if "ledger" in phases:
+            results["ledger"] = in_child(phase_ledger, str(work / "ledger.db"), args.ledger_rows, args.batch_size)
+
+    return {
+        "timestamp_utc": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": {k: v for k, v in vars(args).items() if k != "output"},
+        "phases": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="DGAP throughput benchmarks on synthetic data")
+    parser.add_argument("--datasets", type=int, default=2, help="Synthetic datasets (default: 2)")
+    parser.add_argument("--months", type=int, default=12, help="Monthly files per dataset (default: 12)")
+    parser.add_argument("--file-size-mb", type=float, default=4, help="Size of each file in MiB (default: 4)")
+    parser.add_argument("--concurrency", type=int, default=4, help="fetch --concurrency (default: 4)")
+    parser.add_argument("--workers", type=int, default=4, help="Hashing threads (default: 4)")
+    parser.add_argument("--hash-backend", default="auto", help="compute_checksum backend for the hashing phase (default: auto)")
+    parser.add_argument("--hash-chunk-kb", type=int, help="Read size for the hashing phase in KiB (default: 1024)")
+    parser.add_argument("--repeat", type=int, default=5, help="Discovery walks to time (default: 5)")
+    parser.add_argument("--ledger-rows", type=int, default=50000, help="Rows for the ledger phase (default: 50000)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Ledger batch size (default: 500)")
+    parser.add_argument("--phases", default=",".join(PHASES), help=f"Comma-separated subset of {','.join(PHASES)}")
+    parser.add_argument("--workdir", help="Directory for temporary data (default: system temp)")
+    parser.add_argument("--output", help="Write the JSON report here (default: stdout only)")
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
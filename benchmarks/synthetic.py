@@ -0,0 +1,130 @@
+"""Synthetic raw data and a local stand-in for the TLC CDN, for benchmarks.
+
+`make_source_tree` writes random payloads named like TLC objects; `make_raw_root`
+lays the same kind of files out in the canonical raw layout; `serve` exposes a source
+tree over HTTP/1.1 with keep-alive, ETag/Last-Modified and single-range support, so
+`fetch_range(..., url_template=base_url + URL_PATH)` runs against it unchanged.
+"""
+import email.utils
+import hashlib
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+URL_PATH = "/trip-data/{dataset}_{year}-{month:02d}.parquet"
+
+
+def months(count: int, start_year: int = 2015, start_month: int = 1) -> Iterator[Tuple[int, int]]:
+    year, month = start_year, start_month
+    for _ in range(count):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def _write_random(path: Path, size: int) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as fh:
+        remaining = size
+        while remaining > 0:
+            n = min(remaining, 1024 * 1024)
+            fh.write(os.urandom(n))
+            remaining -= n
+
+
+def make_source_tree(root: Path, datasets: List[str], month_count: int, file_size: int) -> List[Path]:
+    """Write `<root>/trip-data/<dataset>_<YYYY-MM>.parquet` objects to serve."""
+    files = []
+    for dataset in datasets:
+        for year, month in months(month_count):
+            path = root / URL_PATH.lstrip("/").format(dataset=dataset, year=year, month=month)
+            _write_random(path, file_size)
+            files.append(path)
+    return files
+
+
+def make_raw_root(raw_root: Path, datasets: List[str], month_count: int, file_size: int) -> List[Path]:
+    """Write files directly into the canonical `source=tlc/dataset=/year=/month=` layout."""
+    files = []
+    for dataset in datasets:
+        for year, month in months(month_count):
+            path = raw_root / "source=tlc" / f"dataset={dataset}" / f"year={year:04d}" / f"month={month:02d}" / f"{dataset}_{year}-{month:02d}.parquet"
+            _write_random(path, file_size)
+            files.append(path)
+    return files
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    root: Path = Path(".")
+
+    def log_message(self, format, *args):  # noqa: A002 - signature fixed by BaseHTTPRequestHandler
+        pass
+
+    def _empty(self, status: int, headers: dict) -> None:
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_GET(self, head: bool = False):
+        path = (self.root / self.path.split("?", 1)[0].lstrip("/")).resolve()
+        if self.root not in path.parents or not path.is_file():
+            self._empty(404, {})
+            return
+        st = path.stat()
+        etag = '"%s"' % hashlib.md5(f"{st.st_size}-{st.st_mtime_ns}".encode()).hexdigest()
+        last_modified = email.utils.formatdate(st.st_mtime, usegmt=True)
+        validators = {"ETag": etag, "Last-Modified": last_modified}
+        if self.headers.get("If-None-Match") == etag or (
+            self.headers.get("If-None-Match") is None and self.headers.get("If-Modified-Since") == last_modified
+        ):
+            self._empty(304, validators)
+            return
+
+        start, end, status = 0, st.st_size, 200
+        match = re.match(r"bytes=(\d+)-$", self.headers.get("Range", ""))
+        if match and self.headers.get("If-Range") in (None, etag, last_modified):
+            start = int(match.group(1))
+            if start >= st.st_size:
+                self._empty(416, {"Content-Range": f"bytes */{st.st_size}"})
+                return
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Length", str(end - start))
+        self.send_header("Accept-Ranges", "bytes")
+        for k, v in validators.items():
+            self.send_header(k, v)
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{st.st_size}")
+        self.end_headers()
+        if head:
+            return
+        with path.open("rb") as fh:
+            fh.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                buf = fh.read(min(remaining, 256 * 1024))
+                if not buf:
+                    break
+                self.wfile.write(buf)
+                remaining -= len(buf)
+
+
+def serve(root: Path) -> Tuple[ThreadingHTTPServer, str]:
+    """Serve `root` on an ephemeral localhost port in a daemon thread.
+
+    Returns (server, base_url); call `server.shutdown()` when done.
+    """
+    handler = type("SyntheticCDNHandler", (_Handler,), {"root": root.resolve()})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="synthetic-cdn", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
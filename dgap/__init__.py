@@ -2,4 +2,4 @@
 This package implements Sprint 1 prototype per the master prompt.
 """
 
-__all__ = ["main", "ingest_raw", "idempotency", "metadata"]
+__all__ = ["main", "ingest", "ingest_raw", "idempotency", "metadata", "api"]
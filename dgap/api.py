@@ -0,0 +1,325 @@
+"""In-process library API for fetch and ingest.
+
+`Ingestor` keeps one SQLite connection, the registry cache and the schema
+fingerprints warm across calls; `Fetcher` keeps one keep-alive HTTP session. Both
+return typed results built from the same structured events the CLI prints, so an
+orchestrator can run many partitions in one interpreter without parsing stdout. The
+`fetch`, `ingest` and `sync` CLI commands are thin wrappers over these classes.
+
+    with Ingestor(Path("data/raw"), Path("data/ledger.db"), workers=4) as ingestor:
+        for month in months:
+            result = ingestor.ingest(dataset="yellow_tripdata", start=month, end=month)
+            print(result.status, result.files_ingested)
+"""
+import os
+import socket
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from . import journal
+from .events import EventSink, RecordingSink
+from .fetch_raw import TLC_URL, HttpSession, fetch_range
+from .ingest import format_dedup_summary, generate_run_id, run_ingest
+from .ingest_raw import YearMonth, discover_raw_files, utc_now
+from .metadata import LeaseHeartbeat, get_journal_checkpoint, init_db, load_registry_index, load_schema_fingerprints
+from .metrics import RunMetrics
+
+
+class FileResult(NamedTuple):
+    """Outcome for one file: status is "ingested", "skipped" or "superseded"."""
+
+    raw_path: str
+    status: str
+    reason: Optional[str]
+    checksum_sha256: Optional[str]
+    bytes: Optional[int]
+    duration_ms: Optional[int]
+
+
+class IngestResult(NamedTuple):
+    run_id: str
+    status: str  # "success" or "failure"
+    files_detected: int
+    files_ingested: int
+    files_skipped: int
+    start_time: str
+    end_time: Optional[str]
+    files: List[FileResult]
+    schema_drift: List[str]
+    dedup: Optional[Dict[str, int]]
+    error: Optional[str]
+    traceback: Optional[str]
+    metrics: RunMetrics
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "success"
+
+
+class MonthResult(NamedTuple):
+    """One fetch attempt: status is "success", "skipped" or "error" (see fetch_guide)."""
+
+    dataset: str
+    year: int
+    month: int
+    status: str
+    reason: Optional[str]
+    bytes: Optional[int]
+    duration_ms: Optional[int]
+    target_path: str
+    source_uri: str
+    http_status: Optional[int]
+    error: Optional[str]
+
+
+class FetchResult(NamedTuple):
+    rc: int  # 0 all ok, 1 some month failed, 2 staging/rename failure
+    months: List[MonthResult]
+    metrics: RunMetrics
+
+    @property
+    def ok(self) -> bool:
+        return self.rc == 0
+
+
+class SyncResult(NamedTuple):
+    fetch: FetchResult
+    ingest: IngestResult
+
+    @property
+    def ok(self) -> bool:
+        return self.fetch.ok and self.ingest.ok
+
+
+def _month_results(records: List[dict]) -> List[MonthResult]:
+    return sorted(
+        (
+            MonthResult(
+                r["dataset"], r["year"], r["month"], r["status"], r.get("reason"), r.get("bytes"), r.get("duration_ms"),
+                r["target_path"], r["source_uri"], r.get("http_status"), r.get("error"),
+            )
+            for r in records
+            if r.get("action") == "fetch"
+        ),
+        key=lambda m: (m.year, m.month),
+    )
+
+
+class Ingestor:
+    """Register files in one ledger across many calls, reusing connection and caches.
+
+    The registry cache assumes this object is the ledger's only writer between calls;
+    with other writers use `lease_seconds` (partition claiming, which re-reads each
+    claimed partition) or call `refresh()`. Options mirror `dgap ingest`; `events`
+    additionally receives every event (default: none are printed).
+    """
+
+    def __init__(
+        self,
+        raw_root: Path,
+        db_path: Path,
+        workers: int = 1,
+        batch_size: int = 500,
+        full_verify: bool = False,
+        chunk_size: Optional[int] = None,
+        chunk_workers: int = 4,
+        index_footers: bool = True,
+        lease_seconds: Optional[float] = None,
+        events: Optional[EventSink] = None,
+    ):
+        self.raw_root = raw_root
+        self.db_path = db_path
+        self.workers = workers
+        self.batch_size = batch_size
+        self.full_verify = full_verify
+        self.chunk_size = chunk_size
+        self.chunk_workers = chunk_workers
+        self.index_footers = index_footers
+        self.lease_seconds = lease_seconds
+        self.events = events
+        self.conn = init_db(db_path)
+        self._registry: Optional[Dict[str, tuple]] = None
+        self._schemas: Optional[Dict[str, set]] = None
+
+    def refresh(self) -> None:
+        """Drop the registry cache; the next call reloads it from the ledger."""
+        self._registry = None
+        self._schemas = None
+
+    def ingest(
+        self,
+        files: Optional[Iterable[Path]] = None,
+        dataset: Optional[str] = None,
+        start: Optional[YearMonth] = None,
+        end: Optional[YearMonth] = None,
+        from_journal: bool = False,
+        dedup: bool = False,
+        metrics_textfile: Optional[Path] = None,
+    ) -> IngestResult:
+        """Run one ingestion over `files`, or over discovered partitions (`dataset`,
+        inclusive `start`/`end`), or over the fetch journal since its checkpoint."""
+        run_id = generate_run_id()
+        start_time = utc_now()
+        metrics = RunMetrics()
+        sink = RecordingSink(self.events)
+
+        checkpoint = None
+        with metrics.phase("discovery"):
+            if files is not None:
+                files = list(files)
+            elif from_journal:
+                key = journal.journal_path(self.raw_root.resolve()).as_posix()
+                files, offset = journal.files_since(self.raw_root, get_journal_checkpoint(self.conn, key))
+                checkpoint = (key, offset)
+            else:
+                files = discover_raw_files(self.raw_root, dataset, start, end)
+        self._warm(metrics)
+
+        leases = None
+        if self.lease_seconds:
+            leases = LeaseHeartbeat(self.db_path, f"{socket.gethostname()}:{os.getpid()}:{run_id}", self.lease_seconds)
+        try:
+            rc = run_ingest(
+                self.conn, files, self.raw_root, run_id, start_time, sink, metrics,
+                registry=self._registry, schemas=self._schemas, full_verify=self.full_verify, workers=self.workers,
+                batch_size=self.batch_size, chunk_size=self.chunk_size, chunk_workers=self.chunk_workers,
+                index_footers=self.index_footers, metrics_textfile=metrics_textfile, journal_checkpoint=checkpoint,
+                leases=leases, print_errors=False,
+            )
+        finally:
+            if leases is not None:
+                leases.close()
+        if rc != 0:
+            # The cache may hold rows of the rolled-back batch
+            self.refresh()
+
+        dedup_counts = None
+        if rc == 0 and dedup:
+            from .dedup import dedup_files
+
+            new = [r[0] for r in self.conn.execute("SELECT DISTINCT checksum_sha256 FROM file_registry WHERE first_ingestion_run_id = ?", (run_id,))]
+            dedup_counts = dedup_files(self.conn, self.raw_root, sink, checksums=new, batch_size=self.batch_size)
+            sink.emit({"action": "ingest", "run_id": run_id}, event="dedup", message=format_dedup_summary(dedup_counts), **dedup_counts)
+            self.refresh()  # fingerprints of linked files changed
+        sink.flush()
+        return self._result(run_id, start_time, sink.records, dedup_counts, metrics)
+
+    def sync(
+        self,
+        fetcher: "Fetcher",
+        dataset: str,
+        start: YearMonth,
+        end: Optional[YearMonth] = None,
+        refresh: bool = False,
+        queue_size: int = 4,
+        metrics_textfile: Optional[Path] = None,
+    ) -> SyncResult:
+        """Fetch `start`..`end` (default: just `start`) with `fetcher` and register each
+        file as it lands, as one ingestion run (see `dgap.sync`). Both must use the same raw_root."""
+        from .sync import sync_range
+
+        if self.lease_seconds:
+            raise ValueError("sync does not support partition claiming; run one sync per partition range instead")
+        run_id = generate_run_id()
+        start_time = utc_now()
+        metrics = RunMetrics()
+        sink = RecordingSink(self.events)
+        self._warm(metrics)
+        fetch_rc, ingest_rc = sync_range(
+            self.conn, self.raw_root, dataset, start, end or start, run_id, start_time, sink, metrics,
+            session=fetcher.session, concurrency=fetcher.concurrency, url_template=fetcher.url_template, refresh=refresh,
+            queue_size=queue_size, registry=self._registry, schemas=self._schemas, full_verify=self.full_verify,
+            workers=self.workers, batch_size=self.batch_size, chunk_size=self.chunk_size, chunk_workers=self.chunk_workers,
+            index_footers=self.index_footers, metrics_textfile=metrics_textfile, print_errors=False,
+        )
+        if ingest_rc != 0:
+            self.refresh()
+        sink.flush()
+        return SyncResult(
+            FetchResult(fetch_rc, _month_results(sink.records), metrics),
+            self._result(run_id, start_time, sink.records, None, metrics),
+        )
+
+    def _warm(self, metrics: RunMetrics) -> None:
+        if self._registry is None:
+            with metrics.phase("registry_load"):
+                self._registry = load_registry_index(self.conn)
+        if self._schemas is None:
+            self._schemas = load_schema_fingerprints(self.conn) if self.index_footers else {}
+
+    def _result(self, run_id: str, start_time: str, records: List[dict], dedup: Optional[Dict[str, int]], metrics: RunMetrics) -> IngestResult:
+        row = self.conn.execute(
+            "SELECT status, files_detected, files_ingested, files_skipped, end_time, error_message, error_traceback FROM ingestion_runs WHERE run_id = ?",
+            (run_id,),
+        ).fetchone()
+        files = [
+            FileResult(r["raw_path"], r["event"], r.get("reason"), r.get("checksum_sha256"), r.get("bytes"), r.get("duration_ms"))
+            for r in records
+            if r.get("action") == "ingest" and r.get("event") in ("ingested", "skipped", "superseded")
+        ]
+        drift = [r["raw_path"] for r in records if r.get("action") == "ingest" and r.get("event") == "schema_drift"]
+        return IngestResult(
+            run_id, row[0], row[1], row[2], row[3], start_time, row[4], files, drift, dedup, row[5], row[6], metrics,
+        )
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "Ingestor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class Fetcher:
+    """Download months into the canonical layout over one keep-alive HTTP session.
+
+    Options mirror `dgap fetch`; `events` additionally receives every record
+    (default: none are printed).
+    """
+
+    def __init__(
+        self,
+        raw_root: Path,
+        url_template: str = TLC_URL,
+        concurrency: int = 1,
+        timeout: float = 30,
+        events: Optional[EventSink] = None,
+    ):
+        self.raw_root = raw_root
+        self.url_template = url_template
+        self.concurrency = concurrency
+        self.events = events
+        self.session = HttpSession(timeout=timeout)
+
+    def fetch(self, dataset: str, start: YearMonth, end: Optional[YearMonth] = None, refresh: bool = False) -> FetchResult:
+        """Fetch the inclusive month range `start`..`end` (default: just `start`)."""
+        end = end or start
+        metrics = RunMetrics()
+        sink = RecordingSink(self.events)
+        rc = fetch_range(
+            self.raw_root, dataset, start[0], start[1], end[0], end[1], concurrency=self.concurrency,
+            url_template=self.url_template, metrics=metrics, events=sink, refresh=refresh, session=self.session,
+        )
+        sink.flush()
+        return FetchResult(rc, _month_results(sink.records), metrics)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "Fetcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def month_range(start: YearMonth, end: YearMonth) -> List[Tuple[int, int]]:
+    """Inclusive list of (year, month) pairs, e.g. to drive one call per partition."""
+    months = []
+    y, m = start
+    while (y, m) <= end:
+        months.append((y, m))
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return months
@@ -0,0 +1,204 @@
+"""Content-addressed dedup of registered files via hardlinks (`dgap dedup`, `ingest --dedup`).
+
+Files with the same `checksum_sha256` (found through `idx_checksum`) are replaced by
+hardlinks to one object in `<raw_root>/_cas/sha256/<ab>/<checksum>`. Each `raw_path`
+stays a regular file with its own registry row; the sharing is recorded in
+`file_aliases` and the rows' stat fingerprints are refreshed, so later ingests still
+skip them without hashing. Identical payloads then occupy disk and page cache once.
+"""
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .events import EventSink
+from .idempotency import compute_checksum, fingerprint_matches
+from .ingest_raw import utc_now
+from .metadata import REGISTRY_ENTRY_COLUMNS, RegistryWriter
+from .metrics import NULL_METRICS, RunMetrics
+
+CAS_DIR = "_cas"
+
+
+def cas_relpath(checksum: str) -> str:
+    """Location of the content-addressed object for `checksum`, relative to raw_root."""
+    return f"{CAS_DIR}/sha256/{checksum[:2]}/{checksum}"
+
+
+def _link_into_place(target: Path, dest: Path) -> None:
+    """Atomically make `dest` a hardlink to `target` (link to a temp name, then rename)."""
+    tmp = dest.with_name(f".{dest.name}.dedup-tmp")
+    try:
+        tmp.unlink()
+    except FileNotFoundError:
+        pass
+    os.link(target, tmp)
+    try:
+        os.replace(tmp, dest)
+    except BaseException:
+        tmp.unlink()
+        raise
+
+
+def _changed_since(path: Path, st: os.stat_result) -> bool:
+    """True if `path` is no longer the file `st` was taken from (replaced or rewritten)."""
+    try:
+        now = os.lstat(path)
+    except FileNotFoundError:
+        return True
+    return (now.st_ino, now.st_size, now.st_mtime_ns) != (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def duplicate_checksums(conn: sqlite3.Connection, checksums: Optional[Iterable[str]] = None) -> List[str]:
+    """Checksums registered under more than one raw_path (optionally only among `checksums`)."""
+    rows = conn.execute(
+        "SELECT checksum_sha256 FROM file_registry GROUP BY checksum_sha256 HAVING COUNT(*) > 1 ORDER BY checksum_sha256"
+    ).fetchall()
+    dups = [r[0] for r in rows]
+    if checksums is not None:
+        wanted = set(checksums)
+        dups = [c for c in dups if c in wanted]
+    return dups
+
+
+def dedup_files(
+    conn: sqlite3.Connection,
+    raw_root: Path,
+    events: EventSink,
+    checksums: Optional[Iterable[str]] = None,
+    full_verify: bool = False,
+    dry_run: bool = False,
+    batch_size: int = 500,
+    metrics: Optional[RunMetrics] = None,
+) -> Dict[str, int]:
+    """Hardlink every group of identically-checksummed registered files to one CAS object.
+
+    Only `checksums` are considered when given (e.g. those a run just registered).
+    A file is linked only while its stat fingerprint still matches its registry row;
+    `full_verify` re-hashes it instead. Right before a file is replaced it is stat-ed
+    again and left alone if it changed since that check. Files that changed (or predate
+    fingerprints), vanished or live on another filesystem are reported. Returns counts:
+    groups, linked, already_linked, skipped, bytes_reclaimed (bytes of replaced files
+    that had no other link).
+    """
+    metrics = metrics or NULL_METRICS
+    raw_root = raw_root.resolve()
+    base = {"action": "dedup"}
+    counts = {"groups": 0, "linked": 0, "already_linked": 0, "skipped": 0, "bytes_reclaimed": 0}
+    writer = RegistryWriter(conn, batch_size, metrics)
+
+    def skip(raw_path: str, reason: str) -> None:
+        counts["skipped"] += 1
+        events.emit(base, event="skipped", raw_path=raw_path, reason=reason, message=f"DEDUP SKIPPED ({reason}): {raw_path}")
+
+    def unchanged(path: Path, entry: tuple) -> Optional[os.stat_result]:
+        """The file's stat if it still holds the registered content, else None."""
+        try:
+            st = os.lstat(path)
+        except FileNotFoundError:
+            return None
+        if not path.is_file() or path.is_symlink():
+            return None
+        if full_verify:
+            with metrics.phase("hashing", nbytes=st.st_size, observe=True):
+                checksum, _, _ = compute_checksum(path)
+            return st if checksum == entry[1] else None
+        return st if fingerprint_matches(entry[2:], st) else None
+
+    for checksum in duplicate_checksums(conn, checksums):
+        entries = conn.execute(
+            f"SELECT {REGISTRY_ENTRY_COLUMNS} FROM file_registry WHERE checksum_sha256 = ? ORDER BY raw_path", (checksum,)
+        ).fetchall()
+        members: List[Tuple[tuple, Path, os.stat_result]] = []
+        for entry in entries:
+            path = raw_root / entry[0]
+            st = unchanged(path, entry)
+            if st is None:
+                skip(entry[0], "fingerprint" if path.exists() else "missing")
+                continue
+            members.append((entry, path, st))
+        if len(members) < 2:
+            continue
+        counts["groups"] += 1
+        cas_rel = cas_relpath(checksum)
+        cas = raw_root / cas_rel
+
+        try:
+            cas_st: Optional[os.stat_result] = cas.stat()
+        except FileNotFoundError:
+            cas_st = None
+        if cas_st is not None and cas_st.st_size != members[0][2].st_size:
+            # Never link to an object that cannot be this content
+            for entry, _, _ in members:
+                skip(entry[0], "cas_conflict")
+            continue
+        if cas_st is None and not dry_run:
+            if _changed_since(members[0][1], members[0][2]):
+                # The object would not hold this checksum's content; retry the group next run
+                for entry, _, _ in members:
+                    skip(entry[0], "changed")
+                continue
+            # The first intact member becomes the object; its own path keeps its inode
+            cas.parent.mkdir(parents=True, exist_ok=True)
+            _link_into_place(members[0][1], cas)
+            cas_st = cas.stat()
+
+        now = utc_now()
+        for entry, path, st in members:
+            raw_path = entry[0]
+            same_inode = cas_st is not None and (st.st_dev, st.st_ino) == (cas_st.st_dev, cas_st.st_ino)
+            if not same_inode and cas_st is not None and st.st_dev != cas_st.st_dev:
+                skip(raw_path, "cross_device")
+                continue
+            if dry_run:
+                if same_inode or (cas_st is None and path == members[0][1]):
+                    counts["already_linked"] += 1
+                else:
+                    counts["linked"] += 1
+                    counts["bytes_reclaimed"] += st.st_size if st.st_nlink == 1 else 0
+                    events.emit(base, event="would_link", raw_path=raw_path, cas_path=cas_rel, message=f"WOULD LINK: {raw_path} -> {cas_rel}")
+                continue
+            if same_inode:
+                counts["already_linked"] += 1
+            elif _changed_since(path, st):
+                # Written to since it was checked: replacing it would lose that write
+                skip(raw_path, "changed")
+                continue
+            else:
+                _link_into_place(cas, path)
+                counts["linked"] += 1
+                counts["bytes_reclaimed"] += st.st_size if st.st_nlink == 1 else 0
+                events.emit(base, event="linked", raw_path=raw_path, cas_path=cas_rel, bytes=st.st_size, message=f"LINKED: {raw_path} -> {cas_rel}")
+                st = path.stat()
+            if not fingerprint_matches(entry[2:], st):
+                writer.update_fingerprint(raw_path, st.st_mtime_ns, st.st_ino, st.st_dev)
+            writer.add_alias(raw_path, checksum, cas_rel, now)
+    writer.flush()
+    return counts
+
+
+def prune_cas(conn: sqlite3.Connection, raw_root: Path, events: EventSink, dry_run: bool = False) -> Tuple[int, int]:
+    """Delete CAS objects no raw path links to any more (link count 1).
+
+    Their `file_aliases` rows are dropped as well. Returns (objects, bytes) removed.
+    """
+    base = {"action": "dedup"}
+    removed = freed = 0
+    top = raw_root.resolve() / CAS_DIR
+    if not top.is_dir():
+        return 0, 0
+    for dirpath, _dirs, names in os.walk(top):
+        for name in names:
+            path = Path(dirpath) / name
+            st = path.stat()
+            if st.st_nlink != 1 or name.startswith("."):
+                continue
+            cas_rel = path.relative_to(raw_root.resolve()).as_posix()
+            if not dry_run:
+                with conn:
+                    conn.execute("DELETE FROM file_aliases WHERE cas_path = ?", (cas_rel,))
+                path.unlink()
+            removed += 1
+            freed += st.st_size
+            events.emit(base, event="pruned", cas_path=cas_rel, bytes=st.st_size, message=f"PRUNED: {cas_rel}")
+    return removed, freed
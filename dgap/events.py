@@ -0,0 +1,253 @@
+"""Buffered structured-event sink shared by fetch and ingest.
+
+Callers hand records to `EventSink.emit`, which only enqueues them on a bounded queue;
+a background thread serializes them and writes whole batches at a time to the console
+and, optionally, to size-rotated NDJSON files. `close` (also run at interpreter exit)
+drains everything still queued, so events are not lost on normal exit, on an
+unhandled exception or on SIGTERM once the CLI has turned it into SystemExit.
+"""
+import atexit
+import json
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Any, Dict, List, Optional
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_BACKUPS = 5
+
+_STOP = object()
+
+
+def _stamped(base: Dict[str, Any], fields: Dict[str, Any], ts: str) -> Dict[str, Any]:
+    """Merge a record with `ts` first; a `ts` in `base` or `fields` wins."""
+    record = {"ts": ts}
+    record.update(base)
+    record.update(fields)
+    return record
+
+
+def _utc_ts() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class RotatingNDJSONFile:
+    """Append NDJSON to `path`, rotating to path.1 .. path.N before it exceeds `max_bytes`."""
+
+    def __init__(self, path: Path, max_bytes: int = DEFAULT_MAX_BYTES, backups: int = DEFAULT_BACKUPS):
+        self.path = path
+        self.max_bytes = max(1, max_bytes)
+        self.backups = max(0, backups)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = self.path.open("ab")
+        self._size = self._fh.tell()
+
+    def _rotate(self) -> None:
+        self._fh.close()
+        if self.backups:
+            for i in range(self.backups - 1, 0, -1):
+                src = self.path.with_name(f"{self.path.name}.{i}")
+                if src.exists():
+                    src.replace(self.path.with_name(f"{self.path.name}.{i + 1}"))
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink(missing_ok=True)
+        self._fh = self.path.open("ab")
+        self._size = 0
+
+    def write_lines(self, lines: List[bytes]) -> None:
+        """Write complete lines; a file is rotated only between lines, never mid-record."""
+        chunk: List[bytes] = []
+        size = 0
+        for line in lines:
+            if self._size + size + len(line) > self.max_bytes and self._size + size > 0:
+                if chunk:
+                    self._fh.write(b"".join(chunk))
+                    chunk, size = [], 0
+                self._rotate()
+            chunk.append(line)
+            size += len(line)
+        if chunk:
+            self._fh.write(b"".join(chunk))
+            self._size += size
+        self._fh.flush()
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+class EventSink:
+    """Asynchronous event writer.
+
+    `emit(base, **fields)` enqueues a record; `base` is shared, never copied or mutated,
+    and `fields` are merged over it on the writer thread. Every record carries `ts`,
+    the UTC time it was emitted (not written). When the queue (`queue_size`
+    records) is full, emit blocks until the writer catches up, so memory stays bounded
+    and no event is dropped. `console` is "json" (one JSON line per event), "text"
+    (the record's `message`, if any) or None; `path` adds rotating NDJSON files that
+    always receive the full record.
+    """
+
+    def __init__(
+        self,
+        console: Optional[str] = "json",
+        stream: Optional[IO[str]] = None,
+        path: Optional[Path] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backups: int = DEFAULT_BACKUPS,
+        queue_size: int = 10000,
+        batch_size: int = 512,
+    ):
+        if console not in ("json", "text", None):
+            raise ValueError(f"console must be 'json', 'text' or None, not {console!r}")
+        self.console = console
+        self.stream = stream if stream is not None else sys.stdout
+        self.file = RotatingNDJSONFile(path, max_bytes, backups) if path is not None else None
+        self.batch_size = max(1, batch_size)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._write_error_reported = False
+        self._thread = threading.Thread(target=self._run, name="dgap-events", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def emit(self, base: Dict[str, Any], **fields: Any) -> None:
+        item = (base, fields, _utc_ts())
+        # Under the close lock, so an event is never queued after close() drained the queue
+        with self._close_lock:
+            if not self._closed:
+                self._queue.put(item)
+                return
+        # Late events (e.g. from atexit handlers after close) are written synchronously
+        self._write([item])
+
+    def flush(self) -> None:
+        """Block until every event emitted so far has been written."""
+        done = threading.Event()
+        with self._close_lock:
+            if self._closed:
+                return
+            self._queue.put(done)
+        done.wait()
+
+    def close(self) -> None:
+        """Drain the queue, stop the writer and close the NDJSON file. Idempotent."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._closed = True
+            # Anything emitted while the writer was stopping
+            leftovers = []
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, tuple):
+                    leftovers.append(item)
+                elif isinstance(item, threading.Event):
+                    item.set()
+            if leftovers:
+                self._write(leftovers)
+            if self.file is not None:
+                self.file.close()
+            atexit.unregister(self.close)
+
+    def __enter__(self) -> "EventSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            # Take whatever else is already queued, up to one batch
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [item for item in batch if isinstance(item, tuple)]
+            if records:
+                self._write(records)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if any(item is _STOP for item in batch):
+                return
+
+    def _write(self, records: List[tuple]) -> None:
+        try:
+            merged = [_stamped(base, fields, ts) for base, fields, ts in records]
+            if self.console == "json":
+                self.stream.write("".join(json.dumps(r, default=str) + "\n" for r in merged))
+                self.stream.flush()
+            elif self.console == "text":
+                text = "".join(f"{r['message']}\n" for r in merged if r.get("message") is not None)
+                if text:
+                    self.stream.write(text)
+                    self.stream.flush()
+            if self.file is not None:
+                self.file.write_lines([(json.dumps(r, default=str) + "\n").encode("utf-8") for r in merged])
+        except Exception as e:
+            # The writer must keep draining: a full disk or closed pipe must not hang emitters
+            if not self._write_error_reported:
+                self._write_error_reported = True
+                try:
+                    print(f"warning: event sink write failed: {e}", file=sys.stderr)
+                except Exception:
+                    pass
+
+
+class RecordingSink:
+    """Synchronous sink that keeps every merged record in `records` (for the library API).
+
+    Records are also passed on to `forward`, if given, so a caller can collect results
+    and still log them. Has the same emit/flush/close interface as `EventSink`.
+    """
+
+    def __init__(self, forward: Optional[EventSink] = None):
+        self.forward = forward
+        self.records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def emit(self, base: Dict[str, Any], **fields: Any) -> None:
+        ts = _utc_ts()
+        record = _stamped(base, fields, ts)
+        with self._lock:
+            self.records.append(record)
+        if self.forward is not None:
+            # The forwarded record carries the same `ts`
+            self.forward.emit(base, **dict({"ts": ts}, **fields))
+
+    def flush(self) -> None:
+        if self.forward is not None:
+            self.forward.flush()
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "RecordingSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+_default_sink: Optional[EventSink] = None
+_default_lock = threading.Lock()
+
+
+def default_sink() -> EventSink:
+    """Process-wide JSON-to-stdout sink, created on first use."""
+    global _default_sink
+    with _default_lock:
+        if _default_sink is None or _default_sink._closed:
+            _default_sink = EventSink()
+        return _default_sink
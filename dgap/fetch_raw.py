@@ -1,15 +1,28 @@
+import email.utils
+import hashlib
+import http.client
 import json
 import os
+import shutil
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Iterable, Tuple
-from urllib.request import urlopen, Request
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
 from urllib.error import HTTPError, URLError
 from datetime import datetime, timezone
 
+from . import journal
+from .events import EventSink, default_sink
+from .idempotency import compute_checksum
+from .ingest_raw import read_sidecar, sidecar_checksum
+from .metrics import NULL_METRICS, RunMetrics
+
 
 TLC_URL = "https://d37ci6vzurychx.cloudfront.net/trip-data/{dataset}_{year}-{month:02d}.parquet"
+SUPERSEDED_DIR = "_superseded"
 
 
 def utc_now() -> str:
@@ -24,9 +37,14 @@ def _inc_month(year: int, month: int) -> tuple:
     return year, month + 1
 
 
+def _final_path(raw_root: Path, dataset: str, year: int, month: int) -> Path:
+    """Canonical location of one month's file."""
+    return raw_root / f"source=tlc" / f"dataset={dataset}" / f"year={year:04d}" / f"month={month:02d}" / f"{dataset}_{year}-{month:02d}.parquet"
+
+
 def _make_targets(raw_root: Path, dataset: str, year: int, month: int) -> Tuple[Path, Path, Path]:
     """Return (final_path, staging_path, partial_path) for given dataset/year/month."""
-    final = raw_root / f"source=tlc" / f"dataset={dataset}" / f"year={year:04d}" / f"month={month:02d}" / f"{dataset}_{year}-{month:02d}.parquet"
+    final = _final_path(raw_root, dataset, year, month)
     staging_dir = raw_root / "_incoming" / "source=tlc" / f"dataset={dataset}" / f"year={year:04d}" / f"month={month:02d}"
     staging_dir.mkdir(parents=True, exist_ok=True)
     partial = staging_dir / f"{dataset}_{year}-{month:02d}.parquet.partial"
@@ -34,7 +52,25 @@ def _make_targets(raw_root: Path, dataset: str, year: int, month: int) -> Tuple[
     return final, staging, partial
 
 
-def _write_sidecar(final_path: Path, source_uri: str, dataset: str, year: int, month: int, bytes_count: int) -> None:
+def _write_sidecar(
+    final_path: Path,
+    source_uri: str,
+    dataset: str,
+    year: int,
+    month: int,
+    bytes_count: int,
+    sha256: Optional[str] = None,
+    validators: Optional[dict] = None,
+    stat_path: Optional[Path] = None,
+    extra: Optional[dict] = None,
+) -> None:
+    """Write `<file>.meta.json` atomically. When the download was hashed, record the digest
+    and the committed file's stat fingerprint so ingestion can trust it without re-reading.
+
+    `validators` (the response's etag/last_modified/total_bytes) are kept for
+    conditional re-fetches. `stat_path` is the file to fingerprint when it is not yet at
+    `final_path` (a rename keeps inode and mtime); `extra` adds fields.
+    """
     sidecar = final_path.with_name(final_path.name + ".meta.json")
     payload = {
         "source_uri": source_uri,
@@ -44,138 +80,617 @@ def _write_sidecar(final_path: Path, source_uri: str, dataset: str, year: int, m
         "fetched_at_utc": utc_now(),
         "bytes": bytes_count,
     }
-    with sidecar.open("w", encoding="utf-8") as fh:
+    if validators:
+        payload.update({
+            "etag": validators.get("etag"),
+            "last_modified": validators.get("last_modified"),
+            "content_length": validators.get("total_bytes"),
+        })
+    if sha256 is not None:
+        st = (stat_path or final_path).stat()
+        payload.update({"sha256": sha256, "mtime_ns": st.st_mtime_ns, "inode": st.st_ino, "device": st.st_dev})
+    if extra:
+        payload.update(extra)
+    tmp = sidecar.with_name(sidecar.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as fh:
         json.dump(payload, fh, ensure_ascii=False)
+    tmp.replace(sidecar)
+
+
+def _conditional_headers(sidecar: Optional[dict]) -> Dict[str, str]:
+    """If-None-Match/If-Modified-Since for re-fetching the version a sidecar describes.
 
+    Sidecars written before validators were recorded fall back to their fetch time.
+    """
+    sidecar = sidecar or {}
+    headers: Dict[str, str] = {}
+    if sidecar.get("etag"):
+        headers["If-None-Match"] = sidecar["etag"]
+    if sidecar.get("last_modified"):
+        headers["If-Modified-Since"] = sidecar["last_modified"]
+    elif not headers and isinstance(sidecar.get("fetched_at_utc"), str):
+        try:
+            fetched = datetime.fromisoformat(sidecar["fetched_at_utc"].replace("Z", "+00:00"))
+            headers["If-Modified-Since"] = email.utils.format_datetime(fetched.astimezone(timezone.utc), usegmt=True)
+        except ValueError:
+            pass
+    return headers
 
-def _log(record: dict) -> None:
-    # One-line JSON structured log
-    print(json.dumps(record, default=str), flush=True)
 
+def _current_checksum(final: Path, sidecar: Optional[dict]) -> str:
+    """sha256 of the committed file: from its sidecar while that still matches, else hashed."""
+    trusted = sidecar_checksum(sidecar, final.stat())
+    return trusted if trusted is not None else compute_checksum(final)[0]
 
-def fetch_range(raw_root: Path, dataset: str, start_year: int, start_month: int, end_year: int, end_month: int) -> int:
-    """Fetch inclusive range from start_year/start_month to end_year/end_month.
-    Returns 0 on success (no failures), non-zero if any failed downloads (network/server).
+
+def _archive_superseded(raw_root: Path, final: Path, checksum: str) -> Path:
+    """Keep the committed version (and its sidecar) under `_superseded/` before it is replaced.
+
+    Hardlinked where possible, so archiving costs no copy; returns the archive path.
     """
-    cur_year = start_year
-    cur_month = start_month
-    failures = 0
+    rel = final.relative_to(raw_root)
+    archive = raw_root / SUPERSEDED_DIR / rel.parent / f"{final.stem}.{checksum[:12]}{final.suffix}"
+    archive.parent.mkdir(parents=True, exist_ok=True)
+    pairs = [(final, archive)]
+    sidecar = final.with_name(final.name + ".meta.json")
+    if sidecar.exists():
+        pairs.append((sidecar, archive.with_name(archive.name + ".meta.json")))
+    for src, dst in pairs:
+        if dst.exists():
+            continue
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+    return archive
+
 
+def _iter_months(start_year: int, start_month: int, end_year: int, end_month: int) -> Iterator[Tuple[int, int]]:
+    """Yield (year, month) pairs for the inclusive range."""
+    cur_year, cur_month = start_year, start_month
     while (cur_year < end_year) or (cur_year == end_year and cur_month <= end_month):
-        final, staging, partial = _make_targets(raw_root, dataset, cur_year, cur_month)
-        source_uri = TLC_URL.format(dataset=dataset, year=cur_year, month=cur_month)
-        start_ts = time.time()
-        log_base = {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "level": "INFO",
-            "action": "fetch",
-            "dataset": dataset,
-            "year": cur_year,
-            "month": cur_month,
-            "source_uri": source_uri,
-            "target_path": str(final.as_posix()),
-            "raw_root": str(raw_root.as_posix()),
-            "bytes": None,
-            "duration_ms": None,
-            "status": None,
-            "reason": None,
-        }
+        yield cur_year, cur_month
+        cur_year, cur_month = _inc_month(cur_year, cur_month)
 
-        try:
-            # If final exists already, skip without downloading
-            if final.exists():
-                log = dict(log_base)
-                log.update({"status": "skipped", "reason": "already_exists", "duration_ms": 0})
-                _log(log)
-                cur_year, cur_month = _inc_month(cur_year, cur_month)
-                continue
 
-            # Stream download into partial file
-            req = Request(source_uri, headers={"User-Agent": "dgap-fetch/1.0"})
-            with urlopen(req, timeout=30) as resp:
-                # Handle HTTP errors via exceptions
-                with partial.open("wb") as outfh:
-                    total = 0
-                    while True:
-                        chunk = resp.read(64 * 1024)
-                        if not chunk:
-                            break
-                        outfh.write(chunk)
-                        total += len(chunk)
-
-            # Post-download checks
-            if not partial.exists():
-                log = dict(log_base)
-                log.update({"status": "error", "reason": "zero_bytes"})
-                _log(log)
-                failures += 1
-                cur_year, cur_month = _inc_month(cur_year, cur_month)
-                continue
+class HttpSession:
+    """Pool of persistent (keep-alive) HTTP connections shared by fetch workers.
 
-            size = partial.stat().st_size
-            if size == 0:
-                log = dict(log_base)
-                log.update({"status": "error", "reason": "zero_bytes", "bytes": 0})
-                _log(log)
-                failures += 1
-                cur_year, cur_month = _inc_month(cur_year, cur_month)
-                continue
+    A request checks an idle connection to its (scheme, host, port) out of the pool and
+    gets it back once the response is read to the end, so concurrent downloads never
+    share a socket, sequential requests to the CDN reuse the TLS session, and at most
+    as many connections are open as requests were ever in flight at once, however many
+    threads use the session. Errors are raised as urllib's HTTPError/URLError so callers
+    classify them exactly as they did with urlopen.
+    """
 
-            # Rename partial -> staging (remove .partial suffix)
-            try:
-                partial.replace(staging)
-            except Exception as e:
-                log = dict(log_base)
-                log.update({"status": "error", "reason": "rename_failed", "error": str(e)})
-                _log(log)
-                # leave partial for forensics
-                return 2
-
-            # Final atomic move: if final exists -> delete staging and mark skipped
+    MAX_REDIRECTS = 5
+
+    def __init__(self, timeout: float = 30, user_agent: str = "dgap-fetch/1.0"):
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self._idle: Dict[Tuple[str, str], List[http.client.HTTPConnection]] = {}
+        self._all: List[http.client.HTTPConnection] = []
+        self._all_lock = threading.Lock()
+
+    def _checkout(self, key: Tuple[str, str], fresh: bool = False) -> http.client.HTTPConnection:
+        scheme, netloc = key
+        if not fresh:
+            with self._all_lock:
+                idle = self._idle.get(key)
+                if idle:
+                    return idle.pop()
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(netloc, timeout=self.timeout)
+        elif scheme == "http":
+            conn = http.client.HTTPConnection(netloc, timeout=self.timeout)
+        else:
+            raise URLError(f"unsupported scheme: {scheme}")
+        with self._all_lock:
+            self._all.append(conn)
+        return conn
+
+    def _checkin(self, key: Tuple[str, str], conn: http.client.HTTPConnection) -> None:
+        with self._all_lock:
+            # Unless it was discarded or the session closed meanwhile
+            if any(c is conn for c in self._all):
+                self._idle.setdefault(key, []).append(conn)
+
+    def _discard(self, conn: http.client.HTTPConnection) -> None:
+        conn.close()
+        with self._all_lock:
+            self._all = [c for c in self._all if c is not conn]
+
+    def _send(self, method: str, url: str, headers: Dict[str, str]) -> Tuple[Tuple[str, str], http.client.HTTPConnection, http.client.HTTPResponse]:
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        all_headers = {"User-Agent": self.user_agent}
+        all_headers.update(headers)
+        # A pooled connection may have been closed by the server while idle; retry once on a fresh one
+        for attempt in (0, 1):
+            conn = self._checkout(key, fresh=attempt > 0)
             try:
-                if final.exists():
-                    # someone else created it
-                    staging.unlink(missing_ok=True)
-                    log = dict(log_base)
-                    log.update({"status": "skipped", "reason": "already_exists", "bytes": size})
-                    _log(log)
-                else:
-                    # ensure parent exists
-                    final.parent.mkdir(parents=True, exist_ok=True)
-                    staging.replace(final)
-                    # write sidecar
-                    _write_sidecar(final, source_uri, dataset, cur_year, cur_month, size)
-                    duration_ms = int((time.time() - start_ts) * 1000)
-                    log = dict(log_base)
-                    log.update({"status": "success", "bytes": size, "duration_ms": duration_ms})
-                    _log(log)
-            except Exception as e:
-                log = dict(log_base)
-                log.update({"status": "error", "reason": "rename_failed", "error": str(e)})
-                _log(log)
-                return 2
-
-        except HTTPError as he:
-            code = he.code
-            reason = "expected_absence" if code in (404, 403, 410) else "server_error"
-            log = dict(log_base)
-            log.update({"status": "skipped" if reason == "expected_absence" else "error", "reason": reason, "http_status": code})
-            _log(log)
-            if reason != "expected_absence":
-                failures += 1
-
-        except URLError as ue:
-            log = dict(log_base)
-            log.update({"status": "error", "reason": "network_error", "error": str(ue)})
-            _log(log)
-            failures += 1
+                conn.request(method, target, headers=all_headers)
+                return key, conn, conn.getresponse()
+            except (http.client.RemoteDisconnected, http.client.CannotSendRequest, http.client.ResponseNotReady, BrokenPipeError, ConnectionResetError) as e:
+                self._discard(conn)
+                if attempt:
+                    raise URLError(e)
+            except (OSError, http.client.HTTPException) as e:
+                self._discard(conn)
+                raise URLError(e)
+        raise URLError("unreachable")  # pragma: no cover
+
+    def request(self, url: str, headers: Optional[Dict[str, str]] = None, method: str = "GET") -> "PooledResponse":
+        """Issue a request, following redirects. Raises HTTPError for status >= 400."""
+        headers = headers or {}
+        for _ in range(self.MAX_REDIRECTS + 1):
+            key, conn, resp = self._send(method, url, headers)
+            if resp.status in (301, 302, 303, 307, 308) and resp.getheader("Location"):
+                resp.read()
+                self._checkin(key, conn)
+                url = urljoin(url, resp.getheader("Location"))
+                continue
+            if resp.status >= 400:
+                # Drain the (small) error body so the connection stays reusable
+                resp.read()
+                self._checkin(key, conn)
+                raise HTTPError(url, resp.status, resp.reason, resp.headers, None)
+            return PooledResponse(self, key, conn, resp)
+        raise URLError(f"too many redirects for {url}")
+
+    def close(self) -> None:
+        with self._all_lock:
+            conns, self._all, self._idle = self._all, [], {}
+        for conn in conns:
+            conn.close()
+
+
+class PooledResponse:
+    """Context manager around an HTTPResponse that returns its connection to the pool.
+
+    If the body was not read to the end (error mid-stream), the connection is closed
+    instead, so the next request does not start on a socket with unread bytes.
+    """
+
+    def __init__(self, session: HttpSession, key: Tuple[str, str], conn: http.client.HTTPConnection, resp: http.client.HTTPResponse):
+        self.session = session
+        self.key = key
+        self.conn = conn
+        self.resp = resp
+        self.status = resp.status
+        self.headers = resp.headers
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        return self.resp.read(amt)
+
+    def __enter__(self) -> "PooledResponse":
+        return self
+
+    def close(self) -> None:
+        """Abandon the response; its connection is closed rather than reused."""
+        self.resp.close()
+        self.session._discard(self.conn)
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None or not self.resp.isclosed():
+            self.close()
+        else:
+            self.session._checkin(self.key, self.conn)
+
+
+def _partial_state_path(partial: Path) -> Path:
+    """Validators of the object a `.partial` belongs to, kept next to it in staging."""
+    return partial.with_name(partial.name + ".json")
+
+
+def _read_partial_state(partial: Path) -> Optional[dict]:
+    try:
+        with _partial_state_path(partial).open("r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except Exception:
+        return None
+
+
+def _write_partial_state(partial: Path, source_uri: str, headers, total_bytes: Optional[int]) -> None:
+    payload = {
+        "source_uri": source_uri,
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+        "total_bytes": total_bytes,
+    }
+    with _partial_state_path(partial).open("w", encoding="utf-8") as fh:
+        json.dump(payload, fh)
+
+
+def _resume_validator(state: Optional[dict], source_uri: str) -> Optional[str]:
+    """Strong validator for If-Range, or None if the partial cannot be resumed safely."""
+    if not state or state.get("source_uri") != source_uri:
+        return None
+    etag = state.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    # If-Range does not accept weak ETags; fall back to the date validator
+    return state.get("last_modified")
+
 
+def _parse_content_range(value: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """Parse `bytes start-end/total` into (start, total); unknown parts are None."""
+    if not value or not value.startswith("bytes "):
+        return None, None
+    try:
+        span, total = value[6:].split("/", 1)
+        start = int(span.split("-", 1)[0])
+        return start, (None if total == "*" else int(total))
+    except ValueError:
+        return None, None
+
+
+def _same_object(state: dict, headers) -> bool:
+    """True when a 206 response is for the same object version the partial came from."""
+    etag = headers.get("ETag")
+    if state.get("etag") and etag:
+        return etag == state["etag"]
+    last_modified = headers.get("Last-Modified")
+    if state.get("last_modified") and last_modified:
+        return last_modified == state["last_modified"]
+    return False
+
+
+class IncompleteDownload(Exception):
+    """The connection ended before the announced number of bytes arrived."""
+
+
+def _download(
+    session: HttpSession, source_uri: str, partial: Path, conditional: Optional[Dict[str, str]] = None
+) -> Optional[Tuple[int, int, str]]:
+    """Stream `source_uri` into `partial`, resuming a leftover partial when safe.
+
+    A resume sends `Range` plus `If-Range` with the validator recorded when the partial
+    was started. The download restarts from byte 0 if the server ignores the range,
+    answers for a different offset, or the object changed (ETag/Last-Modified differ).
+    Returns (bytes_on_disk, resumed_from, sha256_hex) and raises IncompleteDownload when fewer
+    bytes arrived than the server announced, leaving the partial for the next run.
+    With `conditional` headers (and no partial to resume) a 304 returns None.
+    """
+    offset = 0
+    state = None
+    if partial.exists():
+        state = _read_partial_state(partial)
+        validator = _resume_validator(state, source_uri)
+        if validator:
+            offset = partial.stat().st_size
+
+    headers: Dict[str, str] = dict(conditional or {})
+    if offset > 0:
+        # A leftover partial is already a newer version than the committed file
+        headers = {"Range": f"bytes={offset}-", "If-Range": validator}
+
+    try:
+        resp = session.request(source_uri, headers)
+    except HTTPError as he:
+        if offset > 0 and he.code == 416:
+            # Range not satisfiable: the object shrank or changed; start over
+            offset, resp = 0, session.request(source_uri)
+        else:
+            raise
+
+    if resp.status == 304:
+        with resp:
+            resp.read()
+        return None
+    if offset > 0:
+        start, total_bytes = _parse_content_range(resp.headers.get("Content-Range"))
+        if resp.status == 206 and start == offset and _same_object(state, resp.headers):
+            return _stream(resp, source_uri, partial, offset, total_bytes)
+        if resp.status == 206:
+            # Partial content for the wrong offset or object version: discard and re-request in full
+            resp.close()
+            resp = session.request(source_uri)
+        # Otherwise a 200: the server ignored the range or the object changed, so the body is complete
+    return _stream(resp, source_uri, partial, 0, None)
+
+
+def _stream(resp: "PooledResponse", source_uri: str, partial: Path, offset: int, total_bytes: Optional[int]) -> Tuple[int, int, str]:
+    # Hash every byte as it is written; a resumed partial's existing bytes are hashed first
+    h = hashlib.sha256()
+    if offset:
+        with partial.open("rb") as fh:
+            for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+                h.update(chunk)
+    with resp:
+        if total_bytes is None and offset == 0:
+            length = resp.headers.get("Content-Length")
+            total_bytes = int(length) if length and length.isdigit() else None
+        _write_partial_state(partial, source_uri, resp.headers, total_bytes)
+        with partial.open("ab" if offset else "wb") as outfh:
+            while True:
+                chunk = resp.read(64 * 1024)
+                if not chunk:
+                    break
+                outfh.write(chunk)
+                h.update(chunk)
+    size = partial.stat().st_size
+    if total_bytes is not None and size != total_bytes:
+        raise IncompleteDownload(f"expected {total_bytes} bytes, have {size}")
+    return size, offset, h.hexdigest()
+
+
+def _fetch_month(
+    session: HttpSession,
+    raw_root: Path,
+    dataset: str,
+    year: int,
+    month: int,
+    url_template: str,
+    metrics: RunMetrics = NULL_METRICS,
+    events: Optional[EventSink] = None,
+    refresh: bool = False,
+) -> str:
+    """Download one month into the canonical layout.
+
+    Returns "ok" (downloaded or skipped), "failed" (counted failure) or "fatal"
+    (staging/rename error that must stop the whole range). Structured log records
+    go to `events` (default: the process-wide JSON-to-stdout sink).
+    With `refresh`, a month that is already committed is re-requested conditionally
+    and replaced only if upstream changed; the old version is archived under
+    `_superseded/` and the new sidecar names it in `supersedes_sha256`.
+    """
+    events = events or default_sink()
+    final, staging, partial = _make_targets(raw_root, dataset, year, month)
+    source_uri = url_template.format(dataset=dataset, year=year, month=month)
+    start_ts = time.time()
+    log_base = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "level": "INFO",
+        "action": "fetch",
+        "dataset": dataset,
+        "year": year,
+        "month": month,
+        "source_uri": source_uri,
+        "target_path": str(final.as_posix()),
+        "raw_root": str(raw_root.as_posix()),
+        "bytes": None,
+        "duration_ms": None,
+        "status": None,
+        "reason": None,
+    }
+
+    try:
+        # If final exists already, skip without downloading (or re-validate it with `refresh`)
+        previous = None
+        if final.exists():
+            if not refresh:
+                events.emit(log_base, status="skipped", reason="already_exists", duration_ms=0)
+                return "ok"
+            previous = read_sidecar(final) or {}
+
+        # Stream download into partial file (resuming a leftover partial when possible);
+        # HTTP errors surface as exceptions
+        download_start = time.perf_counter_ns()
+        result = _download(session, source_uri, partial, _conditional_headers(previous) if previous is not None else None)
+        if result is None:
+            metrics.record("download", time.perf_counter_ns() - download_start, observe=True)
+            events.emit(log_base, status="skipped", reason="not_modified", duration_ms=int((time.time() - start_ts) * 1000))
+            return "ok"
+        downloaded, resumed_from, sha256 = result
+        metrics.record("download", time.perf_counter_ns() - download_start, nbytes=downloaded - resumed_from, observe=True)
+
+        # Post-download checks
+        if not partial.exists():
+            events.emit(log_base, status="error", reason="zero_bytes")
+            return "failed"
+
+        size = partial.stat().st_size
+        if size == 0:
+            events.emit(log_base, status="error", reason="zero_bytes", bytes=0)
+            return "failed"
+        validators = _read_partial_state(partial)
+
+        if previous is not None:
+            return _commit_refresh(raw_root, final, partial, staging, source_uri, dataset, year, month, size, sha256,
+                                   validators, previous, log_base, start_ts, metrics, events)
+
+        # Rename partial -> staging (remove .partial suffix)
+        try:
+            partial.replace(staging)
         except Exception as e:
-            log = dict(log_base)
-            log.update({"status": "error", "reason": "network_error", "error": str(e)})
-            _log(log)
-            failures += 1
+            events.emit(log_base, status="error", reason="rename_failed", error=str(e))
+            # leave partial for forensics
+            return "fatal"
 
-        cur_year, cur_month = _inc_month(cur_year, cur_month)
+        # Final atomic move: if final exists -> delete staging and mark skipped
+        try:
+            if final.exists():
+                # someone else created it
+                staging.unlink(missing_ok=True)
+                events.emit(log_base, status="skipped", reason="already_exists", bytes=size)
+            else:
+                commit_start = time.perf_counter_ns()
+                # ensure parent exists
+                final.parent.mkdir(parents=True, exist_ok=True)
+                staging.replace(final)
+                _partial_state_path(partial).unlink(missing_ok=True)
+                # write sidecar
+                _write_sidecar(final, source_uri, dataset, year, month, size, sha256, validators)
+                # record the commit so ingest can pick it up without scanning
+                try:
+                    journal.append_commit(raw_root, final.relative_to(raw_root).as_posix(), size, sha256, utc_now(), source_uri)
+                except Exception as e:
+                    # The file is committed; only `ingest --from-journal` would miss it
+                    events.emit(log_base, status="error", reason="journal_failed", bytes=size, error=str(e))
+                    return "failed"
+                metrics.record("commit", time.perf_counter_ns() - commit_start, observe=True)
+                duration_ms = int((time.time() - start_ts) * 1000)
+                if resumed_from:
+                    events.emit(log_base, status="success", bytes=size, duration_ms=duration_ms, resumed_from=resumed_from)
+                else:
+                    events.emit(log_base, status="success", bytes=size, duration_ms=duration_ms)
+        except Exception as e:
+            events.emit(log_base, status="error", reason="rename_failed", error=str(e))
+            return "fatal"
+
+    except HTTPError as he:
+        code = he.code
+        reason = "expected_absence" if code in (404, 403, 410) else "server_error"
+        events.emit(log_base, status="skipped" if reason == "expected_absence" else "error", reason=reason, http_status=code)
+        if reason != "expected_absence":
+            return "failed"
+
+    except IncompleteDownload as ie:
+        events.emit(log_base, status="error", reason="incomplete", error=str(ie))
+        return "failed"
+
+    except URLError as ue:
+        events.emit(log_base, status="error", reason="network_error", error=str(ue))
+        return "failed"
+
+    except Exception as e:
+        events.emit(log_base, status="error", reason="network_error", error=str(e))
+        return "failed"
+
+    return "ok"
+
+
+def _commit_refresh(
+    raw_root: Path,
+    final: Path,
+    partial: Path,
+    staging: Path,
+    source_uri: str,
+    dataset: str,
+    year: int,
+    month: int,
+    size: int,
+    sha256: str,
+    validators: Optional[dict],
+    previous: dict,
+    log_base: dict,
+    start_ts: float,
+    metrics: RunMetrics,
+    events: EventSink,
+) -> str:
+    """Commit a re-downloaded month over its existing version (see `_fetch_month`).
+
+    Identical content only refreshes the sidecar's validators. Otherwise the old file
+    is archived, the new sidecar (fingerprinting the staged file) is written, and the
+    staged file is renamed over the old one, so the path always holds a whole version
+    and ingestion never sees the new file without the sidecar attesting the change.
+    """
+    try:
+        old_sha256 = _current_checksum(final, previous)
+        if old_sha256 == sha256:
+            partial.unlink(missing_ok=True)
+            _partial_state_path(partial).unlink(missing_ok=True)
+            _write_sidecar(final, source_uri, dataset, year, month, size, sha256, validators)
+            events.emit(log_base, status="skipped", reason="unchanged", bytes=size, duration_ms=int((time.time() - start_ts) * 1000))
+            return "ok"
+        partial.replace(staging)
+        commit_start = time.perf_counter_ns()
+        archive = _archive_superseded(raw_root, final, old_sha256)
+        supersedes = {
+            "supersedes_sha256": old_sha256,
+            "superseded_path": archive.relative_to(raw_root).as_posix(),
+        }
+        _write_sidecar(final, source_uri, dataset, year, month, size, sha256, validators, stat_path=staging, extra=supersedes)
+        staging.replace(final)
+        _partial_state_path(partial).unlink(missing_ok=True)
+    except Exception as e:
+        events.emit(log_base, status="error", reason="rename_failed", error=str(e))
+        return "fatal"
+    try:
+        journal.append_commit(raw_root, final.relative_to(raw_root).as_posix(), size, sha256, utc_now(), source_uri)
+    except Exception as e:
+        events.emit(log_base, status="error", reason="journal_failed", bytes=size, error=str(e))
+        return "failed"
+    metrics.record("commit", time.perf_counter_ns() - commit_start, observe=True)
+    events.emit(log_base, status="success", reason="refreshed", bytes=size, duration_ms=int((time.time() - start_ts) * 1000), **supersedes)
+    return "ok"
+
+
+def fetch_range(
+    raw_root: Path,
+    dataset: str,
+    start_year: int,
+    start_month: int,
+    end_year: int,
+    end_month: int,
+    concurrency: int = 1,
+    url_template: str = TLC_URL,
+    metrics: Optional[RunMetrics] = None,
+    events: Optional[EventSink] = None,
+    refresh: bool = False,
+    session: Optional[HttpSession] = None,
+    on_ready: Optional[Callable[[Path], None]] = None,
+    cancel: Optional[threading.Event] = None,
+) -> int:
+    """Fetch inclusive range from start_year/start_month to end_year/end_month.
+    Returns 0 on success (no failures), non-zero if any failed downloads (network/server).
+
+    With `concurrency` > 1 up to that many months download at once over pooled
+    keep-alive connections. Each month still stages and commits atomically on its own.
+    A rename failure returns 2 and stops months that have not started yet.
+    Download and commit timings are accumulated in `metrics` when given. One
+    structured record per month is emitted to `events` (default: JSON lines on stdout).
+    With `refresh`, months already on disk are re-requested with If-None-Match /
+    If-Modified-Since and downloaded again only when upstream changed. A caller-owned
+    `session` keeps its connections open across calls; otherwise one is made and closed.
+    `on_ready` is called on the fetching thread with the path of each month's file that
+    is on disk once the month is done (committed, refreshed or already present). If it
+    raises, months that have not started are cancelled and the exception propagates.
+    Once `cancel` is set, months that have not started are skipped and 2 is returned.
+    """
+    metrics = metrics or NULL_METRICS
+    events = events or default_sink()
+    months = list(_iter_months(start_year, start_month, end_year, end_month))
+    owns_session = session is None
+    session = session or HttpSession()
+    failures = 0
+
+    def fetch_one(year: int, month: int) -> str:
+        if cancel is not None and cancel.is_set():
+            return "fatal"
+        outcome = _fetch_month(session, raw_root, dataset, year, month, url_template, metrics, events, refresh)
+        if on_ready is not None and outcome != "fatal":
+            final = _final_path(raw_root, dataset, year, month)
+            if final.exists():
+                on_ready(final)
+        return outcome
+
+    try:
+        if concurrency <= 1:
+            for year, month in months:
+                outcome = fetch_one(year, month)
+                if outcome == "fatal":
+                    return 2
+                if outcome == "failed":
+                    failures += 1
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="dgap-fetch") as pool:
+                futures = [pool.submit(fetch_one, y, m) for y, m in months]
+                fatal = False
+                for fut in futures:
+                    if fut.cancelled():
+                        continue
+                    try:
+                        outcome = fut.result()
+                    except BaseException:
+                        for pending in futures:
+                            pending.cancel()
+                        raise
+                    if outcome == "fatal" and not fatal:
+                        fatal = True
+                        for pending in futures:
+                            pending.cancel()
+                    elif outcome == "failed":
+                        failures += 1
+                if fatal:
+                    return 2
+    finally:
+        if owns_session:
+            session.close()
 
     return 1 if failures > 0 else 0
@@ -1,23 +1,337 @@
 from pathlib import Path
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 import hashlib
+import mmap
+import os
+import queue
+import threading
 import time
-from typing import Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
 
 HASH_CHUNK_SIZE = 1024 * 1024  # 1MB
+TREE_CHUNK_SIZE = 8 * 1024 * 1024  # 8MB leaves for chunk-tree digests
 
-def compute_checksum(file_path: Path) -> Tuple[str, int, int]:
+# Whole-file read strategies for compute_checksum; "auto" always means "readinto"
+HASH_BACKENDS = ("read", "readinto", "file_digest", "mmap", "fadvise")
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_hash_backend = "auto"
+_hash_chunk_size = HASH_CHUNK_SIZE
+
+
+def available_hash_backends() -> List[str]:
+    """Backends usable on this interpreter and platform."""
+    names = ["read", "readinto", "mmap"]
+    if hasattr(hashlib, "file_digest"):  # Python 3.11+
+        names.append("file_digest")
+    if hasattr(os, "posix_fadvise"):  # not on Windows or macOS
+        names.append("fadvise")
+    return [n for n in HASH_BACKENDS if n in names]
+
+
+def configure_hashing(backend: Optional[str] = None, chunk_size: Optional[int] = None) -> None:
+    """Set the process-wide default backend and read size of `compute_checksum`.
+
+    The CLI calls this for `--hash-backend`/`--hash-chunk-kb`; library callers may too.
+    None leaves a setting unchanged.
+    """
+    global _hash_backend, _hash_chunk_size
+    if backend is not None:
+        if backend != "auto" and backend not in available_hash_backends():
+            raise ValueError(f"hash backend {backend!r} is not available here (choose from auto, {', '.join(available_hash_backends())})")
+        _hash_backend = backend
+    if chunk_size is not None:
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        _hash_chunk_size = chunk_size
+
+
+def _hash_read(path: Path, h, chunk_size: int, throttle: Optional[Callable[[int], None]]) -> int:
+    # A new bytes object per read
+    bytes_hashed = 0
+    with path.open("rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        while True:
+            # Charge what this read will return; the final empty read at EOF is free
+            if throttle is not None and size > bytes_hashed:
+                throttle(min(chunk_size, size - bytes_hashed))
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+            bytes_hashed += len(chunk)
+    return bytes_hashed
+
+
+def _hash_readinto(path: Path, h, chunk_size: int, throttle: Optional[Callable[[int], None]], drop_cache: bool = False) -> int:
+    # One reused buffer and unbuffered reads straight into it. With `drop_cache` the
+    # kernel is told the access is sequential and each hashed range is dropped from
+    # the page cache, so hashing a cold file does not push other data out of it.
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    bytes_hashed = 0
+    with open(path, "rb", buffering=0) as f:
+        fd = f.fileno()
+        size = os.fstat(fd).st_size
+        if drop_cache:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        while True:
+            if throttle is not None and size > bytes_hashed:
+                throttle(min(chunk_size, size - bytes_hashed))
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+            if drop_cache:
+                os.posix_fadvise(fd, bytes_hashed, n, os.POSIX_FADV_DONTNEED)
+            bytes_hashed += n
+    return bytes_hashed
+
+
+def _hash_mmap(path: Path, h, chunk_size: int, throttle: Optional[Callable[[int], None]]) -> int:
+    # No copies into user space; a file truncated while mapped raises SIGBUS, which is
+    # why "auto" never picks this
+    with path.open("rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            view = memoryview(mm)
+            try:
+                for offset in range(0, size, chunk_size):
+                    if throttle is not None:
+                        throttle(min(chunk_size, size - offset))
+                    h.update(view[offset:offset + chunk_size])
+            finally:
+                view.release()
+    return size
+
+
+def compute_checksum(
+    file_path: Path,
+    throttle: Optional[Callable[[int], None]] = None,
+    backend: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+) -> Tuple[str, int, int]:
     """Compute SHA-256 checksum by streaming the file.
 
+    `throttle`, if given, is called before every read with the number of bytes it
+    is expected to return (see verify.Throttle). `backend` and `chunk_size` default to the `configure_hashing`
+    settings; "auto" uses "readinto". "file_digest" (hashlib's own loop) has a fixed
+    read size and cannot be throttled, so a throttled call uses "readinto" instead.
     Returns (hex_digest, bytes_hashed, duration_ms)
     """
+    backend = backend or _hash_backend
+    chunk_size = chunk_size or _hash_chunk_size
+    if backend == "auto" or (backend == "file_digest" and throttle is not None):
+        backend = "readinto"
+    start = time.perf_counter()
+
+    if backend == "file_digest":
+        with open(file_path, "rb", buffering=0) as f:
+            h = hashlib.file_digest(f, "sha256")
+            bytes_hashed = f.tell()
+    else:
+        h = hashlib.sha256()
+        if backend == "read":
+            bytes_hashed = _hash_read(file_path, h, chunk_size, throttle)
+        elif backend == "readinto":
+            bytes_hashed = _hash_readinto(file_path, h, chunk_size, throttle)
+        elif backend == "fadvise":
+            bytes_hashed = _hash_readinto(file_path, h, chunk_size, throttle, drop_cache=True)
+        elif backend == "mmap":
+            bytes_hashed = _hash_mmap(file_path, h, chunk_size, throttle)
+        else:
+            raise ValueError(f"unknown hash backend {backend!r}")
+
+    duration_ms = int((time.perf_counter() - start) * 1000)
+    return h.hexdigest(), bytes_hashed, duration_ms
+
+
+def stat_fingerprint(st: os.stat_result) -> Tuple[int, int, int, int]:
+    """Return the stat fingerprint (size, mtime_ns, inode, device) for a file.
+
+    A matching fingerprint lets ingestion skip re-hashing a file that has not been
+    touched since its checksum was recorded.
+    """
+    return st.st_size, st.st_mtime_ns, st.st_ino, st.st_dev
+
+
+def fingerprint_matches(stored: Optional[Sequence[Optional[int]]], st: os.stat_result) -> bool:
+    """True when a stored (size, mtime_ns, inode, device) fingerprint equals the file's stat.
+
+    Rows recorded before fingerprints existed carry NULLs and never match.
+    """
+    if stored is None or any(v is None for v in stored):
+        return False
+    return tuple(stored) == stat_fingerprint(st)
+
+
+_END = object()
+
+
+def _feed(it: Iterator, requests: "queue.Queue") -> None:
+    # Pulls one item of `it` into each future `map_ordered` asks for; None stops it
+    while True:
+        fut = requests.get()
+        if fut is None:
+            return
+        try:
+            fut.set_result(next(it, _END))
+        except BaseException as e:
+            fut.set_exception(e)
+
+
+def map_ordered(fn: Callable[[T], R], items: Iterable[T], workers: int = 1, stream: bool = False) -> Iterator[R]:
+    """Apply `fn` to `items` on a thread pool and yield results in input order.
+
+    hashlib releases the GIL while digesting large buffers, so threads hash files in
+    parallel. `items` is consumed lazily on the caller's thread (so it may touch a SQLite
+    connection) and at most 2 * workers items are in flight. An exception raised by `fn`
+    surfaces when its item's turn comes, exactly as in a sequential loop.
+    With `stream`, `items` may take long to produce the next item (files handed over as
+    they are fetched), so it is consumed on a helper thread instead, one item ahead, and
+    each result is yielded as soon as it and all before it are done, not only once the
+    next item arrives. With workers <= 1 everything runs inline.
+    """
+    if workers <= 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    window = workers * 2
+    pending: deque = deque()
+    if not stream:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dgap-hash") as pool:
+            try:
+                for item in items:
+                    pending.append(pool.submit(fn, item))
+                    # Hand back finished work at the head without waiting for the window to fill
+                    while pending and (len(pending) >= window or pending[0].done()):
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                # Consumer stopped early (error or close): drop work that has not started
+                for fut in pending:
+                    fut.cancel()
+        return
+
+    requests: "queue.Queue" = queue.Queue()
+    # A daemon thread, so an abandoned stream still blocked on its next item cannot hold up exit
+    threading.Thread(target=_feed, args=(iter(items), requests), name="dgap-feed", daemon=True).start()
+
+    def request_next() -> Future:
+        fut: Future = Future()
+        requests.put(fut)
+        return fut
+
+    nxt: Optional[Future] = request_next()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dgap-hash") as pool:
+        try:
+            while nxt is not None or pending:
+                # An error from `items` surfaces only after the results before it
+                if nxt is not None and nxt.done() and len(pending) < window and (not pending or nxt.exception() is None):
+                    item = nxt.result()
+                    if item is _END:
+                        nxt = None
+                    else:
+                        pending.append(pool.submit(fn, item))
+                        nxt = request_next()
+                    continue
+                if pending and pending[0].done():
+                    yield pending.popleft().result()
+                    continue
+                # Nothing to do until the head result or the next item is ready
+                waiting = [pending[0]] if pending else []
+                if nxt is not None and not nxt.done():
+                    waiting.append(nxt)
+                wait(waiting, return_when=FIRST_COMPLETED)
+        finally:
+            requests.put(None)
+            for fut in pending:
+                fut.cancel()
+
+
+def chunk_tree_root(chunk_digests: Sequence[str]) -> str:
+    """Root of a chunk tree: SHA-256 over the concatenated binary chunk digests, in order."""
+    h = hashlib.sha256()
+    for digest in chunk_digests:
+        h.update(bytes.fromhex(digest))
+    return h.hexdigest()
+
+
+def compute_checksum_with_tree(file_path: Path, chunk_size: int = TREE_CHUNK_SIZE, workers: int = 1) -> Tuple[str, int, int, List[str]]:
+    """Whole-file SHA-256 plus per-chunk SHA-256 digests in a single read pass.
+
+    The whole-file digest is inherently sequential; chunk digests are computed on up to
+    `workers` threads while the next chunk is read, so the tree costs no extra I/O.
+    Returns (hex_digest, bytes_hashed, duration_ms, chunk_digests).
+    """
     start = time.perf_counter()
     h = hashlib.sha256()
     bytes_hashed = 0
 
-    with file_path.open("rb") as f:
-        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
-            h.update(chunk)
-            bytes_hashed += len(chunk)
+    def chunks() -> Iterator[bytes]:
+        nonlocal bytes_hashed
+        with file_path.open("rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                h.update(chunk)
+                bytes_hashed += len(chunk)
+                yield chunk
 
+    chunk_digests = list(map_ordered(lambda c: hashlib.sha256(c).hexdigest(), chunks(), workers))
     duration_ms = int((time.perf_counter() - start) * 1000)
-    return h.hexdigest(), bytes_hashed, duration_ms
+    return h.hexdigest(), bytes_hashed, duration_ms, chunk_digests
+
+
+def compute_chunk_digests(
+    file_path: Path,
+    chunk_size: int = TREE_CHUNK_SIZE,
+    workers: int = 1,
+    indices: Optional[Iterable[int]] = None,
+    throttle: Optional[Callable[[int], None]] = None,
+) -> Dict[int, str]:
+    """Hash chunks of a file independently (seek + read per chunk), in parallel.
+
+    `indices` selects which chunks to hash (default: all), so a verifier can target or
+    sample chunks and read only those byte ranges. Returns {chunk_index: hex_digest}.
+    """
+    size = file_path.stat().st_size
+    count = -(-size // chunk_size)
+    wanted = sorted(set(range(count) if indices is None else (i for i in indices if 0 <= i < count)))
+
+    def hash_chunk(index: int) -> Tuple[int, str]:
+        # Each worker opens its own handle and seeks, which works on every platform
+        h = hashlib.sha256()
+        remaining = min(chunk_size, size - index * chunk_size)
+        with file_path.open("rb") as f:
+            f.seek(index * chunk_size)
+            while remaining > 0:
+                if throttle is not None:
+                    throttle(min(HASH_CHUNK_SIZE, remaining))
+                buf = f.read(min(HASH_CHUNK_SIZE, remaining))
+                if not buf:
+                    break
+                h.update(buf)
+                remaining -= len(buf)
+        return index, h.hexdigest()
+
+    return dict(map_ordered(hash_chunk, wanted, workers))
+
+
+def verify_chunks(
+    file_path: Path,
+    chunk_size: int,
+    expected: Dict[int, str],
+    workers: int = 1,
+    throttle: Optional[Callable[[int], None]] = None,
+) -> List[int]:
+    """Re-hash only the chunks in `expected` and return the indices that no longer match."""
+    actual = compute_chunk_digests(file_path, chunk_size, workers, expected.keys(), throttle)
+    return [i for i in sorted(expected) if actual.get(i) != expected[i]]
@@ -0,0 +1,375 @@
+"""Ingestion engine: register files in the ledger as one recorded run.
+
+`run_ingest` records an `ingestion_runs` row around `register_files`, which hashes
+files and queues their registry rows, footers and chunk trees. The CLI (`dgap.main`),
+the library API (`dgap.api`) and the fused pipeline (`dgap.sync`) all drive it.
+"""
+import posixpath
+import sys
+import time
+import traceback
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .events import EventSink
+from .idempotency import chunk_tree_root, fingerprint_matches, map_ordered
+from .ingest_raw import attests_supersession, hash_if_changed, posix_relative, read_parquet_footer, read_sidecar, read_sidecar_source_uri, utc_now
+from .metadata import LeaseHeartbeat, RegistryWriter, claim_partition, complete_partition, dataset_of, insert_run_metrics, insert_run_start, load_registry_index, load_registry_partition, load_schema_fingerprints, release_claims, set_journal_checkpoint, update_run_end
+from .metrics import RunMetrics, write_prometheus_textfile
+
+
+def generate_run_id() -> str:
+    from datetime import datetime, timezone
+
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    suffix = uuid.uuid4().hex[:8]
+    return f"{timestamp}_{suffix}"
+
+
+def format_run_summary(run_record: dict) -> str:
+    duration = "?"
+    if run_record.get("start_time") and run_record.get("end_time"):
+        from datetime import datetime
+
+        start = datetime.fromisoformat(run_record["start_time"])  # type: ignore
+        end = datetime.fromisoformat(run_record["end_time"])  # type: ignore
+        duration = f"{(end - start).total_seconds():.1f}s"
+
+    return (
+        f"{run_record['run_id']} | "
+        f"{run_record['status']} | "
+        f"{run_record['files_detected']} detected, "
+        f"{run_record['files_ingested']} ingested, "
+        f"{run_record['files_skipped']} skipped | "
+        f"{duration}"
+    )
+
+
+def _publish_ingest_metrics(conn, run_id: str, metrics: RunMetrics, textfile: Optional[Path], success: bool, counts: dict) -> None:
+    """Persist the run's phase breakdown and optionally write the Prometheus textfile.
+
+    Best-effort: a metrics failure is reported on stderr but never changes the run outcome.
+    """
+    try:
+        insert_run_metrics(conn, run_id, metrics.snapshot())
+    except Exception as e:
+        print(f"warning: could not record run metrics: {e}", file=sys.stderr)
+    if textfile is not None:
+        try:
+            write_prometheus_textfile(textfile, metrics, "ingest", success, counts)
+        except Exception as e:
+            print(f"warning: could not write metrics textfile {textfile}: {e}", file=sys.stderr)
+
+
+def format_dedup_summary(counts: dict) -> str:
+    return (
+        f"dedup | {counts['groups']} duplicate groups, {counts['linked']} linked, "
+        f"{counts['already_linked']} already linked, {counts['skipped']} skipped | "
+        f"{counts['bytes_reclaimed'] / 1e6:.1f} MB reclaimed"
+    )
+
+
+def register_files(
+    files: Iterable[Path],
+    raw_root: Path,
+    run_id: str,
+    registry: Dict[str, tuple],
+    schemas: Dict[str, set],
+    writer: RegistryWriter,
+    events: EventSink,
+    base: dict,
+    metrics: RunMetrics,
+    counts: Dict[str, int],
+    full_verify: bool = False,
+    workers: int = 1,
+    chunk_size: Optional[int] = None,
+    chunk_workers: int = 4,
+    index_footers: bool = True,
+) -> None:
+    """Hash and register `files` against the in-memory `registry`, queueing rows on `writer`.
+
+    `registry` (raw_path -> registry entry) and `schemas` (dataset -> fingerprints) are
+    updated as rows are queued, so a long-lived caller can keep them across calls.
+    `counts["files_ingested"]`/`counts["files_skipped"]` are incremented in place; a
+    checksum collision raises RuntimeError unless the file's sidecar attests that
+    `fetch --refresh` replaced the registered version, which is then superseded.
+    """
+    def index_footer(raw_path: str, footer: dict) -> None:
+        writer.add_footer(raw_path, footer, utc_now())
+        seen = schemas.setdefault(dataset_of(raw_path), set())
+        if seen and footer["schema_fingerprint"] not in seen:
+            events.emit(
+                base, event="schema_drift", raw_path=raw_path, schema_fingerprint=footer["schema_fingerprint"],
+                message=f"SCHEMA DRIFT: {raw_path} schema {footer['schema_fingerprint'][:12]} not seen before for this dataset",
+            )
+        seen.add(footer["schema_fingerprint"])
+
+    def candidates():
+        for p in files:
+            raw_path = posix_relative(p, raw_root)
+            yield p, raw_path, registry.get(raw_path)
+
+    def inspect(candidate):
+        p, raw_path, existing = candidate
+        st, hashed, chunk_digests = hash_if_changed(p, existing, full_verify, chunk_size, chunk_workers, metrics)
+        footer = read_parquet_footer(p, metrics) if index_footers and existing is None else None
+        return p, raw_path, existing, st, hashed, chunk_digests, footer
+
+    # compute and process
+    for p, raw_path, existing, st, hashed, chunk_digests, footer in map_ordered(inspect, candidates(), workers, stream=not isinstance(files, list)):
+        file_size = st.st_size
+        if hashed is None:
+            # Unchanged since its checksum was recorded: skipped without reading the file
+            counts["files_skipped"] += 1
+            events.emit(base, event="skipped", raw_path=raw_path, reason="fingerprint", checksum_sha256=existing[1], bytes=file_size, message=f"SKIPPED: {raw_path}")
+            continue
+
+        checksum, bytes_hashed, duration_ms = hashed
+
+        if existing:
+            if existing[1] == checksum:
+                if not fingerprint_matches(existing[2:], st):
+                    # Content confirmed; remember the fingerprint so the next run can skip hashing
+                    writer.update_fingerprint(raw_path, st.st_mtime_ns, st.st_ino, st.st_dev)
+                    registry[raw_path] = existing[:3] + (st.st_mtime_ns, st.st_ino, st.st_dev)
+                counts["files_skipped"] += 1
+                events.emit(base, event="skipped", raw_path=raw_path, reason="checksum", checksum_sha256=checksum, bytes=file_size, duration_ms=duration_ms, message=f"SKIPPED: {raw_path}")
+                continue
+            with metrics.phase("sidecar"):
+                sidecar = read_sidecar(p)
+            if attests_supersession(raw_root, sidecar, checksum, existing[1]):
+                # A newer upstream version committed by `fetch --refresh`
+                writer.supersede(
+                    raw_path, checksum, file_size, bytes_hashed, duration_ms, sidecar.get("source_uri"),
+                    st.st_mtime_ns, st.st_ino, st.st_dev, existing[1], existing[2], sidecar.get("superseded_path"), utc_now(), run_id,
+                )
+                registry[raw_path] = (raw_path, checksum, file_size, st.st_mtime_ns, st.st_ino, st.st_dev)
+                footer = read_parquet_footer(p, metrics) if index_footers else None
+                if footer is not None:
+                    index_footer(raw_path, footer)
+                events.emit(
+                    base, event="superseded", raw_path=raw_path, previous_sha256=existing[1], checksum_sha256=checksum, bytes=file_size, duration_ms=duration_ms,
+                    message=f"SUPERSEDED: {raw_path} ({existing[1][:12]} -> {checksum[:12]})",
+                )
+                counts["files_ingested"] += 1
+                continue
+            # collision: same raw_path, different checksum -> fail hard
+            raise RuntimeError(f"Checksum collision for {raw_path}: existing={existing[1]} new={checksum}")
+
+        # Read optional sidecar for source_uri (best-effort, never fails)
+        with metrics.phase("sidecar"):
+            source_uri = read_sidecar_source_uri(p)
+
+        # queue new registry row (written in batches)
+        writer.insert(
+            raw_path,
+            p.name,
+            checksum,
+            file_size,
+            bytes_hashed,
+            duration_ms,
+            source_uri,
+            utc_now(),
+            run_id,
+            st.st_mtime_ns,
+            st.st_ino,
+            st.st_dev,
+        )
+        registry[raw_path] = (raw_path, checksum, file_size, st.st_mtime_ns, st.st_ino, st.st_dev)
+        if chunk_digests is not None:
+            writer.add_chunk_tree(raw_path, chunk_size, chunk_tree_root(chunk_digests), chunk_digests, utc_now())
+        if footer is not None:
+            index_footer(raw_path, footer)
+        events.emit(base, event="ingested", raw_path=raw_path, checksum_sha256=checksum, bytes=file_size, duration_ms=duration_ms)
+        counts["files_ingested"] += 1
+
+
+def claimed_partitions(
+    conn, files: List[Path], raw_root: Path, run_id: str, leases: LeaseHeartbeat, events: EventSink, base: dict
+) -> Iterator[Tuple[str, List[Path]]]:
+    """Group `files` by partition directory and yield those this worker wins a lease on.
+
+    Partitions another worker holds are retried until they are completed (skipped)
+    or their lease expires (reclaimed), so once every worker has returned, each
+    partition was ingested by one of them. Partitions completed by anyone since this
+    call started are not ingested again. The caller completes each partition before
+    asking for the next.
+    """
+    groups: Dict[str, List[Path]] = {}
+    for p in files:
+        groups.setdefault(posixpath.dirname(posix_relative(p, raw_root)), []).append(p)
+    generation = time.time()
+    pending = sorted(groups)
+    while pending:
+        waiting = []
+        for partition in pending:
+            outcome = claim_partition(conn, partition, leases.owner, run_id, leases.lease_seconds, generation)
+            if outcome == "held":
+                waiting.append(partition)
+                continue
+            if outcome == "done":
+                continue
+            if outcome == "reclaimed":
+                events.emit(base, event="reclaimed", partition=partition, message=f"RECLAIMED: {partition} (previous lease expired)")
+            leases.hold(1)
+            yield partition, groups[partition]
+        pending = waiting
+        if pending:
+            time.sleep(min(leases.lease_seconds / 3, 5.0))
+
+
+class LeaseLost(RuntimeError):
+    """Another worker took over a partition this run was ingesting."""
+
+
+def _complete(conn, partition: str, owner: str) -> None:
+    # Runs inside the partition's flush, so its rows commit only if the lease still holds
+    if not complete_partition(conn, partition, owner):
+        raise LeaseLost(f"Lease on partition {partition} expired and was taken over before completion")
+
+
+def _counted(files: Iterable[Path], counts: Dict[str, int]) -> Iterator[Path]:
+    for p in files:
+        counts["files_detected"] += 1
+        yield p
+
+
+def run_ingest(
+    conn,
+    files: Iterable[Path],
+    raw_root: Path,
+    run_id: str,
+    start_time: str,
+    events: EventSink,
+    metrics: RunMetrics,
+    registry: Optional[Dict[str, tuple]] = None,
+    schemas: Optional[Dict[str, set]] = None,
+    full_verify: bool = False,
+    workers: int = 1,
+    batch_size: int = 500,
+    chunk_size: Optional[int] = None,
+    chunk_workers: int = 4,
+    index_footers: bool = True,
+    metrics_textfile: Optional[Path] = None,
+    journal_checkpoint: Optional[Tuple[str, int]] = None,
+    leases: Optional[LeaseHeartbeat] = None,
+    print_errors: bool = True,
+) -> int:
+    """Record one ingestion run over `files` in `ingestion_runs`; returns 0 or 2 (failure).
+
+    The registry cache and schema fingerprints are loaded from the ledger unless a
+    long-lived caller passes its own (`dgap watch`), which are then kept up to date.
+    With `journal_checkpoint` = (journal key, offset) the checkpoint advances on success.
+    With `leases`, only partitions claimed through `claimed_partitions` are ingested;
+    each partition's rows commit in the transaction that marks it done, before the
+    next is claimed; if its lease was lost they are discarded. `files_detected`
+    counts the files of claimed partitions. A failed run releases its leases.
+    `files` may also be a stream that is registered as it is consumed (`dgap sync`);
+    `files_detected` then counts the files taken from it.
+    The error and traceback of a failed run are stored on its `ingestion_runs` row and,
+    with `print_errors`, printed to stderr.
+    """
+    base = {"action": "ingest", "run_id": run_id}
+    streamed = not isinstance(files, list)
+    insert_run_start(conn, run_id, start_time)
+
+    counts = {"files_detected": 0 if streamed else len(files), "files_ingested": 0, "files_skipped": 0}
+    # With leases, nothing may be written before the partition's lease is confirmed
+    writer = RegistryWriter(conn, batch_size, metrics, auto_flush=leases is None)
+
+    try:
+        # existing is (raw_path, checksum_sha256, file_size_bytes, mtime_ns, inode, device)
+        if registry is None:
+            with metrics.phase("registry_load"):
+                registry = load_registry_index(conn)
+        if schemas is None:
+            schemas = load_schema_fingerprints(conn) if index_footers else {}
+
+        if leases is None:
+            register_files(
+                _counted(files, counts) if streamed else files, raw_root, run_id, registry, schemas, writer, events, base, metrics, counts,
+                full_verify, workers, chunk_size, chunk_workers, index_footers,
+            )
+        else:
+            counts["files_detected"] = 0
+            for partition, part_files in claimed_partitions(conn, files, raw_root, run_id, leases, events, base):
+                # Another worker may have registered files here since the cache was loaded
+                registry.update(load_registry_partition(conn, partition))
+                counts["files_detected"] += len(part_files)
+                mark = writer.mark()
+                register_files(
+                    part_files, raw_root, run_id, registry, schemas, writer, events, base, metrics, counts,
+                    full_verify, workers, chunk_size, chunk_workers, index_footers,
+                )
+                leases.hold(0)
+                if leases.lost.is_set():
+                    writer.discard(mark)
+                    raise LeaseLost(f"Lease on partition {partition} expired and was taken over; not committing it")
+                writer.flush(before_commit=lambda: _complete(conn, partition, leases.owner))
+        files_detected = counts["files_detected"]
+        files_ingested = counts["files_ingested"]
+        files_skipped = counts["files_skipped"]
+
+        writer.flush()
+        end_time = utc_now()
+        if journal_checkpoint is not None:
+            set_journal_checkpoint(conn, journal_checkpoint[0], journal_checkpoint[1], end_time, run_id)
+        update_run_end(conn, run_id, end_time, "success", files_detected, files_ingested, files_skipped)
+        _publish_ingest_metrics(
+            conn, run_id, metrics, metrics_textfile, True,
+            {"files_detected": files_detected, "files_ingested": files_ingested, "files_skipped": files_skipped},
+        )
+
+        # Fetch run record for summary
+        cur = conn.execute("SELECT run_id, start_time, end_time, status, files_detected, files_ingested, files_skipped FROM ingestion_runs WHERE run_id = ?", (run_id,))
+        row = cur.fetchone()
+        if row:
+            run_record = {
+                "run_id": row[0],
+                "start_time": row[1],
+                "end_time": row[2],
+                "status": row[3],
+                "files_detected": row[4],
+                "files_ingested": row[5],
+                "files_skipped": row[6],
+            }
+            events.emit(base, event="run_end", message=format_run_summary(run_record), **run_record)
+
+        return 0
+
+    except Exception as e:
+        tb = traceback.format_exc()
+        end_time = utc_now()
+        if leases is None:
+            # Keep rows decided before the failure, as the per-row commits used to
+            try:
+                writer.flush()
+            except Exception:
+                pass
+        else:
+            # A partition's rows are only committed together with its completion
+            writer.discard()
+        files_detected = counts["files_detected"]
+        files_ingested = writer.inserted
+        files_skipped = counts["files_skipped"]
+        if leases is not None:
+            leases.hold(0)
+            try:
+                release_claims(conn, leases.owner)
+            except Exception:
+                pass
+        try:
+            update_run_end(conn, run_id, end_time, "failure", files_detected, files_ingested, files_skipped, str(e), tb)
+        except Exception:
+            pass
+        _publish_ingest_metrics(
+            conn, run_id, metrics, metrics_textfile, False,
+            {"files_detected": files_detected, "files_ingested": files_ingested, "files_skipped": files_skipped},
+        )
+        events.emit(base, event="run_end", status="failure", end_time=end_time, error=str(e))
+        events.flush()
+        if print_errors:
+            print("Run failed:", e, file=sys.stderr)
+            print(tb, file=sys.stderr)
+        return 2
@@ -1,6 +1,8 @@
 from pathlib import Path
 from typing import List, Tuple
-from .idempotency import compute_checksum
+from .idempotency import compute_checksum, compute_checksum_with_tree, compute_chunk_digests, fingerprint_matches, map_ordered
+from .metrics import NULL_METRICS, RunMetrics
+from .parquet_footer import FooterError, read_footer
 from datetime import datetime, timezone
 import os
 import json
@@ -11,27 +13,89 @@ def utc_now() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def discover_raw_files(raw_root: Path) -> List[Path]:
-    """Discover .parquet files under raw_root, excluding _incoming staging directory."""
+YearMonth = Tuple[int, int]
+
+
+def _partition_value(name: str, key: str) -> Optional[str]:
+    prefix = key + "="
+    return name[len(prefix):] if name.startswith(prefix) else None
+
+
+def _in_range(ym: YearMonth, start: Optional[YearMonth], end: Optional[YearMonth]) -> bool:
+    return (start is None or ym >= start) and (end is None or ym <= end)
+
+
+def discover_raw_files(
+    raw_root: Path,
+    dataset: Optional[str] = None,
+    start: Optional[YearMonth] = None,
+    end: Optional[YearMonth] = None,
+) -> List[Path]:
+    """Discover .parquet files under raw_root, excluding the _incoming, _cas and _superseded directories.
+
+    Walks the tree with os.scandir and understands the canonical
+    `dataset=<name>/year=YYYY/month=MM` partition directories. With `dataset` and/or an
+    inclusive (year, month) `start`/`end`, non-matching partitions are pruned without
+    being listed, and only files inside matching partitions are returned.
+    """
     raw_root = raw_root.resolve()
+    by_date = start is not None or end is not None
     files: List[Path] = []
-    for p in raw_root.rglob("*.parquet"):
-        # Exclude staging directory to prevent ingesting partial/in-progress files
-        if "_incoming" not in p.parts:
-            files.append(p)
+    # (directory, dataset filter satisfied, year partition seen, date filter satisfied)
+    stack: List[Tuple[str, bool, Optional[int], bool]] = [(str(raw_root), dataset is None, None, not by_date)]
+    while stack:
+        dirpath, dataset_ok, year, date_ok = stack.pop()
+        try:
+            it = os.scandir(dirpath)
+        except FileNotFoundError:
+            continue
+        with it:
+            for entry in it:
+                name = entry.name
+                if not entry.is_dir(follow_symlinks=False):
+                    if name.endswith(".parquet") and dataset_ok and date_ok:
+                        files.append(Path(entry.path))
+                    continue
+                # Exclude staging directory to prevent ingesting partial/in-progress files,
+                # the dedup object store (its files are reached through their raw paths)
+                # and versions replaced by `fetch --refresh`
+                if name in ("_incoming", "_cas", "_superseded"):
+                    continue
+                child = (entry.path, dataset_ok, year, date_ok)
+                if dataset is not None:
+                    value = _partition_value(name, "dataset")
+                    if value is not None:
+                        if value != dataset:
+                            continue
+                        child = (entry.path, True, year, date_ok)
+                if by_date:
+                    value = _partition_value(name, "year")
+                    if value is not None:
+                        # Prune whole years outside the range
+                        if not value.isdigit() or not (_in_range((int(value), 12), start, None) and _in_range((int(value), 1), None, end)):
+                            continue
+                        child = (entry.path, child[1], int(value), date_ok)
+                    value = _partition_value(name, "month")
+                    if value is not None:
+                        if year is None or not value.isdigit() or not _in_range((year, int(value)), start, end):
+                            continue
+                        child = (entry.path, child[1], year, True)
+                stack.append(child)
     return sorted(files)
 
 
-def sanity_check_file(path: Path) -> None:
+def sanity_check_file(path: Path) -> os.stat_result:
+    """Apply guardrails and return the file's stat result for fingerprinting."""
     if not path.exists():
         raise FileNotFoundError(path)
     if not path.is_file():
         raise IsADirectoryError(path)
     if path.is_symlink():
         raise RuntimeError("Symlinks are blocked in Sprint 1")
-    size = path.stat().st_size
-    if size == 0:
+    st = path.stat()
+    if st.st_size == 0:
         raise RuntimeError("File is zero bytes")
+    return st
 
 
 def posix_relative(path: Path, raw_root: Path) -> str:
@@ -39,21 +103,77 @@ def posix_relative(path: Path, raw_root: Path) -> str:
     return path.resolve().relative_to(raw_root.resolve()).as_posix()
 
 
-def plan_run(files: List[Path], raw_root: Path) -> List[Tuple[Path, str, int, int]]:
+def plan_run(files: List[Path], raw_root: Path, workers: int = 1) -> List[Tuple[Path, str, int, int]]:
     """Compute checksums and return list of tuples (path, checksum, bytes_hashed, duration_ms)
-    Intended for dry-run planning and for ingestion.
+    Intended for dry-run planning and for ingestion. `workers` > 1 hashes files in parallel;
+    results keep the order of `files`.
     """
-    results = []
-    for p in files:
+
+    def _plan_one(p: Path) -> Tuple[Path, str, int, int]:
         sanity_check_file(p)
         checksum, bytes_hashed, duration_ms = compute_checksum(p)
-        results.append((p, checksum, bytes_hashed, duration_ms))
-    return results
+        return p, checksum, bytes_hashed, duration_ms
 
+    return list(map_ordered(_plan_one, files, workers))
 
-def read_sidecar_source_uri(path: Path) -> Optional[str]:
-    """If an adjacent sidecar `<file>.meta.json` exists, return its `source_uri`.
-    Must not raise: any IO or parse error results in returning None.
+
+def hash_if_changed(
+    path: Path,
+    existing,
+    full_verify: bool = False,
+    chunk_size: Optional[int] = None,
+    chunk_workers: int = 1,
+    metrics: Optional[RunMetrics] = None,
+) -> Tuple[os.stat_result, Optional[Tuple[str, int, int]], Optional[List[str]]]:
+    """Apply guardrails, then hash the file unless its registry row shows it unchanged.
+
+    `existing` is a `get_registry_entry` row or None. Returns (stat, checksum_result,
+    chunk_digests) where checksum_result is None when the stat fingerprint matched and
+    hashing was skipped. A checksum recorded by fetch in the sidecar is used instead of
+    re-reading the file when the sidecar's size and mtime still match (duration_ms is
+    then 0). With `chunk_size`, files not yet in the registry also get chunk-tree
+    digests, hashed on `chunk_workers` threads. Time spent in guardrails, sidecar reads
+    and hashing is recorded in `metrics`.
+    Safe to call from worker threads: it touches only the filesystem.
+    """
+    metrics = metrics or NULL_METRICS
+    with metrics.phase("guardrails"):
+        st = sanity_check_file(path)
+    if existing and not full_verify and fingerprint_matches(existing[2:], st):
+        return st, None, None
+    want_tree = chunk_size is not None and not existing
+    if not full_verify:
+        with metrics.phase("sidecar"):
+            trusted = sidecar_checksum(read_sidecar(path), st)
+        if trusted is not None:
+            digests = None
+            if want_tree:
+                with metrics.phase("hashing", nbytes=st.st_size, observe=True):
+                    tree = compute_chunk_digests(path, chunk_size, chunk_workers)
+                digests = [tree[i] for i in sorted(tree)]
+            return st, (trusted, st.st_size, 0), digests
+    with metrics.phase("hashing", nbytes=st.st_size, observe=True):
+        if want_tree:
+            checksum, bytes_hashed, duration_ms, digests = compute_checksum_with_tree(path, chunk_size, chunk_workers)
+            return st, (checksum, bytes_hashed, duration_ms), digests
+        return st, compute_checksum(path), None
+
+
+def sidecar_checksum(sidecar: Optional[dict], st: os.stat_result) -> Optional[str]:
+    """Return the sidecar's download-time sha256 if the file still has the recorded size and mtime."""
+    if not sidecar:
+        return None
+    checksum = sidecar.get("sha256")
+    if not isinstance(checksum, str) or len(checksum) != 64:
+        return None
+    if sidecar.get("bytes") != st.st_size or sidecar.get("mtime_ns") != st.st_mtime_ns:
+        return None
+    return checksum
+
+
+def read_sidecar(path: Path) -> Optional[dict]:
+    """If an adjacent sidecar `<file>.meta.json` exists, return its parsed contents.
+    Must not raise: any IO or parse error (or a non-object payload) results in returning None.
     """
     try:
         sidecar = path.with_name(path.name + ".meta.json")
@@ -62,6 +182,48 @@ def read_sidecar_source_uri(path: Path) -> Optional[str]:
         # read and parse JSON
         with sidecar.open("r", encoding="utf-8") as fh:
             data = json.load(fh)
-        return data.get("source_uri")
+        return data if isinstance(data, dict) else None
     except Exception:
         return None
+
+
+def attests_supersession(raw_root: Path, sidecar: Optional[dict], checksum: str, previous_checksum: str, max_depth: int = 16) -> bool:
+    """True when fetch's sidecars attest that `checksum` replaced `previous_checksum`.
+
+    `fetch --refresh` names the replaced version in `supersedes_sha256` and keeps it
+    (with its own sidecar) at `superseded_path`, so a file refreshed several times
+    between two ingests is followed back through the archived sidecars.
+    """
+    for _ in range(max_depth):
+        if not sidecar or sidecar.get("sha256") != checksum:
+            return False
+        older = sidecar.get("supersedes_sha256")
+        if not older:
+            return False
+        if older == previous_checksum:
+            return True
+        archived = sidecar.get("superseded_path")
+        if not isinstance(archived, str):
+            return False
+        sidecar, checksum = read_sidecar(raw_root / archived), older
+    return False
+
+
+def read_sidecar_source_uri(path: Path) -> Optional[str]:
+    """If an adjacent sidecar `<file>.meta.json` exists, return its `source_uri`.
+    Must not raise: any IO or parse error results in returning None.
+    """
+    data = read_sidecar(path)
+    return data.get("source_uri") if data else None
+
+
+def read_parquet_footer(path: Path, metrics: Optional[RunMetrics] = None) -> Optional[dict]:
+    """Decode the file's parquet footer with a tail read, or return None if it has none.
+    Must not raise: footer indexing is best-effort and never fails a run.
+    """
+    metrics = metrics or NULL_METRICS
+    with metrics.phase("footer"):
+        try:
+            return read_footer(path)
+        except (FooterError, OSError):
+            return None
@@ -0,0 +1,90 @@
+"""Append-only journal of files committed by fetch.
+
+Every atomic `staging -> final` move in fetch appends one NDJSON line to
+`raw_root/_journal/commits.ndjson`. Ingestion can consume the entries written since its
+last checkpoint (a byte offset stored in the ledger) instead of crawling raw_root.
+Fetch still never touches SQLite; the journal is a plain file next to the raw data.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+JOURNAL_DIR = "_journal"
+JOURNAL_NAME = "commits.ndjson"
+
+_append_lock = threading.Lock()
+
+
+def journal_path(raw_root: Path) -> Path:
+    return raw_root / JOURNAL_DIR / JOURNAL_NAME
+
+
+def append_commit(raw_root: Path, raw_path: str, size: int, sha256: Optional[str], committed_at: str, source_uri: Optional[str] = None) -> None:
+    """Durably append one commit record.
+
+    The line is written with a single O_APPEND write and fsync'd, so concurrent
+    writers never interleave and a record is either fully present or absent.
+    """
+    path = journal_path(raw_root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    record = {
+        "committed_at_utc": committed_at,
+        "raw_path": raw_path,
+        "bytes": size,
+        "sha256": sha256,
+        "source_uri": source_uri,
+    }
+    line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+    with _append_lock:
+        fd = os.open(str(path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def read_since(path: Path, offset: int) -> Tuple[List[dict], int]:
+    """Return (entries, new_offset) for complete lines after byte `offset`.
+
+    A trailing line without its newline (a write in progress) is left for the next read.
+    If the journal is shorter than `offset` it was replaced, and is read from the start.
+    Malformed lines are skipped.
+    """
+    try:
+        size = path.stat().st_size
+    except FileNotFoundError:
+        return [], 0
+    if size < offset:
+        offset = 0
+    entries: List[dict] = []
+    with path.open("rb") as fh:
+        fh.seek(offset)
+        data = fh.read(size - offset)
+    end = data.rfind(b"\n") + 1
+    for raw in data[:end].splitlines():
+        try:
+            entry = json.loads(raw)
+        except ValueError:
+            continue
+        if isinstance(entry, dict) and isinstance(entry.get("raw_path"), str):
+            entries.append(entry)
+    return entries, offset + end
+
+
+def files_since(raw_root: Path, offset: int) -> Tuple[List[Path], int]:
+    """Resolve journal entries after `offset` to existing committed files under raw_root.
+
+    Returns a sorted, de-duplicated file list and the offset to checkpoint once they
+    have been ingested. Entries whose file no longer exists are dropped.
+    """
+    raw_root = raw_root.resolve()
+    entries, new_offset = read_since(journal_path(raw_root), offset)
+    files = set()
+    for entry in entries:
+        p = raw_root / entry["raw_path"]
+        if "_incoming" not in Path(entry["raw_path"]).parts and p.is_file():
+            files.add(p)
+    return sorted(files), new_offset
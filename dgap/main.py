@@ -1,163 +1,359 @@
 import argparse
-from pathlib import Path
-from .ingest_raw import discover_raw_files, plan_run, posix_relative, sanity_check_file, utc_now, read_sidecar_source_uri
-from .metadata import init_db, insert_run_start, update_run_end, insert_file_registry, get_registry_entry
-from .idempotency import compute_checksum
-import uuid
-import traceback
+import signal
 import sys
+import time
+from pathlib import Path
+from typing import Optional, Tuple
 
+from . import journal
+from .events import EventSink
+from .idempotency import available_hash_backends, configure_hashing
+from .ingest import format_dedup_summary, generate_run_id, run_ingest
+from .ingest_raw import discover_raw_files, plan_run, posix_relative, utc_now
+from .metadata import init_db, load_registry_index, peek_journal_checkpoint, load_schema_fingerprints, connect_readonly
+from .metrics import RunMetrics, write_prometheus_textfile
 
-def generate_run_id() -> str:
-    from datetime import datetime, timezone
-
-    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-    suffix = uuid.uuid4().hex[:8]
-    return f"{timestamp}_{suffix}"
-
-
-def format_run_summary(run_record: dict) -> str:
-    duration = "?"
-    if run_record.get("start_time") and run_record.get("end_time"):
-        from datetime import datetime
-
-        start = datetime.fromisoformat(run_record["start_time"])  # type: ignore
-        end = datetime.fromisoformat(run_record["end_time"])  # type: ignore
-        duration = f"{(end - start).total_seconds():.1f}s"
-
-    return (
-        f"{run_record['run_id']} | "
-        f"{run_record['status']} | "
-        f"{run_record['files_detected']} detected, "
-        f"{run_record['files_ingested']} ingested, "
-        f"{run_record['files_skipped']} skipped | "
-        f"{duration}"
-    )
-
-
-def ingest_mode(dry_run: bool, raw_root: Path, db_path: Path) -> int:
-    """Sprint 1 ingestion logic (unchanged behavior)."""
-    run_id = generate_run_id()
-    start_time = utc_now()
 
-    # Discover files
-    files = discover_raw_files(raw_root)
-    files_detected = len(files)
+def parse_year_month(s: str) -> Tuple[int, int]:
+    """Parse `YYYY-MM` into (year, month); the argparse `type` of every --from/--to."""
+    try:
+        y, m = s.split("-")
+        year, month = int(y), int(m)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid month {s!r}, expected YYYY-MM") from None
+    if not 1 <= month <= 12:
+        raise argparse.ArgumentTypeError(f"invalid month {s!r}, month must be 01-12")
+    return year, month
+
+
+def ingest_mode(
+    dry_run: bool,
+    raw_root: Path,
+    db_path: Path,
+    full_verify: bool = False,
+    workers: int = 1,
+    batch_size: int = 500,
+    dataset: Optional[str] = None,
+    from_month: Optional[Tuple[int, int]] = None,
+    to_month: Optional[Tuple[int, int]] = None,
+    from_journal: bool = False,
+    chunk_size: Optional[int] = None,
+    chunk_workers: int = 4,
+    metrics_textfile: Optional[Path] = None,
+    index_footers: bool = True,
+    events: Optional[EventSink] = None,
+    dedup: bool = False,
+    lease_seconds: Optional[float] = None,
+) -> int:
+    """Sprint 1 ingestion logic: one run over raw_root through `api.Ingestor`.
+
+    Files come from discovery, restricted to `dataset` and the inclusive
+    `from_month`/`to_month` partitions, or with `from_journal` from the fetch journal
+    after the ledger's checkpoint. The options are those of `Ingestor`; `dry_run`
+    only reports what would be ingested. Returns 0, or 2 if the run failed.
+    """
+    owns_events = events is None
+    events = events or EventSink(console="text")
+
+    def finish(rc: int) -> int:
+        # Everything emitted must be written before returning (and before stderr output)
+        if owns_events:
+            events.close()
+        else:
+            events.flush()
+        return rc
 
     if dry_run:
-        print(f"[DRY RUN] run_id: {run_id}")
-        print(f"[DRY RUN] Files detected: {files_detected}")
-        plan = plan_run(files, raw_root)
+        run_id = generate_run_id()
+        base = {"action": "ingest", "run_id": run_id}
+        if from_journal:
+            files, _ = journal.files_since(raw_root, peek_journal_checkpoint(db_path, journal.journal_path(raw_root.resolve()).as_posix()))
+        else:
+            files = discover_raw_files(raw_root, dataset, from_month, to_month)
+        events.emit(base, event="dry_run", message=f"[DRY RUN] run_id: {run_id}")
+        events.emit(base, event="detected", files_detected=len(files), message=f"[DRY RUN] Files detected: {len(files)}")
+        plan = plan_run(files, raw_root, workers)
         for p, checksum, bytes_hashed, duration_ms in plan:
             raw_path = posix_relative(p, raw_root)
-            print(f"  ✅ WOULD INGEST: {raw_path}")
-        return 0
+            events.emit(base, event="would_ingest", raw_path=raw_path, checksum_sha256=checksum, bytes=bytes_hashed, message=f"  ✅ WOULD INGEST: {raw_path}")
+        return finish(0)
+
+    from .api import Ingestor
+
+    with Ingestor(
+        raw_root, db_path, workers=workers, batch_size=batch_size, full_verify=full_verify, chunk_size=chunk_size,
+        chunk_workers=chunk_workers, index_footers=index_footers, lease_seconds=lease_seconds, events=events,
+    ) as ingestor:
+        result = ingestor.ingest(
+            dataset=dataset, start=from_month, end=to_month, from_journal=from_journal, dedup=dedup, metrics_textfile=metrics_textfile,
+        )
+    rc = finish(0 if result.ok else 2)
+    if not result.ok:
+        print("Run failed:", result.error, file=sys.stderr)
+        print(result.traceback, file=sys.stderr)
+    return rc
+
+
+def watch_mode(
+    raw_root: Path,
+    db_path: Path,
+    events: EventSink,
+    quiet: float = 1.0,
+    max_delay: float = 10.0,
+    workers: int = 1,
+    batch_size: int = 500,
+    full_verify: bool = False,
+    index_footers: bool = True,
+    metrics_textfile: Optional[Path] = None,
+) -> int:
+    """Register files as they are committed under raw_root, until interrupted.
+
+    One SQLite connection, the registry cache and the schema fingerprints stay warm for
+    the life of the process. Committed files are coalesced by `watch.Debouncer` and each
+    batch is recorded as its own ingestion run. A startup pass (and any inotify queue
+    overflow) falls back to full discovery so nothing committed while down is missed.
+    """
+    from . import watch
 
-    # Normal run: initialize DB and insert run start
     conn = init_db(db_path)
-    insert_run_start(conn, run_id, start_time)
-
-    files_ingested = 0
-    files_skipped = 0
-
+    base = {"action": "watch"}
     try:
-        # compute and process
-        for p in files:
-            sanity_check_file(p)
-            checksum, bytes_hashed, duration_ms = compute_checksum(p)
-            file_size = p.stat().st_size
-            raw_path = posix_relative(p, raw_root)
-
-            existing = get_registry_entry(conn, raw_path)
-            if existing:
-                # existing is (raw_path, checksum_sha256)
-                if existing[1] == checksum:
-                    files_skipped += 1
-                    print(f"SKIPPED: {raw_path}")
-                    continue
+        registry = load_registry_index(conn)
+        schemas = load_schema_fingerprints(conn) if index_footers else {}
+        # Watches go in before the catch-up scan so nothing falls between the two
+        watcher = watch.RawTreeWatcher(raw_root)
+        events.emit(base, event="watching", raw_root=str(raw_root), directories=watcher.directories, message=f"Watching {raw_root} ({watcher.directories} directories)")
+        pending = watch.Debouncer(quiet, max_delay)
+        rescan = True
+        try:
+            while True:
+                now = time.monotonic()
+                if rescan:
+                    for p in discover_raw_files(raw_root):
+                        pending.add(p, now - quiet)  # already committed: no need to wait
+                    rescan = False
                 else:
-                    # collision: same raw_path, different checksum -> fail hard
-                    raise RuntimeError(f"Checksum collision for {raw_path}: existing={existing[1]} new={checksum}")
+                    files, touched, overflow = watcher.poll(pending.timeout(now))
+                    now = time.monotonic()
+                    for p in files:
+                        pending.add(p, now)
+                    for p in touched:
+                        pending.touch(p, now)
+                    if overflow:
+                        events.emit(base, event="overflow", message="inotify queue overflowed; rescanning raw root")
+                        rescan = True
+                        continue
+                batch = [p for p in pending.due(now) if p.is_file()]
+                if not batch:
+                    continue
+                run_id = generate_run_id()
+                rc = run_ingest(
+                    conn, batch, raw_root, run_id, utc_now(), events, RunMetrics(),
+                    registry=registry, schemas=schemas, full_verify=full_verify, workers=workers,
+                    batch_size=batch_size, index_footers=index_footers, metrics_textfile=metrics_textfile,
+                )
+                if rc != 0:
+                    # The cache may hold rows of a batch that was rolled back; resync from the ledger
+                    registry = load_registry_index(conn)
+                    schemas = load_schema_fingerprints(conn) if index_footers else {}
+        finally:
+            watcher.close()
+    except watch.WatchError as e:
+        events.flush()
+        print(f"watch failed: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        events.emit(base, event="stopped", message="Stopped")
+        return 0
+    finally:
+        conn.close()
+
 
-            # Read optional sidecar for source_uri (best-effort, never fails)
-            source_uri = read_sidecar_source_uri(p)
+def verify_mode(args) -> int:
+    """Scrub registered files against their recorded checksums; 1 if any mismatch was found."""
+    from . import verify
 
-            # insert new registry row
-            insert_file_registry(
+    metrics = RunMetrics()
+    conn = init_db(Path(args.db_path))
+    try:
+        with _events_from_args(args, "text") as events:
+            found = verify.run_verify(
                 conn,
-                raw_path,
-                p.name,
-                checksum,
-                file_size,
-                bytes_hashed,
-                duration_ms,
-                source_uri,
-                utc_now(),
-                run_id,
+                Path(args.raw_root),
+                events,
+                name=args.cursor,
+                mb_per_sec=args.max_mbps,
+                iops=args.max_iops,
+                workers=args.workers,
+                sample=args.sample,
+                chunk_sample=args.chunk_sample,
+                max_seconds=args.max_seconds,
+                max_files=args.max_files,
+                loop=args.loop,
+                loop_interval=args.loop_interval,
+                restart=args.restart,
+                metrics=metrics,
             )
-            files_ingested += 1
-
-        end_time = utc_now()
-        update_run_end(conn, run_id, end_time, "success", files_detected, files_ingested, files_skipped)
-
-        # Fetch run record for summary
-        cur = conn.execute("SELECT run_id, start_time, end_time, status, files_detected, files_ingested, files_skipped FROM ingestion_runs WHERE run_id = ?", (run_id,))
-        row = cur.fetchone()
-        if row:
-            run_record = {
-                "run_id": row[0],
-                "start_time": row[1],
-                "end_time": row[2],
-                "status": row[3],
-                "files_detected": row[4],
-                "files_ingested": row[5],
-                "files_skipped": row[6],
-            }
-            print(format_run_summary(run_record))
+    finally:
+        conn.close()
+    if args.metrics_textfile:
+        try:
+            write_prometheus_textfile(Path(args.metrics_textfile), metrics, "verify", True, {"mismatches": found})
+        except Exception as e:
+            print(f"warning: could not write metrics textfile {args.metrics_textfile}: {e}", file=sys.stderr)
+    return 1 if found else 0
 
-        return 0
 
-    except Exception as e:
-        tb = traceback.format_exc()
-        end_time = utc_now()
-        try:
-            update_run_end(conn, run_id, end_time, "failure", files_detected, files_ingested, files_skipped, str(e), tb)
-        except Exception:
-            pass
-        print("Run failed:", e, file=sys.stderr)
-        print(tb, file=sys.stderr)
+def dedup_mode(args) -> int:
+    """Hardlink registered files with identical checksums into the `_cas` store."""
+    from .dedup import dedup_files, prune_cas
+
+    db_path = Path(args.db_path)
+    if not db_path.exists():
+        print(f"Ledger not found: {db_path}", file=sys.stderr)
         return 2
+    conn = init_db(db_path)
+    try:
+        with _events_from_args(args, "text") as events:
+            counts = dedup_files(conn, Path(args.raw_root), events, full_verify=args.full_verify, dry_run=args.dry_run, batch_size=args.batch_size)
+            prefix = "[DRY RUN] " if args.dry_run else ""
+            events.emit({"action": "dedup"}, event="summary", dry_run=args.dry_run, message=prefix + format_dedup_summary(counts), **counts)
+            if args.prune:
+                removed, freed = prune_cas(conn, Path(args.raw_root), events, dry_run=args.dry_run)
+                events.emit({"action": "dedup"}, event="prune_summary", objects=removed, bytes=freed,
+                            message=f"{prefix}pruned {removed} unreferenced objects | {freed / 1e6:.1f} MB")
+    finally:
+        conn.close()
+    return 0
 
 
-def fetch_mode(args) -> int:
-    """Sprint 2 fetch logic: download files into canonical layout."""
-    from . import fetch_raw
+def _events_from_args(args, console: str) -> EventSink:
+    path = Path(args.events_file) if args.events_file else None
+    return EventSink(console=console, path=path, max_bytes=args.events_max_mb * 1024 * 1024, backups=args.events_backups)
+
+
+def _add_event_args(subparser) -> None:
+    subparser.add_argument("--events-file", help="Also append structured events as NDJSON to this file (size-rotated)")
+    subparser.add_argument("--events-max-mb", type=int, default=64, help="Rotate the events file at this size in MiB (default: 64)")
+    subparser.add_argument("--events-backups", type=int, default=5, help="Rotated events files kept (default: 5)")
 
-    raw_root = Path(args.raw_root)
-    dataset = args.dataset
 
+def _add_hash_args(subparser) -> None:
+    subparser.add_argument("--hash-backend", choices=["auto"] + available_hash_backends(), default="auto",
+                           help="How files are read for SHA-256: auto (= readinto), read, readinto (one reused buffer), file_digest, "
+                                "mmap, fadvise (drops hashed pages from the page cache) (default: auto)")
+    subparser.add_argument("--hash-chunk-kb", type=int, help="Read size for checksums in KiB (default: 1024)")
+
+
+def _exit_on_sigterm(signum, frame) -> None:
+    # Turn SIGTERM into SystemExit so finally blocks and atexit handlers (event sink flush) run
+    sys.exit(128 + signum)
+
+
+def _month_range_from_args(args) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    """Inclusive (start, end) months from --year [--month] or --from/--to."""
     if args.year:
         start_year = int(args.year)
         if args.month:
             # Single month: --year YYYY --month M
-            start_month = args.month
-            end_year = start_year
-            end_month = args.month
-        else:
-            # Full year: --year YYYY
-            start_month = 1
-            end_year = start_year
-            end_month = 12
-    else:
-        # Range: --from YYYY-MM --to YYYY-MM
-        def parse_ym(s: str):
-            y, m = s.split("-")
-            return int(y), int(m)
+            return (start_year, args.month), (start_year, args.month)
+        # Full year: --year YYYY
+        return (start_year, 1), (start_year, 12)
+    # Range: --from YYYY-MM --to YYYY-MM
+    return args.from_month, args.to_month
+
+
+def fetch_mode(args) -> int:
+    """Sprint 2 fetch logic: download files into canonical layout."""
+    from .api import Fetcher
+
+    raw_root = Path(args.raw_root)
+    start, end = _month_range_from_args(args)
+
+    with _events_from_args(args, "json") as events, Fetcher(raw_root, concurrency=args.concurrency, events=events) as fetcher:
+        result = fetcher.fetch(args.dataset, start, end, refresh=args.refresh)
+    rc = result.rc
+    if args.metrics_textfile:
+        try:
+            write_prometheus_textfile(Path(args.metrics_textfile), result.metrics, "fetch", rc == 0)
+        except Exception as e:
+            print(f"warning: could not write metrics textfile {args.metrics_textfile}: {e}", file=sys.stderr)
+    return rc
+
+
+def sync_mode(args) -> int:
+    """Fetch a month range and register each file as it lands, as one ingestion run.
+
+    Returns the fetch exit code, or 2 if registration failed.
+    """
+    from .api import Fetcher, Ingestor
 
-        start_year, start_month = parse_ym(args.from_month)
-        end_year, end_month = parse_ym(args.to_month)
+    raw_root = Path(args.raw_root)
+    start, end = _month_range_from_args(args)
+    with _events_from_args(args, "json") as events:
+        with Fetcher(raw_root, concurrency=args.concurrency, events=events) as fetcher, Ingestor(
+            raw_root, Path(args.db_path), workers=args.workers, batch_size=args.batch_size, full_verify=args.full_verify,
+            chunk_size=args.chunk_size_mb * 1024 * 1024 if args.chunk_tree else None, chunk_workers=args.chunk_workers,
+            index_footers=not args.no_footer_index, events=events,
+        ) as ingestor:
+            result = ingestor.sync(
+                fetcher, args.dataset, start, end, refresh=args.refresh, queue_size=args.queue_size,
+                metrics_textfile=Path(args.metrics_textfile) if args.metrics_textfile else None,
+            )
+    if not result.ingest.ok:
+        print("Run failed:", result.ingest.error, file=sys.stderr)
+        print(result.ingest.traceback, file=sys.stderr)
+        return 2
+    return result.fetch.rc
 
-    return fetch_raw.fetch_range(raw_root, dataset, start_year, start_month, end_year, end_month)
+
+def scan_mode(args) -> int:
+    """Resolve files for a dataset/month range/predicates from the ledger and read them."""
+    from . import scan
+
+    db_path = Path(args.db_path)
+    if not db_path.exists():
+        print(f"Ledger not found: {db_path}", file=sys.stderr)
+        return 2
+    try:
+        predicates = [scan.parse_predicate(p) for p in args.where]
+        columns = [c.strip() for c in args.columns.split(",") if c.strip()] if args.columns else None
+        conn = connect_readonly(db_path)
+        try:
+            files = scan.resolve_files(conn, Path(args.raw_root), args.dataset, args.from_month, args.to_month, predicates)
+        finally:
+            conn.close()
+
+        if args.format == "files":
+            for f in files:
+                print(f.raw_path)
+            return 0
+        if args.format == "count" and not predicates and all(f.num_rows is not None for f in files):
+            # Answered from the footer index alone; no file is opened
+            print(sum(f.num_rows for f in files))
+            return 0
+
+        # Fail with the install hint before anything is read, not on the csv import
+        scan._require_pyarrow()
+        batches = scan.iter_batches(files, columns, predicates, args.workers, args.batch_rows)
+        if args.format == "count":
+            print(sum(b.num_rows for b in batches))
+            return 0
+        import pyarrow.csv
+
+        writer = None
+        try:
+            for batch in batches:
+                if writer is None:
+                    writer = pyarrow.csv.CSVWriter(sys.stdout.buffer, batch.schema)
+                writer.write_batch(batch)
+        finally:
+            if writer is not None:
+                writer.close()
+        return 0
+    except scan.ScanError as e:
+        print(f"scan failed: {e}", file=sys.stderr)
+        return 2
 
 
 if __name__ == "__main__":
@@ -169,26 +365,182 @@ if __name__ == "__main__":
     fetch_parser.add_argument("--dataset", required=True, help="Dataset name (e.g. yellow_tripdata)")
     fetch_parser.add_argument("--year", help="Fetch all 12 months for YYYY")
     fetch_parser.add_argument("--month", type=int, help="Single month (1-12), use with --year")
-    fetch_parser.add_argument("--from", dest="from_month", help="Start month YYYY-MM (inclusive)")
-    fetch_parser.add_argument("--to", dest="to_month", help="End month YYYY-MM (inclusive)")
+    fetch_parser.add_argument("--from", dest="from_month", type=parse_year_month, help="Start month YYYY-MM (inclusive)")
+    fetch_parser.add_argument("--to", dest="to_month", type=parse_year_month, help="End month YYYY-MM (inclusive)")
     fetch_parser.add_argument("--raw-root", required=True, help="Raw root folder path")
+    fetch_parser.add_argument("--concurrency", type=int, default=1, help="Months downloaded at once over pooled keep-alive connections (default: 1)")
+    fetch_parser.add_argument("--refresh", action="store_true", help="Re-validate months already on disk with conditional requests and replace those that changed upstream")
+    fetch_parser.add_argument("--metrics-textfile", help="Write run metrics to this file for the Prometheus textfile collector")
+    _add_event_args(fetch_parser)
+
+    # sync subcommand
+    sync_parser = subparsers.add_parser("sync", help="Fetch a month range and register each file as it lands (one ingestion run)")
+    sync_parser.add_argument("--dataset", required=True, help="Dataset name (e.g. yellow_tripdata)")
+    sync_parser.add_argument("--year", help="Sync all 12 months for YYYY")
+    sync_parser.add_argument("--month", type=int, help="Single month (1-12), use with --year")
+    sync_parser.add_argument("--from", dest="from_month", type=parse_year_month, help="Start month YYYY-MM (inclusive)")
+    sync_parser.add_argument("--to", dest="to_month", type=parse_year_month, help="End month YYYY-MM (inclusive)")
+    sync_parser.add_argument("--raw-root", default="data/raw", help="Raw root folder (default: data/raw)")
+    sync_parser.add_argument("--db-path", default="data/ledger.db", help="SQLite DB path (default: data/ledger.db)")
+    sync_parser.add_argument("--concurrency", type=int, default=1, help="Months downloaded at once (default: 1)")
+    sync_parser.add_argument("--queue-size", type=int, default=4, help="Landed files waiting for registration before downloads pause (default: 4)")
+    sync_parser.add_argument("--refresh", action="store_true", help="Re-validate months already on disk and replace those that changed upstream")
+    sync_parser.add_argument("--workers", type=int, default=1, help="Files hashed in parallel (default: 1)")
+    sync_parser.add_argument("--batch-size", type=int, default=1, help="Registry rows written per transaction (default: 1, i.e. each file as it lands)")
+    sync_parser.add_argument("--full-verify", action="store_true", help="Re-hash every file instead of trusting stat fingerprints and download-time checksums")
+    sync_parser.add_argument("--chunk-tree", action="store_true", help="Also record per-chunk SHA-256 digests and a root hash for new files")
+    sync_parser.add_argument("--chunk-size-mb", type=int, default=8, help="Chunk size for --chunk-tree in MiB (default: 8)")
+    sync_parser.add_argument("--chunk-workers", type=int, default=4, help="Threads hashing chunks of one file for --chunk-tree (default: 4)")
+    sync_parser.add_argument("--no-footer-index", action="store_true", help="Do not index parquet footers of new files")
+    sync_parser.add_argument("--metrics-textfile", help="Write run metrics to this file for the Prometheus textfile collector")
+    _add_hash_args(sync_parser)
+    _add_event_args(sync_parser)
 
     # ingest subcommand
     ingest_parser = subparsers.add_parser("ingest", help="Ingest raw files into ledger (Sprint 1)")
     ingest_parser.add_argument("--dry-run", action="store_true", help="Do not write DB; show plan")
     ingest_parser.add_argument("--raw-root", default="data/raw", help="Raw root folder (default: data/raw)")
     ingest_parser.add_argument("--db-path", default="data/ledger.db", help="SQLite DB path (default: data/ledger.db)")
+    ingest_parser.add_argument("--full-verify", action="store_true", help="Re-hash every file even when its stat fingerprint is unchanged")
+    ingest_parser.add_argument("--workers", type=int, default=1, help="Files hashed in parallel (default: 1)")
+    ingest_parser.add_argument("--batch-size", type=int, default=500, help="Registry rows written per transaction (default: 500)")
+    ingest_parser.add_argument("--dataset", help="Only ingest partitions of this dataset (e.g. yellow_tripdata)")
+    ingest_parser.add_argument("--from", dest="from_month", type=parse_year_month, help="Only ingest partitions from YYYY-MM (inclusive)")
+    ingest_parser.add_argument("--to", dest="to_month", type=parse_year_month, help="Only ingest partitions up to YYYY-MM (inclusive)")
+    ingest_parser.add_argument("--chunk-tree", action="store_true", help="Also record per-chunk SHA-256 digests and a root hash for new files")
+    ingest_parser.add_argument("--chunk-size-mb", type=int, default=8, help="Chunk size for --chunk-tree in MiB (default: 8)")
+    ingest_parser.add_argument("--chunk-workers", type=int, default=4, help="Threads hashing chunks of one file for --chunk-tree (default: 4)")
+    ingest_parser.add_argument("--metrics-textfile", help="Write run metrics to this file for the Prometheus textfile collector")
+    ingest_parser.add_argument("--from-journal", action="store_true", help="Ingest only files committed by fetch since the last journal checkpoint (no scan)")
+    ingest_parser.add_argument("--no-footer-index", action="store_true", help="Do not index parquet footers (row counts, schema, column min/max) of new files")
+    ingest_parser.add_argument("--claim-partitions", action="store_true", help="Share the raw root with other ingest processes: ingest only partitions this process leases")
+    ingest_parser.add_argument("--lease-seconds", type=float, default=60, help="Partition lease length for --claim-partitions; renewed every third of it (default: 60)")
+    ingest_parser.add_argument("--dedup", action="store_true", help="After a successful run, hardlink new files that duplicate registered content (see `dedup`)")
+    _add_hash_args(ingest_parser)
+    _add_event_args(ingest_parser)
+
+    # watch subcommand
+    watch_parser = subparsers.add_parser("watch", help="Ingest files as fetch commits them (Linux inotify)")
+    watch_parser.add_argument("--raw-root", default="data/raw", help="Raw root folder (default: data/raw)")
+    watch_parser.add_argument("--db-path", default="data/ledger.db", help="SQLite DB path (default: data/ledger.db)")
+    watch_parser.add_argument("--debounce-ms", type=int, default=1000, help="Ingest once no new file arrived for this long (default: 1000)")
+    watch_parser.add_argument("--max-delay-ms", type=int, default=10000, help="Upper bound on how long a burst can hold a file back (default: 10000)")
+    watch_parser.add_argument("--workers", type=int, default=1, help="Files hashed in parallel per batch (default: 1)")
+    watch_parser.add_argument("--batch-size", type=int, default=500, help="Registry rows written per transaction (default: 500)")
+    watch_parser.add_argument("--full-verify", action="store_true", help="Re-hash files even when their stat fingerprint is unchanged")
+    watch_parser.add_argument("--no-footer-index", action="store_true", help="Do not index parquet footers of new files")
+    watch_parser.add_argument("--metrics-textfile", help="Rewrite this Prometheus textfile after every batch")
+    _add_hash_args(watch_parser)
+    _add_event_args(watch_parser)
+
+    # verify subcommand
+    verify_parser = subparsers.add_parser("verify", help="Re-hash registered files (throttled, resumable) and record mismatches")
+    verify_parser.add_argument("--raw-root", default="data/raw", help="Raw root folder (default: data/raw)")
+    verify_parser.add_argument("--db-path", default="data/ledger.db", help="SQLite DB path (default: data/ledger.db)")
+    verify_parser.add_argument("--max-mbps", type=float, help="Read bandwidth cap in MiB/s across all workers (default: unlimited)")
+    verify_parser.add_argument("--max-iops", type=float, help="Read operations per second cap across all workers (default: unlimited)")
+    verify_parser.add_argument("--workers", type=int, default=1, help="Files verified in parallel (default: 1)")
+    verify_parser.add_argument("--sample", type=float, default=1.0, help="Fraction of files checked per pass, e.g. 0.05 (default: 1.0)")
+    verify_parser.add_argument("--chunk-sample", type=int, default=0, help="For files with a chunk tree, re-hash only this many random chunks (default: 0 = whole file)")
+    verify_parser.add_argument("--max-seconds", type=float, help="Stop after this long; the cursor resumes next time")
+    verify_parser.add_argument("--max-files", type=int, help="Stop after checking this many files; the cursor resumes next time")
+    verify_parser.add_argument("--loop", action="store_true", help="Start the next pass when one completes (continuous scrub)")
+    verify_parser.add_argument("--loop-interval", type=float, default=60.0, help="With --loop, minimum seconds from one pass start to the next (default: 60)")
+    verify_parser.add_argument("--cursor", default="default", help="Name of the persisted cursor (default: default)")
+    verify_parser.add_argument("--restart", action="store_true", help="Discard the saved position and start a new pass")
+    verify_parser.add_argument("--metrics-textfile", help="Write scrub metrics to this file for the Prometheus textfile collector")
+    _add_hash_args(verify_parser)
+    _add_event_args(verify_parser)
+
+    # dedup subcommand
+    dedup_parser = subparsers.add_parser("dedup", help="Replace registered files with identical checksums by hardlinks to one stored copy")
+    dedup_parser.add_argument("--raw-root", default="data/raw", help="Raw root folder (default: data/raw)")
+    dedup_parser.add_argument("--db-path", default="data/ledger.db", help="SQLite DB path (default: data/ledger.db)")
+    dedup_parser.add_argument("--dry-run", action="store_true", help="Report what would be linked and reclaimed; change nothing")
+    dedup_parser.add_argument("--full-verify", action="store_true", help="Re-hash each file before linking instead of trusting its stat fingerprint")
+    dedup_parser.add_argument("--prune", action="store_true", help="Also delete store objects no raw path links to any more")
+    dedup_parser.add_argument("--batch-size", type=int, default=500, help="Registry rows written per transaction (default: 500)")
+    _add_hash_args(dedup_parser)
+    _add_event_args(dedup_parser)
+
+    # scan subcommand
+    scan_parser = subparsers.add_parser("scan", help="Read a dataset via the ledger, pruning partitions and files by footer stats")
+    scan_parser.add_argument("--dataset", required=True, help="Dataset name (e.g. yellow_tripdata)")
+    scan_parser.add_argument("--from", dest="from_month", type=parse_year_month, help="First month YYYY-MM (inclusive)")
+    scan_parser.add_argument("--to", dest="to_month", type=parse_year_month, help="Last month YYYY-MM (inclusive)")
+    scan_parser.add_argument("--where", action="append", default=[], help="Column predicate, e.g. 'tpep_pickup_datetime>=2024-01-15' (repeatable, ANDed)")
+    scan_parser.add_argument("--columns", help="Comma-separated columns to return (default: all)")
+    scan_parser.add_argument("--format", choices=["files", "count", "csv"], default="files", help="files: matching raw paths (no pyarrow needed); count: matching rows; csv: rows to stdout")
+    scan_parser.add_argument("--raw-root", default="data/raw", help="Raw root folder (default: data/raw)")
+    scan_parser.add_argument("--db-path", default="data/ledger.db", help="SQLite DB path (default: data/ledger.db)")
+    scan_parser.add_argument("--workers", type=int, default=4, help="Files read in parallel (default: 4)")
+    scan_parser.add_argument("--batch-rows", type=int, default=65536, help="Rows per record batch (default: 65536)")
 
     args = parser.parse_args()
-
-    if args.command == "fetch":
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    if getattr(args, "hash_backend", None):
+        if args.hash_chunk_kb is not None and args.hash_chunk_kb <= 0:
+            parser.error("--hash-chunk-kb must be positive")
+        configure_hashing(args.hash_backend, args.hash_chunk_kb * 1024 if args.hash_chunk_kb else None)
+
+    if args.command == "ingest" and args.from_journal and (args.dataset or args.from_month or args.to_month):
+        parser.error("--from-journal cannot be combined with --dataset/--from/--to")
+    if args.command == "ingest" and args.claim_partitions and (args.from_journal or args.dry_run):
+        parser.error("--claim-partitions cannot be combined with --from-journal or --dry-run")
+
+    if args.command in ("fetch", "sync"):
         if not args.year and not (args.from_month and args.to_month):
-            parser.error("fetch requires --year [--month M] or both --from and --to")
+            parser.error(f"{args.command} requires --year [--month M] or both --from and --to")
         if args.month and not args.year:
             parser.error("--month requires --year")
+
+    if args.command == "fetch":
         rc = fetch_mode(args)
+    elif args.command == "sync":
+        rc = sync_mode(args)
+    elif args.command == "watch":
+        with _events_from_args(args, "text") as events:
+            rc = watch_mode(
+                Path(args.raw_root),
+                Path(args.db_path),
+                events,
+                quiet=args.debounce_ms / 1000,
+                max_delay=args.max_delay_ms / 1000,
+                workers=args.workers,
+                batch_size=args.batch_size,
+                full_verify=args.full_verify,
+                index_footers=not args.no_footer_index,
+                metrics_textfile=Path(args.metrics_textfile) if args.metrics_textfile else None,
+            )
+    elif args.command == "verify":
+        if not 0 < args.sample <= 1:
+            parser.error("--sample must be in (0, 1]")
+        rc = verify_mode(args)
+    elif args.command == "dedup":
+        rc = dedup_mode(args)
+    elif args.command == "scan":
+        rc = scan_mode(args)
     elif args.command == "ingest":
-        rc = ingest_mode(dry_run=args.dry_run, raw_root=Path(args.raw_root), db_path=Path(args.db_path))
+        with _events_from_args(args, "text") as events:
+            rc = ingest_mode(
+                dry_run=args.dry_run,
+                raw_root=Path(args.raw_root),
+                db_path=Path(args.db_path),
+                full_verify=args.full_verify,
+                workers=args.workers,
+                batch_size=args.batch_size,
+                dataset=args.dataset,
+                from_month=args.from_month,
+                to_month=args.to_month,
+                from_journal=args.from_journal,
+                chunk_size=args.chunk_size_mb * 1024 * 1024 if args.chunk_tree else None,
+                chunk_workers=args.chunk_workers,
+                metrics_textfile=Path(args.metrics_textfile) if args.metrics_textfile else None,
+                index_footers=not args.no_footer_index,
+                events=events,
+                dedup=args.dedup,
+                lease_seconds=args.lease_seconds if args.claim_partitions else None,
+            )
     else:
         parser.print_help()
         rc = 1
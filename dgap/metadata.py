@@ -1,6 +1,12 @@
+import json
 import sqlite3
+import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .metrics import NULL_METRICS, RunMetrics
+from .parquet_footer import stat_to_text, value_kind
 
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS ingestion_runs (
@@ -25,14 +31,161 @@ CREATE TABLE IF NOT EXISTS file_registry (
     source_uri TEXT,
     first_seen_at TEXT NOT NULL,
     first_ingestion_run_id TEXT NOT NULL,
+    mtime_ns INTEGER,
+    inode INTEGER,
+    device INTEGER,
     CONSTRAINT bytes_match CHECK (bytes_hashed = file_size_bytes),
     FOREIGN KEY (first_ingestion_run_id) REFERENCES ingestion_runs(run_id)
 );
 
 CREATE INDEX IF NOT EXISTS idx_checksum ON file_registry(checksum_sha256);
 CREATE INDEX IF NOT EXISTS idx_file_name ON file_registry(file_name);
+
+CREATE TABLE IF NOT EXISTS chunk_trees (
+    raw_path TEXT PRIMARY KEY,
+    chunk_size INTEGER NOT NULL,
+    chunk_count INTEGER NOT NULL,
+    root_sha256 TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    FOREIGN KEY (raw_path) REFERENCES file_registry(raw_path)
+);
+
+CREATE TABLE IF NOT EXISTS chunk_digests (
+    raw_path TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    PRIMARY KEY (raw_path, chunk_index),
+    FOREIGN KEY (raw_path) REFERENCES chunk_trees(raw_path)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS run_phase_metrics (
+    run_id TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    event_count INTEGER NOT NULL,
+    total_ms REAL NOT NULL,
+    bytes INTEGER NOT NULL,
+    latency_histogram TEXT,
+    PRIMARY KEY (run_id, phase),
+    FOREIGN KEY (run_id) REFERENCES ingestion_runs(run_id)
+);
+
+CREATE TABLE IF NOT EXISTS journal_checkpoints (
+    journal_path TEXT PRIMARY KEY,
+    byte_offset INTEGER NOT NULL,
+    updated_at TEXT NOT NULL,
+    ingestion_run_id TEXT,
+    FOREIGN KEY (ingestion_run_id) REFERENCES ingestion_runs(run_id)
+);
+
+CREATE TABLE IF NOT EXISTS parquet_footers (
+    raw_path TEXT PRIMARY KEY,
+    num_rows INTEGER NOT NULL,
+    num_row_groups INTEGER NOT NULL,
+    num_columns INTEGER NOT NULL,
+    schema_fingerprint TEXT NOT NULL,
+    schema_json TEXT NOT NULL,
+    created_by TEXT,
+    footer_bytes INTEGER NOT NULL,
+    indexed_at TEXT NOT NULL,
+    FOREIGN KEY (raw_path) REFERENCES file_registry(raw_path)
+);
+CREATE INDEX IF NOT EXISTS idx_schema_fingerprint ON parquet_footers(schema_fingerprint);
+
+CREATE TABLE IF NOT EXISTS parquet_column_stats (
+    raw_path TEXT NOT NULL,
+    column_name TEXT NOT NULL,
+    physical_type TEXT NOT NULL,
+    logical_type TEXT,
+    value_kind TEXT,
+    min_value TEXT,
+    max_value TEXT,
+    null_count INTEGER,
+    PRIMARY KEY (raw_path, column_name),
+    FOREIGN KEY (raw_path) REFERENCES parquet_footers(raw_path)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS verify_cursors (
+    name TEXT PRIMARY KEY,
+    pass_id TEXT NOT NULL,
+    pass_started_at TEXT NOT NULL,
+    last_raw_path TEXT,
+    updated_at TEXT NOT NULL,
+    files_checked INTEGER NOT NULL,
+    bytes_checked INTEGER NOT NULL,
+    mismatches INTEGER NOT NULL,
+    passes_completed INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS verify_mismatches (
+    mismatch_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    raw_path TEXT NOT NULL,
+    detected_at TEXT NOT NULL,
+    pass_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    expected_sha256 TEXT,
+    actual_sha256 TEXT,
+    expected_bytes INTEGER,
+    actual_bytes INTEGER,
+    detail TEXT,
+    FOREIGN KEY (raw_path) REFERENCES file_registry(raw_path)
+);
+CREATE INDEX IF NOT EXISTS idx_verify_mismatches_path ON verify_mismatches(raw_path);
+
+CREATE TABLE IF NOT EXISTS file_aliases (
+    raw_path TEXT PRIMARY KEY,
+    checksum_sha256 TEXT NOT NULL,
+    cas_path TEXT NOT NULL,
+    linked_at TEXT NOT NULL,
+    FOREIGN KEY (raw_path) REFERENCES file_registry(raw_path)
+);
+CREATE INDEX IF NOT EXISTS idx_file_aliases_cas ON file_aliases(cas_path);
+
+CREATE TABLE IF NOT EXISTS file_revisions (
+    revision_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    raw_path TEXT NOT NULL,
+    previous_sha256 TEXT NOT NULL,
+    previous_size_bytes INTEGER NOT NULL,
+    new_sha256 TEXT NOT NULL,
+    new_size_bytes INTEGER NOT NULL,
+    superseded_path TEXT,
+    superseded_at TEXT NOT NULL,
+    ingestion_run_id TEXT NOT NULL,
+    FOREIGN KEY (raw_path) REFERENCES file_registry(raw_path),
+    FOREIGN KEY (ingestion_run_id) REFERENCES ingestion_runs(run_id)
+);
+CREATE INDEX IF NOT EXISTS idx_file_revisions_path ON file_revisions(raw_path);
+
+CREATE TABLE IF NOT EXISTS partition_claims (
+    partition TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    ingestion_run_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    claimed_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    completed_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 1
+);
 """
 
+# Columns added after a table was first shipped. CREATE TABLE IF NOT EXISTS leaves
+# existing ledgers untouched, so init_db adds any of these that are missing.
+COLUMN_MIGRATIONS = {
+    "file_registry": [
+        ("mtime_ns", "INTEGER"),
+        ("inode", "INTEGER"),
+        ("device", "INTEGER"),
+    ],
+}
+
+
+def _apply_column_migrations(conn: sqlite3.Connection) -> None:
+    for table, columns in COLUMN_MIGRATIONS.items():
+        present = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for name, decl in columns:
+            if name not in present:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
 
 def init_db(db_path: Path) -> sqlite3.Connection:
     db_path.parent.mkdir(parents=True, exist_ok=True)
@@ -42,6 +195,7 @@ def init_db(db_path: Path) -> sqlite3.Connection:
     conn.execute("PRAGMA foreign_keys=ON;")
     cursor = conn.cursor()
     cursor.executescript(SCHEMA)
+    _apply_column_migrations(conn)
     conn.commit()
     return conn
 
@@ -84,14 +238,472 @@ def insert_file_registry(
     source_uri: Optional[str],
     first_seen_at: str,
     first_ingestion_run_id: str,
+    mtime_ns: Optional[int] = None,
+    inode: Optional[int] = None,
+    device: Optional[int] = None,
 ) -> None:
     conn.execute(
-        "INSERT INTO file_registry (raw_path, file_name, checksum_sha256, file_size_bytes, bytes_hashed, checksum_duration_ms, source_uri, first_seen_at, first_ingestion_run_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-        (raw_path, file_name, checksum_sha256, file_size_bytes, bytes_hashed, checksum_duration_ms, source_uri, first_seen_at, first_ingestion_run_id),
+        "INSERT INTO file_registry (raw_path, file_name, checksum_sha256, file_size_bytes, bytes_hashed, checksum_duration_ms, source_uri, first_seen_at, first_ingestion_run_id, mtime_ns, inode, device) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (raw_path, file_name, checksum_sha256, file_size_bytes, bytes_hashed, checksum_duration_ms, source_uri, first_seen_at, first_ingestion_run_id, mtime_ns, inode, device),
     )
     conn.commit()
 
 
+def update_registry_fingerprint(conn: sqlite3.Connection, raw_path: str, mtime_ns: int, inode: int, device: int) -> None:
+    """Refresh the stat fingerprint of a row whose checksum was just re-confirmed."""
+    conn.execute(
+        "UPDATE file_registry SET mtime_ns = ?, inode = ?, device = ? WHERE raw_path = ?",
+        (mtime_ns, inode, device, raw_path),
+    )
+    conn.commit()
+
+
+REGISTRY_ENTRY_COLUMNS = "raw_path, checksum_sha256, file_size_bytes, mtime_ns, inode, device"
+
+
 def get_registry_entry(conn: sqlite3.Connection, raw_path: str):
-    cur = conn.execute("SELECT raw_path, checksum_sha256 FROM file_registry WHERE raw_path = ?", (raw_path,))
+    """Return (raw_path, checksum_sha256, file_size_bytes, mtime_ns, inode, device) or None."""
+    cur = conn.execute(
+        f"SELECT {REGISTRY_ENTRY_COLUMNS} FROM file_registry WHERE raw_path = ?",
+        (raw_path,),
+    )
     return cur.fetchone()
+
+
+def load_registry_index(conn: sqlite3.Connection) -> Dict[str, tuple]:
+    """Load every registry row once, keyed by raw_path, in `get_registry_entry`'s shape.
+
+    Replaces one SELECT per discovered file with a single scan per run.
+    """
+    return {row[0]: row for row in conn.execute(f"SELECT {REGISTRY_ENTRY_COLUMNS} FROM file_registry")}
+
+
+class RegistryWriter:
+    """Buffer file_registry writes and apply them with executemany, one transaction per batch.
+
+    Rows are only ever committed whole batches at a time, so a crash loses at most the
+    un-flushed tail; the run's `ingestion_runs` row stays in its initial failure state
+    and the next run re-registers those files. `inserted` counts committed inserts.
+    Without `auto_flush`, rows are written only by explicit `flush` calls.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, batch_size: int = 500, metrics: Optional[RunMetrics] = None, auto_flush: bool = True):
+        self.conn = conn
+        self.batch_size = max(1, batch_size)
+        self.metrics = metrics or NULL_METRICS
+        self.auto_flush = auto_flush
+        self.inserted = 0
+        self._inserts: List[tuple] = []
+        self._fingerprints: List[Tuple[int, int, int, str]] = []
+        self._trees: List[Tuple[str, int, int, str, str]] = []
+        self._chunks: List[Tuple[str, int, str]] = []
+        self._footers: List[tuple] = []
+        self._column_stats: List[tuple] = []
+        self._aliases: List[Tuple[str, str, str, str]] = []
+        self._replacements: List[tuple] = []
+        self._revisions: List[tuple] = []
+
+    def insert(
+        self,
+        raw_path: str,
+        file_name: str,
+        checksum_sha256: str,
+        file_size_bytes: int,
+        bytes_hashed: int,
+        checksum_duration_ms: int,
+        source_uri: Optional[str],
+        first_seen_at: str,
+        first_ingestion_run_id: str,
+        mtime_ns: Optional[int] = None,
+        inode: Optional[int] = None,
+        device: Optional[int] = None,
+    ) -> None:
+        self._inserts.append(
+            (raw_path, file_name, checksum_sha256, file_size_bytes, bytes_hashed, checksum_duration_ms, source_uri, first_seen_at, first_ingestion_run_id, mtime_ns, inode, device)
+        )
+        self._maybe_flush()
+
+    def update_fingerprint(self, raw_path: str, mtime_ns: int, inode: int, device: int) -> None:
+        self._fingerprints.append((mtime_ns, inode, device, raw_path))
+        self._maybe_flush()
+
+    def supersede(
+        self,
+        raw_path: str,
+        checksum_sha256: str,
+        file_size_bytes: int,
+        bytes_hashed: int,
+        checksum_duration_ms: int,
+        source_uri: Optional[str],
+        mtime_ns: int,
+        inode: int,
+        device: int,
+        previous_sha256: str,
+        previous_size_bytes: int,
+        superseded_path: Optional[str],
+        superseded_at: str,
+        ingestion_run_id: str,
+    ) -> None:
+        """Queue the replacement of a registered file's content by a newer upstream version.
+
+        The registry row takes the new checksum, size and fingerprint (`first_seen_at`
+        and `first_ingestion_run_id` are kept) and a `file_revisions` row records the
+        change. The path's chunk tree, footer and dedup alias describe the old content
+        and are dropped; a footer for the new content can be queued with `add_footer`.
+        """
+        self._replacements.append(
+            (checksum_sha256, file_size_bytes, bytes_hashed, checksum_duration_ms, source_uri, mtime_ns, inode, device, raw_path)
+        )
+        self._revisions.append(
+            (raw_path, previous_sha256, previous_size_bytes, checksum_sha256, file_size_bytes, superseded_path, superseded_at, ingestion_run_id)
+        )
+        self._maybe_flush()
+
+    def add_chunk_tree(self, raw_path: str, chunk_size: int, root_sha256: str, chunk_digests: List[str], created_at: str) -> None:
+        """Queue a chunk tree; written after the batch's registry rows it refers to."""
+        self._trees.append((raw_path, chunk_size, len(chunk_digests), root_sha256, created_at))
+        self._chunks.extend((raw_path, i, digest) for i, digest in enumerate(chunk_digests))
+        self._maybe_flush()
+
+    def add_footer(self, raw_path: str, footer: dict, indexed_at: str) -> None:
+        """Queue a decoded parquet footer (see parquet_footer.parse_footer) for a registered file."""
+        self._footers.append((
+            raw_path,
+            footer["num_rows"],
+            footer["num_row_groups"],
+            len(footer["columns"]),
+            footer["schema_fingerprint"],
+            json.dumps(footer["schema"], separators=(",", ":")),
+            footer["created_by"],
+            footer["footer_bytes"],
+            indexed_at,
+        ))
+        for name, col in footer["columns"].items():
+            self._column_stats.append((
+                raw_path,
+                name,
+                col["physical_type"],
+                col["logical_type"],
+                value_kind(col["min"]),
+                stat_to_text(col["min"]),
+                stat_to_text(col["max"]),
+                col["null_count"],
+            ))
+        self._maybe_flush()
+
+    def add_alias(self, raw_path: str, checksum_sha256: str, cas_path: str, linked_at: str) -> None:
+        """Queue a file_aliases row: `raw_path` is a hardlink to the CAS object `cas_path`."""
+        self._aliases.append((raw_path, checksum_sha256, cas_path, linked_at))
+        self._maybe_flush()
+
+    @property
+    def pending(self) -> int:
+        return len(self._inserts) + len(self._fingerprints) + len(self._replacements) + len(self._trees) + len(self._footers) + len(self._aliases)
+
+    def _buffers(self) -> List[list]:
+        return [self._inserts, self._fingerprints, self._trees, self._chunks, self._footers, self._column_stats, self._aliases, self._replacements, self._revisions]
+
+    def mark(self) -> Tuple[int, ...]:
+        """Position in the buffers, for `discard`ing rows queued after it."""
+        return tuple(len(buf) for buf in self._buffers())
+
+    def discard(self, mark: Optional[Tuple[int, ...]] = None) -> None:
+        """Drop rows queued since `mark` (default: all buffered rows) without writing them."""
+        buffers = self._buffers()
+        for buf, keep in zip(buffers, mark or (0,) * len(buffers)):
+            del buf[keep:]
+
+    def _maybe_flush(self) -> None:
+        if self.auto_flush and self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self, before_commit: Optional[Callable[[], None]] = None) -> None:
+        """Write all buffered rows in one transaction; on error nothing from the batch is kept.
+
+        `before_commit` runs last inside the transaction (even with nothing buffered); if
+        it raises, the batch is rolled back and dropped.
+        """
+        if not self.pending and before_commit is None:
+            return
+        start = time.perf_counter_ns()
+        rows = self.pending
+        try:
+            with self.conn:
+                if self._inserts:
+                    self.conn.executemany(
+                        "INSERT INTO file_registry (raw_path, file_name, checksum_sha256, file_size_bytes, bytes_hashed, checksum_duration_ms, source_uri, first_seen_at, first_ingestion_run_id, mtime_ns, inode, device) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        self._inserts,
+                    )
+                if self._fingerprints:
+                    self.conn.executemany(
+                        "UPDATE file_registry SET mtime_ns = ?, inode = ?, device = ? WHERE raw_path = ?",
+                        self._fingerprints,
+                    )
+                if self._replacements:
+                    paths = [(r[0],) for r in self._revisions]
+                    self.conn.executemany(
+                        "UPDATE file_registry SET checksum_sha256 = ?, file_size_bytes = ?, bytes_hashed = ?, checksum_duration_ms = ?, "
+                        "source_uri = COALESCE(?, source_uri), mtime_ns = ?, inode = ?, device = ? WHERE raw_path = ?",
+                        self._replacements,
+                    )
+                    self.conn.executemany(
+                        "INSERT INTO file_revisions (raw_path, previous_sha256, previous_size_bytes, new_sha256, new_size_bytes, superseded_path, superseded_at, ingestion_run_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        self._revisions,
+                    )
+                    self.conn.executemany("DELETE FROM chunk_digests WHERE raw_path = ?", paths)
+                    self.conn.executemany("DELETE FROM chunk_trees WHERE raw_path = ?", paths)
+                    self.conn.executemany("DELETE FROM file_aliases WHERE raw_path = ?", paths)
+                    self.conn.executemany("DELETE FROM parquet_column_stats WHERE raw_path = ?", paths)
+                    self.conn.executemany("DELETE FROM parquet_footers WHERE raw_path = ?", paths)
+                if self._trees:
+                    # Replace any previous tree: children first to satisfy the foreign key
+                    self.conn.executemany("DELETE FROM chunk_digests WHERE raw_path = ?", [(t[0],) for t in self._trees])
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO chunk_trees (raw_path, chunk_size, chunk_count, root_sha256, created_at) VALUES (?, ?, ?, ?, ?)",
+                        self._trees,
+                    )
+                    self.conn.executemany("INSERT INTO chunk_digests (raw_path, chunk_index, sha256) VALUES (?, ?, ?)", self._chunks)
+                if self._footers:
+                    self.conn.executemany("DELETE FROM parquet_column_stats WHERE raw_path = ?", [(f[0],) for f in self._footers])
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO parquet_footers (raw_path, num_rows, num_row_groups, num_columns, schema_fingerprint, schema_json, created_by, footer_bytes, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        self._footers,
+                    )
+                    self.conn.executemany(
+                        "INSERT INTO parquet_column_stats (raw_path, column_name, physical_type, logical_type, value_kind, min_value, max_value, null_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        self._column_stats,
+                    )
+                if self._aliases:
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO file_aliases (raw_path, checksum_sha256, cas_path, linked_at) VALUES (?, ?, ?, ?)",
+                        self._aliases,
+                    )
+                if before_commit is not None:
+                    before_commit()
+        finally:
+            # A failed batch is rolled back by the context manager; drop it either way
+            inserted = len(self._inserts)
+            self._inserts = []
+            self._fingerprints = []
+            self._trees = []
+            self._chunks = []
+            self._footers = []
+            self._column_stats = []
+            self._aliases = []
+            self._replacements = []
+            self._revisions = []
+        self.inserted += inserted
+        self.metrics.record("ledger_write", time.perf_counter_ns() - start, count=rows)
+
+
+def insert_run_metrics(conn: sqlite3.Connection, run_id: str, snapshot: Dict[str, dict]) -> None:
+    """Persist a `RunMetrics.snapshot()` as one row per phase for the run."""
+    conn.executemany(
+        "INSERT OR REPLACE INTO run_phase_metrics (run_id, phase, event_count, total_ms, bytes, latency_histogram) VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (run_id, phase, p["count"], p["total_ms"], p["bytes"], json.dumps(p["histogram"]) if p["histogram"] else None)
+            for phase, p in snapshot.items()
+        ],
+    )
+    conn.commit()
+
+
+def get_journal_checkpoint(conn: sqlite3.Connection, journal_path: str) -> int:
+    """Byte offset up to which the fetch journal has been ingested (0 if never)."""
+    row = conn.execute("SELECT byte_offset FROM journal_checkpoints WHERE journal_path = ?", (journal_path,)).fetchone()
+    return row[0] if row else 0
+
+
+def set_journal_checkpoint(conn: sqlite3.Connection, journal_path: str, byte_offset: int, updated_at: str, run_id: str) -> None:
+    conn.execute(
+        "INSERT INTO journal_checkpoints (journal_path, byte_offset, updated_at, ingestion_run_id) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(journal_path) DO UPDATE SET byte_offset = excluded.byte_offset, updated_at = excluded.updated_at, ingestion_run_id = excluded.ingestion_run_id",
+        (journal_path, byte_offset, updated_at, run_id),
+    )
+    conn.commit()
+
+
+def connect_readonly(db_path: Path) -> sqlite3.Connection:
+    """Open an existing ledger read-only; never creates or migrates it."""
+    return sqlite3.connect(f"file:{db_path.as_posix()}?mode=ro", uri=True, timeout=30)
+
+
+def peek_journal_checkpoint(db_path: Path, journal_path: str) -> int:
+    """Read a journal checkpoint without creating or migrating the ledger (for dry runs)."""
+    if not db_path.exists():
+        return 0
+    try:
+        conn = connect_readonly(db_path)
+        try:
+            return get_journal_checkpoint(conn, journal_path)
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return 0
+
+
+def get_chunk_tree(conn: sqlite3.Connection, raw_path: str) -> Optional[Tuple[int, str, List[str]]]:
+    """Return (chunk_size, root_sha256, chunk_digests) for a file, or None if it has no tree."""
+    row = conn.execute("SELECT chunk_size, root_sha256 FROM chunk_trees WHERE raw_path = ?", (raw_path,)).fetchone()
+    if row is None:
+        return None
+    digests = [r[0] for r in conn.execute("SELECT sha256 FROM chunk_digests WHERE raw_path = ? ORDER BY chunk_index", (raw_path,))]
+    return row[0], row[1], digests
+
+
+VERIFY_CURSOR_COLUMNS = "name, pass_id, pass_started_at, last_raw_path, updated_at, files_checked, bytes_checked, mismatches, passes_completed"
+
+
+def get_verify_cursor(conn: sqlite3.Connection, name: str) -> Optional[tuple]:
+    """Return the scrub cursor row (columns as in VERIFY_CURSOR_COLUMNS), or None."""
+    return conn.execute(f"SELECT {VERIFY_CURSOR_COLUMNS} FROM verify_cursors WHERE name = ?", (name,)).fetchone()
+
+
+def save_verify_progress(conn: sqlite3.Connection, cursor: tuple, mismatches: List[tuple]) -> None:
+    """Upsert the cursor and append mismatch rows in one transaction, so a restart never
+    re-reports or skips what was checked. Mismatch rows are (raw_path, detected_at,
+    pass_id, kind, expected_sha256, actual_sha256, expected_bytes, actual_bytes, detail)."""
+    with conn:
+        if mismatches:
+            conn.executemany(
+                "INSERT INTO verify_mismatches (raw_path, detected_at, pass_id, kind, expected_sha256, actual_sha256, expected_bytes, actual_bytes, detail) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                mismatches,
+            )
+        conn.execute(f"INSERT OR REPLACE INTO verify_cursors ({VERIFY_CURSOR_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", cursor)
+
+
+def dataset_of(raw_path: str) -> str:
+    for part in raw_path.split("/"):
+        if part.startswith("dataset="):
+            return part[len("dataset="):]
+    return ""
+
+
+def load_schema_fingerprints(conn: sqlite3.Connection) -> Dict[str, set]:
+    """Map each dataset (the `dataset=` path segment) to the schema fingerprints seen for it."""
+    known: Dict[str, set] = {}
+    for raw_path, fingerprint in conn.execute("SELECT raw_path, schema_fingerprint FROM parquet_footers"):
+        known.setdefault(dataset_of(raw_path), set()).add(fingerprint)
+    return known
+
+
+def load_registry_partition(conn: sqlite3.Connection, partition: str) -> Dict[str, tuple]:
+    """Registry rows under one partition directory (`load_registry_index` shape), read fresh."""
+    if not partition:
+        return {row[0]: row for row in conn.execute(f"SELECT {REGISTRY_ENTRY_COLUMNS} FROM file_registry WHERE raw_path NOT LIKE '%/%'")}
+    # A range on the primary key: every raw_path starting with "<partition>/"
+    return {
+        row[0]: row
+        for row in conn.execute(
+            f"SELECT {REGISTRY_ENTRY_COLUMNS} FROM file_registry WHERE raw_path >= ? AND raw_path < ?",
+            (partition + "/", partition + "0"),
+        )
+    }
+
+
+def claim_partition(conn: sqlite3.Connection, partition: str, owner: str, run_id: str, lease_seconds: float, generation: float) -> str:
+    """Try to take the lease on `partition` for `owner`.
+
+    Returns "claimed" (free, or last completed before `generation`), "reclaimed" (the
+    previous holder's lease expired), "held" (another owner's lease is live) or "done"
+    (completed by some worker at or after `generation`, i.e. in this round of work).
+    """
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT owner, status, expires_at, completed_at, attempts FROM partition_claims WHERE partition = ?", (partition,)).fetchone()
+        if row is None:
+            outcome, attempts = "claimed", 1
+        elif row[1] == "done":
+            if row[3] >= generation:
+                conn.rollback()
+                return "done"
+            outcome, attempts = "claimed", 1
+        elif row[0] != owner and row[2] >= now:
+            conn.rollback()
+            return "held"
+        else:
+            outcome, attempts = ("reclaimed" if row[0] != owner else "claimed"), row[4] + 1
+        conn.execute(
+            "INSERT OR REPLACE INTO partition_claims (partition, owner, ingestion_run_id, status, claimed_at, heartbeat_at, expires_at, completed_at, attempts) "
+            "VALUES (?, ?, ?, 'claimed', ?, ?, ?, NULL, ?)",
+            (partition, owner, run_id, now, now, now + lease_seconds, attempts),
+        )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return outcome
+
+
+def complete_partition(conn: sqlite3.Connection, partition: str, owner: str) -> bool:
+    """Mark a partition done; False if `owner` no longer holds its lease.
+
+    Inside an open transaction (`RegistryWriter.flush(before_commit=...)`) the update
+    joins it, so the partition's rows and its completion commit together.
+    """
+    now = time.time()
+    sql = "UPDATE partition_claims SET status = 'done', completed_at = ?, heartbeat_at = ? WHERE partition = ? AND owner = ? AND status = 'claimed'"
+    if conn.in_transaction:
+        return conn.execute(sql, (now, now, partition, owner)).rowcount == 1
+    with conn:
+        cur = conn.execute(sql, (now, now, partition, owner))
+    return cur.rowcount == 1
+
+
+def release_claims(conn: sqlite3.Connection, owner: str) -> None:
+    """Give up every live lease of `owner` (e.g. after a failed run) so others can take them now."""
+    with conn:
+        conn.execute("DELETE FROM partition_claims WHERE owner = ? AND status = 'claimed'", (owner,))
+
+
+class LeaseHeartbeat:
+    """Background thread extending `owner`'s leases every `lease_seconds / 3`.
+
+    It uses its own connection, so a long hash on the ingest thread never lets a lease
+    lapse. If fewer leases could be renewed than `owner` holds (another worker
+    reclaimed one after a stall), `lost` is set and the ingest thread must not commit
+    that partition's work.
+    """
+
+    def __init__(self, db_path: Path, owner: str, lease_seconds: float):
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.lost = threading.Event()
+        self.held = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._db_path = db_path
+        self._thread = threading.Thread(target=self._run, name="dgap-lease-heartbeat", daemon=True)
+        self._thread.start()
+
+    def hold(self, count: int) -> None:
+        """Set how many leases `owner` holds; call with 0 before completing them."""
+        with self._lock:
+            self.held = count
+
+    def _run(self) -> None:
+        conn = sqlite3.connect(str(self._db_path), timeout=30)
+        try:
+            while not self._stop.wait(self.lease_seconds / 3):
+                # Held across the UPDATE so `hold` never changes the count mid-beat
+                with self._lock:
+                    if not self.held:
+                        continue
+                    now = time.time()
+                    try:
+                        with conn:
+                            cur = conn.execute(
+                                "UPDATE partition_claims SET heartbeat_at = ?, expires_at = ? WHERE owner = ? AND status = 'claimed'",
+                                (now, now + self.lease_seconds, self.owner),
+                            )
+                    except sqlite3.Error:
+                        continue  # busy ledger: retry on the next beat, the lease has slack
+                    if cur.rowcount < self.held:
+                        self.lost.set()
+        finally:
+            conn.close()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
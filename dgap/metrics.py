@@ -0,0 +1,156 @@
+"""Lightweight per-phase timing and counters for fetch and ingest runs.
+
+A `RunMetrics` accumulates, per named phase, cumulative wall time, bytes and event
+counts, and optionally a fixed-bucket histogram of per-file latencies. Recording costs
+two `perf_counter_ns` calls and a short critical section, so it is safe in hot loops
+and from worker threads. Snapshots are persisted to the ledger (`run_phase_metrics`)
+and can be written as a Prometheus node_exporter textfile.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+# Upper bounds (seconds) of the per-file latency histogram buckets; +Inf is implicit
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+class _Phase:
+    __slots__ = ("count", "total_ns", "bytes", "buckets", "observed", "observed_ns")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ns = 0
+        self.bytes = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.observed = 0
+        self.observed_ns = 0
+
+
+class RunMetrics:
+    """Thread-safe accumulator of per-phase time, bytes, counts and latency histograms."""
+
+    def __init__(self) -> None:
+        self._phases: Dict[str, _Phase] = {}
+        self._lock = threading.Lock()
+        self.started_ns = time.perf_counter_ns()
+
+    def record(self, phase: str, elapsed_ns: int, nbytes: int = 0, count: int = 1, observe: bool = False) -> None:
+        """Add one measurement. `observe` also puts `elapsed_ns` in the phase's latency histogram."""
+        with self._lock:
+            p = self._phases.get(phase)
+            if p is None:
+                p = self._phases[phase] = _Phase()
+            p.count += count
+            p.total_ns += elapsed_ns
+            p.bytes += nbytes
+            if observe:
+                seconds = elapsed_ns / 1e9
+                i = 0
+                while i < len(LATENCY_BUCKETS) and seconds > LATENCY_BUCKETS[i]:
+                    i += 1
+                p.buckets[i] += 1
+                p.observed += 1
+                p.observed_ns += elapsed_ns
+
+    @contextmanager
+    def phase(self, name: str, nbytes: int = 0, count: int = 1, observe: bool = False) -> Iterator[None]:
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter_ns() - start, nbytes, count, observe)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """{phase: {count, total_ms, bytes, histogram}} where histogram maps bucket bounds to counts."""
+        with self._lock:
+            out = {}
+            for name, p in sorted(self._phases.items()):
+                out[name] = {
+                    "count": p.count,
+                    "total_ms": round(p.total_ns / 1e6, 3),
+                    "bytes": p.bytes,
+                    "histogram": None
+                    if not p.observed
+                    else {
+                        "buckets": dict(zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], p.buckets)),
+                        "count": p.observed,
+                        "sum_seconds": round(p.observed_ns / 1e9, 6),
+                    },
+                }
+            return out
+
+    def elapsed_seconds(self) -> float:
+        return (time.perf_counter_ns() - self.started_ns) / 1e9
+
+
+class _NullMetrics(RunMetrics):
+    """Discards measurements; used when a caller does not collect metrics."""
+
+    def record(self, phase: str, elapsed_ns: int, nbytes: int = 0, count: int = 1, observe: bool = False) -> None:
+        pass
+
+
+NULL_METRICS: RunMetrics = _NullMetrics()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in sorted(labels.items())) + "}"
+
+
+def render_prometheus(metrics: RunMetrics, job: str, success: bool, extra: Optional[Dict[str, float]] = None) -> str:
+    """Render a run's metrics in the Prometheus text exposition format."""
+    snap = metrics.snapshot()
+    lines: List[str] = []
+
+    def family(name: str, kind: str, help_text: str) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    family("dgap_run_success", "gauge", "1 if the last run succeeded, 0 otherwise.")
+    lines.append(f"dgap_run_success{_labels({'job': job})} {1 if success else 0}")
+    family("dgap_run_duration_seconds", "gauge", "Wall time of the last run.")
+    lines.append(f"dgap_run_duration_seconds{_labels({'job': job})} {metrics.elapsed_seconds():.6f}")
+    family("dgap_run_timestamp_seconds", "gauge", "Unix time the last run finished.")
+    lines.append(f"dgap_run_timestamp_seconds{_labels({'job': job})} {time.time():.3f}")
+    for key, value in sorted((extra or {}).items()):
+        family(f"dgap_run_{key}", "gauge", f"{key.replace('_', ' ')} in the last run.")
+        lines.append(f"dgap_run_{key}{_labels({'job': job})} {value}")
+
+    family("dgap_phase_seconds", "gauge", "Cumulative time spent per phase in the last run.")
+    for phase, p in snap.items():
+        lines.append(f"dgap_phase_seconds{_labels({'job': job, 'phase': phase})} {p['total_ms'] / 1000:.6f}")
+    family("dgap_phase_bytes", "gauge", "Bytes processed per phase in the last run.")
+    for phase, p in snap.items():
+        lines.append(f"dgap_phase_bytes{_labels({'job': job, 'phase': phase})} {p['bytes']}")
+    family("dgap_phase_events", "gauge", "Events (files, batches, walks) per phase in the last run.")
+    for phase, p in snap.items():
+        lines.append(f"dgap_phase_events{_labels({'job': job, 'phase': phase})} {p['count']}")
+
+    family("dgap_file_latency_seconds", "histogram", "Per-file latency by phase in the last run.")
+    for phase, p in snap.items():
+        hist = p["histogram"]
+        if not hist:
+            continue
+        cumulative = 0
+        for bound, n in hist["buckets"].items():
+            cumulative += n
+            lines.append(f"dgap_file_latency_seconds_bucket{_labels({'job': job, 'phase': phase, 'le': bound})} {cumulative}")
+        lines.append(f"dgap_file_latency_seconds_sum{_labels({'job': job, 'phase': phase})} {hist['sum_seconds']}")
+        lines.append(f"dgap_file_latency_seconds_count{_labels({'job': job, 'phase': phase})} {hist['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_textfile(path: Path, metrics: RunMetrics, job: str, success: bool, extra: Optional[Dict[str, float]] = None) -> None:
+    """Atomically (write + rename) publish metrics for the node_exporter textfile collector."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with tmp.open("w", encoding="utf-8") as fh:
+        fh.write(render_prometheus(metrics, job, success, extra))
+    tmp.replace(path)
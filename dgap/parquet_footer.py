@@ -0,0 +1,341 @@
+"""Read Parquet file footers without third-party dependencies.
+
+Only the tail of the file is read: the last 8 bytes give the footer length and the
+`PAR1` magic, and the footer itself is a Thrift compact-protocol `FileMetaData` struct.
+This module decodes that struct generically and extracts what the ledger indexes: row
+count, row-group count, the schema (and a fingerprint of it) and per-column min/max
+statistics aggregated across row groups. Column data pages are never touched.
+"""
+import hashlib
+import json
+import struct
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+MAGIC = b"PAR1"
+TAIL_READ_SIZE = 64 * 1024  # usually covers the whole footer in one read
+
+PHYSICAL_TYPES = {0: "BOOLEAN", 1: "INT32", 2: "INT64", 3: "INT96", 4: "FLOAT", 5: "DOUBLE", 6: "BYTE_ARRAY", 7: "FIXED_LEN_BYTE_ARRAY"}
+# parquet.thrift ConvertedType
+CONVERTED_TYPES = {
+    0: "UTF8", 1: "MAP", 2: "MAP_KEY_VALUE", 3: "LIST", 4: "ENUM", 5: "DECIMAL", 6: "DATE", 7: "TIME_MILLIS",
+    8: "TIME_MICROS", 9: "TIMESTAMP_MILLIS", 10: "TIMESTAMP_MICROS", 11: "UINT_8", 12: "UINT_16", 13: "UINT_32",
+    14: "UINT_64", 15: "INT_8", 16: "INT_16", 17: "INT_32", 18: "INT_64", 19: "JSON", 20: "BSON", 21: "INTERVAL",
+}
+REPETITION_TYPES = {0: "REQUIRED", 1: "OPTIONAL", 2: "REPEATED"}
+# LogicalType union members (field id -> name); TIMESTAMP carries its unit
+LOGICAL_TYPES = {1: "STRING", 2: "MAP", 3: "LIST", 4: "ENUM", 5: "DECIMAL", 6: "DATE", 7: "TIME", 8: "TIMESTAMP", 10: "INTEGER", 11: "UNKNOWN", 12: "JSON", 13: "BSON", 14: "UUID", 15: "FLOAT16"}
+TIME_UNITS = {1: "MILLIS", 2: "MICROS", 3: "NANOS"}
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class FooterError(ValueError):
+    """The file is not a readable Parquet file (bad magic, length or Thrift payload)."""
+
+
+class _CompactReader:
+    """Decoder for the subset of the Thrift compact protocol used by Parquet metadata.
+
+    Structs decode to {field_id: value}; lists and sets to Python lists. Unknown
+    fields are decoded and kept, so newer writers' additions are skipped safely.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def _byte(self) -> int:
+        if self.pos >= len(self.data):
+            raise FooterError("truncated footer")
+        b = self.data[self.pos]
+        self.pos += 1
+        return b
+
+    def _varint(self) -> int:
+        shift = result = 0
+        while True:
+            b = self._byte()
+            result |= (b & 0x7F) << shift
+            if not b & 0x80:
+                return result
+            shift += 7
+            if shift > 70:
+                raise FooterError("varint too long")
+
+    def _zigzag(self) -> int:
+        n = self._varint()
+        return (n >> 1) ^ -(n & 1)
+
+    def _binary(self) -> bytes:
+        n = self._varint()
+        if self.pos + n > len(self.data):
+            raise FooterError("truncated binary field")
+        out = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return out
+
+    def _value(self, ctype: int) -> Any:
+        if ctype == 1:
+            return True
+        if ctype == 2:
+            return False
+        if ctype == 3:
+            return struct.unpack("b", bytes([self._byte()]))[0]
+        if ctype in (4, 5, 6):
+            return self._zigzag()
+        if ctype == 7:
+            if self.pos + 8 > len(self.data):
+                raise FooterError("truncated double")
+            (v,) = struct.unpack_from("<d", self.data, self.pos)
+            self.pos += 8
+            return v
+        if ctype == 8:
+            return self._binary()
+        if ctype in (9, 10):
+            return self._list()
+        if ctype == 11:
+            return self._map()
+        if ctype == 12:
+            return self.read_struct()
+        raise FooterError(f"unknown compact type {ctype}")
+
+    def _list(self) -> List[Any]:
+        header = self._byte()
+        size, etype = header >> 4, header & 0x0F
+        if size == 15:
+            size = self._varint()
+        if etype in (1, 2):
+            # booleans inside containers are one byte each
+            return [self._byte() == 1 for _ in range(size)]
+        return [self._value(etype) for _ in range(size)]
+
+    def _map(self) -> Dict[Any, Any]:
+        size = self._varint()
+        if size == 0:
+            return {}
+        types = self._byte()
+        ktype, vtype = types >> 4, types & 0x0F
+        return {self._value(ktype): self._value(vtype) for _ in range(size)}
+
+    def read_struct(self) -> Dict[int, Any]:
+        fields: Dict[int, Any] = {}
+        last_id = 0
+        while True:
+            header = self._byte()
+            if header == 0:
+                return fields
+            delta, ctype = header >> 4, header & 0x0F
+            field_id = last_id + delta if delta else self._zigzag()
+            fields[field_id] = self._value(ctype)
+            last_id = field_id
+
+
+def read_footer_bytes(path: Path) -> bytes:
+    """Return the raw Thrift FileMetaData bytes using only tail reads."""
+    with path.open("rb") as fh:
+        fh.seek(0, 2)
+        size = fh.tell()
+        if size < 12:
+            raise FooterError("file too small to be parquet")
+        tail_len = min(size, TAIL_READ_SIZE)
+        fh.seek(size - tail_len)
+        tail = fh.read(tail_len)
+        if tail[-4:] != MAGIC:
+            raise FooterError("missing PAR1 magic")
+        (footer_len,) = struct.unpack("<I", tail[-8:-4])
+        if footer_len + 12 > size:
+            raise FooterError("footer length exceeds file size")
+        if footer_len + 8 <= tail_len:
+            return tail[tail_len - 8 - footer_len:tail_len - 8]
+        fh.seek(size - 8 - footer_len)
+        return fh.read(footer_len)
+
+
+def _logical_name(logical: Optional[Dict[int, Any]]) -> Optional[str]:
+    if not logical:
+        return None
+    kind, params = next(iter(logical.items()))
+    name = LOGICAL_TYPES.get(kind, f"LOGICAL_{kind}")
+    if name in ("TIMESTAMP", "TIME") and isinstance(params, dict) and isinstance(params.get(2), dict) and params[2]:
+        unit = TIME_UNITS.get(next(iter(params[2])), "?")
+        return f"{name}({unit})"
+    return name
+
+
+def _decode_stat(raw: Optional[bytes], physical: str, logical: Optional[str]) -> Any:
+    """Decode a plain-encoded statistics value into a comparable Python value (or None)."""
+    if raw is None:
+        return None
+    try:
+        if physical == "BOOLEAN":
+            return bool(raw[0])
+        if physical == "INT32":
+            (v,) = struct.unpack("<i", raw)
+            return _EPOCH.date() + timedelta(days=v) if logical == "DATE" else v
+        if physical == "INT64":
+            (v,) = struct.unpack("<q", raw)
+            if logical and logical.startswith("TIMESTAMP"):
+                unit = logical[len("TIMESTAMP("):-1]
+                micros = v * 1000 if unit == "MILLIS" else v // 1000 if unit == "NANOS" else v
+                return _EPOCH + timedelta(microseconds=micros)
+            return v
+        if physical == "FLOAT":
+            return struct.unpack("<f", raw)[0]
+        if physical == "DOUBLE":
+            return struct.unpack("<d", raw)[0]
+        if physical == "BYTE_ARRAY" and logical in ("STRING", "ENUM", "JSON"):
+            return raw.decode("utf-8")
+    except (struct.error, UnicodeDecodeError, OverflowError, IndexError):
+        return None
+    # INT96, decimals, opaque binary: no portable ordering to index
+    return None
+
+
+def stat_to_text(value: Any) -> Optional[str]:
+    """Text form stored in the ledger; timestamps/dates use sortable ISO-8601."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%dT%H:%M:%S.%f")
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def value_kind(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, datetime):
+        return "timestamp"
+    if isinstance(value, date):
+        return "date"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    return "string"
+
+
+def _leaf_columns(schema: List[Dict[int, Any]]) -> Dict[str, Dict[int, Any]]:
+    """Map dotted leaf column paths to their schema elements (schema is depth-first)."""
+    leaves: Dict[str, Dict[int, Any]] = {}
+    stack: List[Tuple[str, int]] = []  # (path prefix, children remaining)
+    for i, element in enumerate(schema):
+        name = element.get(4, b"").decode("utf-8", "replace")
+        children = element.get(5, 0)
+        if i == 0:
+            stack.append(("", children))
+            continue
+        while stack and stack[-1][1] == 0:
+            stack.pop()
+        prefix, remaining = stack[-1] if stack else ("", 0)
+        if stack:
+            stack[-1] = (prefix, remaining - 1)
+        path = f"{prefix}.{name}" if prefix else name
+        if children:
+            stack.append((path, children))
+        else:
+            leaves[path] = element
+    return leaves
+
+
+def schema_fingerprint(schema: List[Dict[str, Any]]) -> str:
+    """SHA-256 over the canonical JSON of a decoded schema (see parse_footer)."""
+    return hashlib.sha256(json.dumps(schema, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def parse_footer(footer: bytes) -> Dict[str, Any]:
+    """Decode FileMetaData into the summary indexed by the ledger.
+
+    Returns {num_rows, num_row_groups, created_by, schema, schema_fingerprint, columns}
+    where `schema` lists every element as {name, type, repetition, num_children,
+    converted_type, logical_type} and `columns` maps leaf paths to {physical_type,
+    logical_type, min, max, null_count}; min/max are None when any row group lacks them.
+    """
+    meta = _CompactReader(footer).read_struct()
+    if 2 not in meta or 3 not in meta:
+        raise FooterError("FileMetaData without schema or num_rows")
+
+    schema = []
+    for element in meta[2]:
+        schema.append({
+            "name": element.get(4, b"").decode("utf-8", "replace"),
+            "type": PHYSICAL_TYPES.get(element.get(1)) if 1 in element else None,
+            "repetition": REPETITION_TYPES.get(element.get(3)) if 3 in element else None,
+            "num_children": element.get(5),
+            "converted_type": CONVERTED_TYPES.get(element.get(6), element.get(6)) if 6 in element else None,
+            "logical_type": _logical_name(element.get(10)),
+        })
+    fingerprint = schema_fingerprint(schema)
+
+    leaves = _leaf_columns(meta[2])
+    columns: Dict[str, Dict[str, Any]] = {}
+    for path, element in leaves.items():
+        physical = PHYSICAL_TYPES.get(element.get(1), "UNKNOWN")
+        logical = _logical_name(element.get(10))
+        converted = element.get(6)
+        if logical is None and converted in (9, 10):
+            logical = "TIMESTAMP(MILLIS)" if converted == 9 else "TIMESTAMP(MICROS)"
+        elif logical is None and converted == 6:
+            logical = "DATE"
+        elif logical is None and converted == 0:
+            logical = "STRING"
+        columns[path] = {"physical_type": physical, "logical_type": logical, "min": None, "max": None, "null_count": 0, "_complete": True}
+
+    row_groups = meta.get(4, [])
+    for rg in row_groups:
+        seen = set()
+        for chunk in rg.get(1, []):
+            cmeta = chunk.get(3)
+            if not cmeta:
+                continue
+            path = ".".join(p.decode("utf-8", "replace") for p in cmeta.get(3, []))
+            col = columns.get(path)
+            if col is None:
+                continue
+            seen.add(path)
+            stats = cmeta.get(12) or {}
+            if stats.get(3) is not None and col["null_count"] is not None:
+                col["null_count"] += stats[3]
+            else:
+                col["null_count"] = None
+            # Prefer min_value/max_value (correct sort order); legacy min/max only for numbers
+            raw_min, raw_max = stats.get(6), stats.get(5)
+            if raw_min is None and col["physical_type"] in ("INT32", "INT64", "FLOAT", "DOUBLE"):
+                raw_min, raw_max = stats.get(2), stats.get(1)
+            lo = _decode_stat(raw_min, col["physical_type"], col["logical_type"])
+            hi = _decode_stat(raw_max, col["physical_type"], col["logical_type"])
+            if lo is None or hi is None:
+                col["_complete"] = False
+                continue
+            col["min"] = lo if col["min"] is None or lo < col["min"] else col["min"]
+            col["max"] = hi if col["max"] is None or hi > col["max"] else col["max"]
+        for path in columns.keys() - seen:
+            columns[path]["_complete"] = False
+
+    for col in columns.values():
+        if not col.pop("_complete") or not row_groups:
+            col["min"] = col["max"] = None
+
+    created_by = meta.get(6)
+    return {
+        "num_rows": meta[3],
+        "num_row_groups": len(row_groups),
+        "created_by": created_by.decode("utf-8", "replace") if isinstance(created_by, bytes) else None,
+        "schema": schema,
+        "schema_fingerprint": fingerprint,
+        "columns": columns,
+        "footer_bytes": len(footer),
+    }
+
+
+def read_footer(path: Path) -> Dict[str, Any]:
+    """Tail-read and decode a Parquet footer. Raises FooterError for non-parquet input."""
+    try:
+        return parse_footer(read_footer_bytes(path))
+    except (RecursionError, KeyError, TypeError, AttributeError, StopIteration) as e:
+        raise FooterError(f"malformed footer: {e}") from e
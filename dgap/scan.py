@@ -0,0 +1,334 @@
+"""Ledger-driven reads over the raw layout.
+
+Files are resolved from `file_registry` instead of globbing the raw zone: partitions
+outside the dataset/month range are never listed, and files whose indexed parquet
+footer statistics (`parquet_column_stats`) cannot satisfy a predicate are never opened.
+Reading record batches needs pyarrow, which is imported lazily so that resolving files
+works with the standard library alone.
+"""
+import operator
+import queue
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from .metadata import connect_readonly
+
+YearMonth = Tuple[int, int]
+# (column, op, value), e.g. ("tpep_pickup_datetime", ">=", "2024-01-15")
+Predicate = Tuple[str, str, Any]
+
+OPS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+# pyarrow.compute function names for the same operators
+_PC_OPS = {"==": "equal", "!=": "not_equal", "<": "less", "<=": "less_equal", ">": "greater", ">=": "greater_equal"}
+_PREDICATE_RE = re.compile(r"^\s*([A-Za-z_][\w.]*)\s*(==|!=|<=|>=|<|>|=)\s*(.*?)\s*$")
+
+
+class ScanError(RuntimeError):
+    """A scan cannot run (bad predicate, missing pyarrow, unreadable file)."""
+
+
+class ScanFile(NamedTuple):
+    raw_path: str
+    path: Path
+    file_size_bytes: int
+    num_rows: Optional[int]  # from the footer index; None if the file was never indexed
+
+
+def parse_predicate(text: str) -> Predicate:
+    """Parse `column<op>value` (ops: == = != < <= > >=); the value stays a string."""
+    m = _PREDICATE_RE.match(text)
+    if not m or not m.group(3):
+        raise ScanError(f"Invalid predicate {text!r}; expected e.g. 'tpep_pickup_datetime>=2024-01-15'")
+    column, op, value = m.groups()
+    return column, "==" if op == "=" else op, value
+
+
+def _partitions(raw_path: str) -> Dict[str, str]:
+    return dict(part.split("=", 1) for part in raw_path.split("/")[:-1] if "=" in part)
+
+
+def _in_months(raw_path: str, start: Optional[YearMonth], end: Optional[YearMonth]) -> bool:
+    if start is None and end is None:
+        return True
+    parts = _partitions(raw_path)
+    try:
+        ym = (int(parts["year"]), int(parts["month"]))
+    except (KeyError, ValueError):
+        return False
+    return (start is None or ym >= start) and (end is None or ym <= end)
+
+
+def _coerce(value: Any, kind: str) -> Any:
+    """Convert a predicate value to the Python type min/max of `kind` decode to."""
+    if kind == "timestamp":
+        if isinstance(value, datetime):
+            return value.replace(tzinfo=None)
+        if isinstance(value, date):
+            return datetime(value.year, value.month, value.day)
+        return datetime.fromisoformat(str(value))
+    if kind == "date":
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return date.fromisoformat(str(value)[:10])
+    if kind in ("int", "float"):
+        return value if isinstance(value, (int, float)) and not isinstance(value, bool) else float(value)
+    if kind == "bool":
+        return value if isinstance(value, bool) else str(value).lower() in ("1", "true")
+    return str(value)
+
+
+def _may_match(op: str, value: Any, lo: Any, hi: Any, ops=OPS) -> bool:
+    """Whether some x in [lo, hi] can satisfy `x <op> value`, using comparison functions `ops`."""
+    if op == "==":
+        return ops["<="](lo, value) and ops["<="](value, hi)
+    if op == "!=":
+        return not (ops["=="](lo, hi) and ops["=="](lo, value))
+    if op in ("<", "<="):
+        return ops[op](lo, value)
+    return ops[op](hi, value)
+
+
+def _stats_exclude(stats: Optional[Tuple[str, str, str]], op: str, value: Any) -> bool:
+    """True only when stored (value_kind, min, max) prove no row can match."""
+    if stats is None or None in stats:
+        return False
+    kind, lo, hi = stats
+    try:
+        return not _may_match(op, _coerce(value, kind), _coerce(lo, kind), _coerce(hi, kind))
+    except (TypeError, ValueError):
+        return False
+
+
+def resolve_files(
+    conn: sqlite3.Connection,
+    raw_root: Path,
+    dataset: str,
+    start: Optional[YearMonth] = None,
+    end: Optional[YearMonth] = None,
+    predicates: Sequence[Predicate] = (),
+) -> List[ScanFile]:
+    """Registered parquet files of `dataset` in the inclusive month range whose footer
+    statistics do not rule out `predicates`, ordered by raw_path. Files without stats
+    for a predicate column are kept (they may match)."""
+    for column, op, _ in predicates:
+        if op not in OPS:
+            raise ScanError(f"Unsupported operator {op!r} for column {column}")
+    pattern = f"%dataset={dataset}/%"
+    rows = conn.execute(
+        "SELECT r.raw_path, r.file_size_bytes, f.num_rows FROM file_registry r "
+        "LEFT JOIN parquet_footers f ON f.raw_path = r.raw_path "
+        "WHERE r.raw_path LIKE ? AND r.file_name LIKE '%.parquet' ORDER BY r.raw_path",
+        (pattern,),
+    ).fetchall()
+    rows = [r for r in rows if _partitions(r[0]).get("dataset") == dataset and _in_months(r[0], start, end)]
+
+    stats: Dict[str, Dict[str, Tuple[str, str, str]]] = {}
+    for column in {p[0] for p in predicates}:
+        stats[column] = {
+            raw_path: (kind, lo, hi)
+            for raw_path, kind, lo, hi in conn.execute(
+                "SELECT raw_path, value_kind, min_value, max_value FROM parquet_column_stats WHERE column_name = ? AND raw_path LIKE ?",
+                (column, pattern),
+            )
+        }
+
+    files = []
+    for raw_path, size, num_rows in rows:
+        if num_rows == 0:
+            continue
+        if any(_stats_exclude(stats[column].get(raw_path), op, value) for column, op, value in predicates):
+            continue
+        files.append(ScanFile(raw_path, raw_root / raw_path, size, num_rows))
+    return files
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ScanError("Reading record batches needs pyarrow (pip install pyarrow); resolving files does not") from e
+    return pyarrow
+
+
+def _arrow_value(pa, value: Any, arrow_type) -> Any:
+    """Convert a predicate value to something pyarrow.compute compares with a column of `arrow_type`."""
+    if pa.types.is_timestamp(arrow_type):
+        return pa.scalar(_coerce(value, "timestamp"), type=pa.timestamp("us")).cast(arrow_type)
+    if pa.types.is_date(arrow_type):
+        return _coerce(value, "date")
+    if pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type):
+        return _coerce(value, "float")
+    if pa.types.is_boolean(arrow_type):
+        return _coerce(value, "bool")
+    return str(value)
+
+
+def _row_groups(pa, pf, predicates: Sequence[Predicate]) -> List[int]:
+    """Row groups whose own statistics do not rule out the predicates."""
+    pc = pa.compute
+
+    def compare(name):
+        fn = getattr(pc, name)
+        return lambda a, b: bool(fn(a, b).as_py())
+
+    ops = {op: compare(name) for op, name in _PC_OPS.items()}
+    meta = pf.metadata
+    schema = pf.schema_arrow
+    index = {meta.schema.column(i).path: i for i in range(meta.num_columns)}
+    keep = []
+    for rg in range(meta.num_row_groups):
+        group = meta.row_group(rg)
+        ok = True
+        for column, op, value in predicates:
+            i = index.get(column)
+            st = group.column(i).statistics if i is not None else None
+            if st is None or not st.has_min_max or column not in schema.names:
+                continue
+            arrow_type = schema.field(column).type
+            try:
+                target = _arrow_value(pa, value, arrow_type)
+                target = target if isinstance(target, pa.Scalar) else pa.scalar(target).cast(arrow_type)
+                lo, hi = pa.scalar(st.min).cast(arrow_type), pa.scalar(st.max).cast(arrow_type)
+                if not _may_match(op, target, lo, hi, ops):
+                    ok = False
+                    break
+            except (TypeError, ValueError, pa.ArrowException):
+                continue
+        if ok:
+            keep.append(rg)
+    return keep
+
+
+def _read_file(pa, f: ScanFile, columns, predicates, batch_rows, out: "queue.Queue", stop: threading.Event) -> None:
+    """Stream one file's matching rows into `out`, ending with None (or an exception)."""
+    pc = pa.compute
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        pf = pa.parquet.ParquetFile(str(f.path))
+        names = pf.schema_arrow.names
+        wanted = list(columns) if columns else names
+        missing = [c for c in list(wanted) + [p[0] for p in predicates] if c not in names]
+        if missing:
+            raise ScanError(f"{f.raw_path}: no column(s) {', '.join(sorted(set(missing)))}")
+        read_cols = wanted + [p[0] for p in predicates if p[0] not in wanted]
+        groups = _row_groups(pa, pf, predicates)
+        if groups:
+            for batch in pf.iter_batches(batch_size=batch_rows, row_groups=groups, columns=read_cols):
+                if stop.is_set():
+                    return
+                if predicates:
+                    mask = None
+                    for column, op, value in predicates:
+                        col = batch.column(column)
+                        cond = getattr(pc, _PC_OPS[op])(col, _arrow_value(pa, value, col.type))
+                        mask = cond if mask is None else pc.and_(mask, cond)
+                    batch = batch.filter(mask)
+                if batch.num_rows == 0:
+                    continue
+                if len(read_cols) != len(wanted):
+                    batch = batch.select(wanted)
+                if not put(batch):
+                    return
+        put(None)
+    except BaseException as e:
+        put(e if isinstance(e, ScanError) else ScanError(f"{f.raw_path}: {e}"))
+
+
+def iter_batches(
+    files: Sequence[ScanFile],
+    columns: Optional[Sequence[str]] = None,
+    predicates: Sequence[Predicate] = (),
+    workers: int = 4,
+    batch_rows: int = 65536,
+    buffered_batches: int = 4,
+) -> Iterator[Any]:
+    """Yield pyarrow RecordBatches of the rows matching `predicates`, file by file in order.
+
+    Up to `workers` files are read concurrently, each into its own queue of at most
+    `buffered_batches` batches, so memory is bounded by workers × buffered_batches ×
+    batch_rows regardless of data size. Closing the iterator early stops the readers.
+    """
+    pa = _require_pyarrow()
+    workers = max(1, workers)
+    stop = threading.Event()
+    pending: List[Tuple[ScanFile, "queue.Queue"]] = []
+    remaining = iter(files)
+
+    def submit(pool) -> None:
+        f = next(remaining, None)
+        if f is not None:
+            q: "queue.Queue" = queue.Queue(maxsize=max(1, buffered_batches))
+            pool.submit(_read_file, pa, f, columns, predicates, batch_rows, q, stop)
+            pending.append((f, q))
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dgap-scan")
+    try:
+        for _ in range(workers):
+            submit(pool)
+        while pending:
+            _, q = pending.pop(0)
+            while True:
+                item = q.get()
+                if item is None:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+            submit(pool)
+    finally:
+        stop.set()
+        pool.shutdown(wait=True)
+
+
+def scan(
+    db_path: Path,
+    raw_root: Path,
+    dataset: str,
+    start: Optional[YearMonth] = None,
+    end: Optional[YearMonth] = None,
+    columns: Optional[Sequence[str]] = None,
+    predicates: Sequence[Predicate] = (),
+    workers: int = 4,
+    batch_rows: int = 65536,
+) -> Iterator[Any]:
+    """Resolve files from the ledger and stream their matching rows as RecordBatches.
+
+    Only `columns` (default: all) are returned; predicate columns are read but not
+    returned unless listed. Example:
+
+        for batch in scan(Path("data/ledger.db"), Path("data/raw"), "yellow_tripdata",
+                          (2024, 1), (2024, 3), ["tpep_pickup_datetime", "fare_amount"],
+                          [("tpep_pickup_datetime", ">=", "2024-02-15")]):
+            ...
+    """
+    conn = connect_readonly(db_path)
+    try:
+        files = resolve_files(conn, raw_root, dataset, start, end, predicates)
+    finally:
+        conn.close()
+    return iter_batches(files, columns, predicates, workers, batch_rows)
@@ -0,0 +1,110 @@
+"""Fused fetch → register pipeline (`dgap sync`).
+
+Fetch workers download months exactly as `dgap fetch` does. Every month whose file is
+on disk once it is done (committed, refreshed or already present) is handed over a
+bounded queue to the calling thread, which hashes and registers it as `dgap ingest`
+would while later months are still downloading. Freshly fetched files carry their
+download-time checksum in the sidecar, so registering them does not re-read them.
+
+A full queue blocks the fetch workers before they start another month, so fetch never
+runs more than `queue_size` files ahead of the ledger and at most `concurrency`
+downloads are staged at a time. The whole sync is one `ingestion_runs` record.
+"""
+import queue
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from .events import EventSink
+from .fetch_raw import TLC_URL, HttpSession, fetch_range
+from .ingest import run_ingest
+from .ingest_raw import YearMonth
+from .metrics import RunMetrics
+
+_DONE = object()
+
+
+class SyncAborted(Exception):
+    """Registration stopped; raised on fetch workers so no further months start."""
+
+
+def sync_range(
+    conn: sqlite3.Connection,
+    raw_root: Path,
+    dataset: str,
+    start: YearMonth,
+    end: YearMonth,
+    run_id: str,
+    start_time: str,
+    events: EventSink,
+    metrics: RunMetrics,
+    session: Optional[HttpSession] = None,
+    concurrency: int = 1,
+    url_template: str = TLC_URL,
+    refresh: bool = False,
+    queue_size: int = 4,
+    **ingest_options,
+) -> Tuple[int, int]:
+    """Fetch the inclusive range `start`..`end` and register each file as it lands.
+
+    Returns (fetch rc, ingest rc) with the meanings of `fetch_range` and `run_ingest`;
+    `ingest_options` are passed on to `run_ingest`. If registration fails, months not
+    yet started are cancelled and the fetch rc is 2.
+    """
+    handoff: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+    stop = threading.Event()
+    outcome = {"rc": 2, "error": None}
+
+    def put(item) -> bool:
+        # Blocks while the queue is full (backpressure) unless registration has stopped
+        while not stop.is_set():
+            try:
+                handoff.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def on_ready(path: Path) -> None:
+        if not put(path):
+            raise SyncAborted()
+
+    def produce() -> None:
+        try:
+            outcome["rc"] = fetch_range(
+                raw_root, dataset, start[0], start[1], end[0], end[1], concurrency=concurrency, url_template=url_template,
+                metrics=metrics, events=events, refresh=refresh, session=session, on_ready=on_ready, cancel=stop,
+            )
+        except SyncAborted:
+            pass
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            put(_DONE)
+
+    def landed() -> Iterator[Path]:
+        while True:
+            item = handoff.get()
+            if item is _DONE:
+                return
+            yield item
+
+    producer = threading.Thread(target=produce, name="dgap-sync-fetch", daemon=True)
+    producer.start()
+    try:
+        ingest_rc = run_ingest(conn, landed(), raw_root, run_id, start_time, events, metrics, **ingest_options)
+    finally:
+        # Normally the producer has finished already; otherwise stop it handing over files.
+        # On SystemExit/KeyboardInterrupt the daemon thread is not waited for; its
+        # in-flight downloads resume from their partials next time.
+        stop.set()
+        try:
+            # Wake a registration feed still waiting for a file that will not come
+            handoff.put_nowait(_DONE)
+        except queue.Full:
+            pass
+    producer.join()
+    if outcome["error"] is not None:
+        raise outcome["error"]
+    return outcome["rc"], ingest_rc
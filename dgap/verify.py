@@ -0,0 +1,271 @@
+"""Throttled, resumable integrity scrub of registered files (`dgap verify`).
+
+Files are re-hashed in `raw_path` order and compared with `file_registry`. Reads go
+through a shared `Throttle` (MB/s and read-operations/s token buckets), so a scrub can
+run next to query workloads. Progress is kept in `verify_cursors`; an interrupted scrub
+resumes after the last file it recorded, and a finished pass starts the next one.
+Mismatches are appended to `verify_mismatches`.
+"""
+import hashlib
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from .events import EventSink
+from .idempotency import compute_checksum, map_ordered, verify_chunks
+from .ingest_raw import utc_now
+from .metadata import get_chunk_tree, get_verify_cursor, save_verify_progress
+from .metrics import NULL_METRICS, RunMetrics
+
+PAGE_SIZE = 1000  # registry rows fetched per query
+# verify_cursors columns, in VERIFY_CURSOR_COLUMNS order
+CURSOR_FIELDS = ("name", "pass_id", "pass_started_at", "last_raw_path", "updated_at", "files_checked", "bytes_checked", "mismatches", "passes_completed")
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` tokens/s with bursts up to `burst`.
+
+    A request larger than the bucket is granted by going into debt and sleeping it
+    off, so any read size works and the long-run rate still holds.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, n: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= n
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class Throttle:
+    """Per-read limiter shared by all verify workers; pass it as a hashing `throttle`."""
+
+    def __init__(self, mb_per_sec: Optional[float] = None, iops: Optional[float] = None):
+        self.bandwidth = TokenBucket(mb_per_sec * 1024 * 1024) if mb_per_sec else None
+        self.ops = TokenBucket(iops) if iops else None
+
+    def __call__(self, nbytes: int) -> None:
+        if self.ops is not None:
+            self.ops.take(1)
+        if self.bandwidth is not None:
+            self.bandwidth.take(nbytes)
+
+
+def sampled(raw_path: str, pass_id: str, fraction: float) -> bool:
+    """Deterministic per-pass sample: the same files are chosen again after a restart."""
+    if fraction >= 1:
+        return True
+    digest = hashlib.sha256(f"{pass_id}:{raw_path}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64 < fraction
+
+
+def check_file(
+    raw_root: Path,
+    raw_path: str,
+    expected_sha256: str,
+    expected_bytes: int,
+    throttle: Optional[Throttle] = None,
+    tree: Optional[Tuple[int, str, List[str]]] = None,
+    chunk_sample: int = 0,
+    seed: str = "",
+) -> Tuple[int, Optional[tuple]]:
+    """Check one file; returns (bytes read, None or (kind, actual_sha256, actual_bytes, detail)).
+
+    With `chunk_sample` > 0 and a chunk tree, only that many randomly chosen chunks
+    (seeded by `seed`) are re-hashed instead of the whole file.
+    """
+    path = raw_root / raw_path
+    try:
+        size = path.stat().st_size
+    except FileNotFoundError:
+        return 0, ("missing", None, None, None)
+    except OSError as e:
+        return 0, ("unreadable", None, None, str(e))
+    if size != expected_bytes:
+        return 0, ("size", None, size, None)
+    try:
+        if tree is not None and chunk_sample > 0:
+            chunk_size, _root, digests = tree
+            rng = random.Random(f"{seed}:{raw_path}")
+            indices = rng.sample(range(len(digests)), min(chunk_sample, len(digests)))
+            bad = verify_chunks(path, chunk_size, {i: digests[i] for i in indices}, 1, throttle)
+            read = sum(min(chunk_size, size - i * chunk_size) for i in indices)
+            if bad:
+                return read, ("chunk", None, size, "chunks " + ",".join(str(i) for i in bad))
+            return read, None
+        actual, read, _ms = compute_checksum(path, throttle)
+    except OSError as e:
+        return 0, ("unreadable", None, size, str(e))
+    if actual != expected_sha256:
+        return read, ("checksum", actual, read, None)
+    return read, None
+
+
+def _new_cursor(name: str) -> dict:
+    now = utc_now()
+    return {
+        "name": name,
+        "pass_id": f"{now[:19].replace('-', '').replace(':', '')}_{random.getrandbits(32):08x}",
+        "pass_started_at": now,
+        "last_raw_path": None,
+        "updated_at": now,
+        "files_checked": 0,
+        "bytes_checked": 0,
+        "mismatches": 0,
+        "passes_completed": 0,
+    }
+
+
+def _cursor_tuple(c: dict) -> tuple:
+    return tuple(c[f] for f in CURSOR_FIELDS)
+
+
+def run_verify(
+    conn: sqlite3.Connection,
+    raw_root: Path,
+    events: EventSink,
+    name: str = "default",
+    mb_per_sec: Optional[float] = None,
+    iops: Optional[float] = None,
+    workers: int = 1,
+    sample: float = 1.0,
+    chunk_sample: int = 0,
+    max_seconds: Optional[float] = None,
+    max_files: Optional[int] = None,
+    loop: bool = False,
+    loop_interval: float = 60.0,
+    checkpoint_every: int = 100,
+    restart: bool = False,
+    metrics: Optional[RunMetrics] = None,
+) -> int:
+    """Scrub from the saved cursor `name`; returns the number of mismatches found.
+
+    Stops at the end of the pass (or keeps going with `loop`, starting passes at most
+    every `loop_interval` seconds), or once `max_seconds` or `max_files` is reached,
+    leaving the cursor for the next invocation. The cursor and any mismatches are
+    committed together every `checkpoint_every` files.
+    """
+    metrics = metrics or NULL_METRICS
+    throttle = Throttle(mb_per_sec, iops) if (mb_per_sec or iops) else None
+    row = get_verify_cursor(conn, name)
+    if row is None or restart:
+        cursor = _new_cursor(name)
+        if row is not None:
+            cursor["passes_completed"] = row[-1]
+    else:
+        cursor = dict(zip(CURSOR_FIELDS, row))
+    base = {"action": "verify", "cursor": name}
+    started = time.monotonic()
+    found = 0
+    budget_hit = False
+
+    def out_of_budget(checked: int) -> bool:
+        if max_seconds is not None and time.monotonic() - started >= max_seconds:
+            return True
+        return max_files is not None and checked >= max_files
+
+    events.emit(base, event="start", pass_id=cursor["pass_id"], resume_after=cursor["last_raw_path"],
+                message=f"verify {name}: pass {cursor['pass_id']}" + (f", resuming after {cursor['last_raw_path']}" if cursor["last_raw_path"] else ""))
+    checked_now = 0
+    while True:
+        pass_started = time.monotonic()
+
+        def candidates() -> Iterator[tuple]:
+            nonlocal budget_hit
+            last = cursor["last_raw_path"]
+            already = checked_now
+            queued = 0
+            while True:
+                page = conn.execute(
+                    "SELECT raw_path, checksum_sha256, file_size_bytes FROM file_registry WHERE raw_path > ? ORDER BY raw_path LIMIT ?",
+                    (last or "", PAGE_SIZE),
+                ).fetchall()
+                if not page:
+                    return
+                for raw_path, checksum, size in page:
+                    last = raw_path
+                    if out_of_budget(already + queued):
+                        budget_hit = True
+                        return
+                    chosen = sampled(raw_path, cursor["pass_id"], sample)
+                    tree = get_chunk_tree(conn, raw_path) if chosen and chunk_sample > 0 else None
+                    queued += chosen
+                    yield raw_path, checksum, size, chosen, tree
+
+        def inspect(item: tuple) -> tuple:
+            raw_path, checksum, size, chosen, tree = item
+            if not chosen:
+                return raw_path, checksum, size, False, 0, None
+            t0 = time.perf_counter_ns()
+            read, problem = check_file(raw_root, raw_path, checksum, size, throttle, tree, chunk_sample, cursor["pass_id"])
+            metrics.record("verify", time.perf_counter_ns() - t0, nbytes=read, observe=True)
+            return raw_path, checksum, size, True, read, problem
+
+        pending: List[tuple] = []
+        since_checkpoint = 0
+        for raw_path, checksum, size, chosen, read, problem in map_ordered(inspect, candidates(), workers):
+            cursor["last_raw_path"] = raw_path
+            since_checkpoint += 1
+            if chosen:
+                checked_now += 1
+                cursor["files_checked"] += 1
+                cursor["bytes_checked"] += read
+            if problem is not None:
+                kind, actual_sha256, actual_bytes, detail = problem
+                found += 1
+                cursor["mismatches"] += 1
+                now = utc_now()
+                pending.append((raw_path, now, cursor["pass_id"], kind, checksum, actual_sha256, size, actual_bytes, detail))
+                events.emit(base, event="mismatch", raw_path=raw_path, kind=kind, expected_sha256=checksum, actual_sha256=actual_sha256,
+                            expected_bytes=size, actual_bytes=actual_bytes, detail=detail, message=f"MISMATCH ({kind}): {raw_path}")
+            if since_checkpoint >= checkpoint_every:
+                cursor["updated_at"] = utc_now()
+                save_verify_progress(conn, _cursor_tuple(cursor), pending)
+                pending, since_checkpoint = [], 0
+
+        cursor["updated_at"] = utc_now()
+        if budget_hit:
+            save_verify_progress(conn, _cursor_tuple(cursor), pending)
+            break
+        # End of the registry: this pass is complete
+        save_verify_progress(conn, _cursor_tuple(cursor), pending)
+        events.emit(base, event="pass_complete", pass_id=cursor["pass_id"], files_checked=cursor["files_checked"],
+                    bytes_checked=cursor["bytes_checked"], mismatches=cursor["mismatches"],
+                    message=f"verify {name}: pass {cursor['pass_id']} complete | {cursor['files_checked']} files, "
+                            f"{cursor['bytes_checked'] / 1e6:.1f} MB, {cursor['mismatches']} mismatches")
+        nxt = _new_cursor(name)
+        nxt["passes_completed"] = cursor["passes_completed"] + 1
+        cursor = nxt
+        save_verify_progress(conn, _cursor_tuple(cursor), [])
+        if not loop or out_of_budget(checked_now):
+            break
+        # A small registry must not be re-read back to back
+        idle = loop_interval - (time.monotonic() - pass_started)
+        if max_seconds is not None:
+            idle = min(idle, max_seconds - (time.monotonic() - started))
+        if idle > 0:
+            events.emit(base, event="idle", seconds=round(idle, 1), message=f"verify {name}: next pass in {idle:.0f}s")
+            time.sleep(idle)
+            if out_of_budget(checked_now):
+                break
+
+    elapsed = time.monotonic() - started
+    events.emit(base, event="stop", files_checked=checked_now, mismatches=found, elapsed_s=round(elapsed, 1),
+                message=f"verify {name}: {checked_now} files checked, {found} mismatches | {elapsed:.1f}s"
+                        + (f" | resumes after {cursor['last_raw_path']}" if cursor["last_raw_path"] else ""))
+    return found
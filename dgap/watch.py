@@ -0,0 +1,212 @@
+"""Linux inotify watching of the raw layout for `dgap watch`.
+
+`RawTreeWatcher` keeps an inotify watch on every directory under raw_root except the
+staging, journal, dedup store and superseded-version directories, and reports parquet
+files that appear by rename (fetch's atomic commit) or are closed after writing.
+`Debouncer` coalesces the resulting paths so a burst of commits becomes one ingestion run.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+# Directories under raw_root that never hold committed files
+IGNORED_DIRS = {"_incoming", "_journal", "_cas", "_superseded"}
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class WatchError(RuntimeError):
+    """inotify is unavailable or a watch could not be added."""
+
+
+class Inotify:
+    """Minimal ctypes binding: one non-blocking inotify descriptor and its watches."""
+
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise WatchError("dgap watch needs Linux inotify; use a scheduled `ingest` on this platform")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add = libc.inotify_add_watch
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise WatchError(f"inotify_init1 failed: {os.strerror(ctypes.get_errno())}")
+        self.paths: Dict[int, str] = {}
+
+    def add_watch(self, path: str, mask: int = WATCH_MASK) -> int:
+        wd = self._add(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            hint = " (raise fs.inotify.max_user_watches)" if err == errno.ENOSPC else ""
+            raise WatchError(f"inotify_add_watch {path}: {os.strerror(err)}{hint}")
+        self.paths[wd] = path
+        return wd
+
+    def read(self, timeout: Optional[float]) -> List[Tuple[int, int, str]]:
+        """Wait up to `timeout` seconds (None: forever) and return (wd, mask, name) events."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        events = []
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            pos = 0
+            while pos + _EVENT_HEADER.size <= len(buf):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(buf, pos)
+                pos += _EVENT_HEADER.size
+                name = os.fsdecode(buf[pos:pos + length].rstrip(b"\0"))
+                pos += length
+                events.append((wd, mask, name))
+        return events
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class RawTreeWatcher:
+    """Watch raw_root recursively and translate inotify events into file paths."""
+
+    def __init__(self, raw_root: Path):
+        self.raw_root = raw_root.resolve()
+        self.inotify = Inotify()
+        self._watched: Set[str] = set()
+        self._watch_tree(str(self.raw_root))
+
+    @property
+    def directories(self) -> int:
+        return len(self._watched)
+
+    def _watch_tree(self, top: str) -> List[Path]:
+        """Watch `top` and its subdirectories; return parquet files already inside them.
+
+        Watches are added before listing, so a file renamed in meanwhile is either
+        listed here or reported by an event (or both; the debouncer coalesces).
+        """
+        found: List[Path] = []
+        stack = [top]
+        while stack:
+            path = stack.pop()
+            if path in self._watched:
+                continue
+            try:
+                self.inotify.add_watch(path)
+            except WatchError:
+                if not os.path.isdir(path):
+                    continue  # vanished before we got to it
+                raise
+            self._watched.add(path)
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in IGNORED_DIRS:
+                                stack.append(entry.path)
+                        elif entry.name.endswith(".parquet"):
+                            found.append(Path(entry.path))
+            except FileNotFoundError:
+                continue
+        return found
+
+    def poll(self, timeout: Optional[float]) -> Tuple[Set[Path], Set[Path], bool]:
+        """Return (files to ingest, files whose sidecar changed, queue overflowed)."""
+        files: Set[Path] = set()
+        touched: Set[Path] = set()
+        overflow = False
+        for wd, mask, name in self.inotify.read(timeout):
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            directory = self.inotify.paths.get(wd)
+            if mask & IN_IGNORED:
+                # Watched directory removed or moved away; the kernel dropped the watch
+                self._watched.discard(self.inotify.paths.pop(wd, ""))
+                continue
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and name not in IGNORED_DIRS:
+                    files.update(self._watch_tree(path))
+            elif name.endswith(".parquet") and mask & (IN_MOVED_TO | IN_CLOSE_WRITE):
+                files.add(Path(path))
+            elif name.endswith(".parquet.meta.json") and mask & (IN_MOVED_TO | IN_CLOSE_WRITE):
+                touched.add(Path(path[: -len(".meta.json")]))
+        return files, touched, overflow
+
+    def close(self) -> None:
+        self.inotify.close()
+
+
+class Debouncer:
+    """Coalesce paths into batches: a batch is released once no event arrived for `quiet`
+    seconds, so a burst of commits becomes a single run.
+
+    Under a continuous burst, once the oldest path has waited `max_delay` seconds,
+    every path that has itself been quiet for `quiet` seconds is released anyway, so
+    latency stays bounded. A path is never released within `quiet` of its last event,
+    which leaves time for the sidecar written right after fetch's rename.
+    """
+
+    def __init__(self, quiet: float = 1.0, max_delay: float = 10.0):
+        self.quiet = quiet
+        self.max_delay = max(quiet, max_delay)
+        self._pending: Dict[Path, Tuple[float, float]] = {}  # path -> (first seen, last seen)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, path: Path, now: float) -> None:
+        first, _ = self._pending.get(path, (now, now))
+        self._pending[path] = (first, now)
+
+    def touch(self, path: Path, now: float) -> None:
+        """Restart the quiet period of a pending path (e.g. its sidecar was just written)."""
+        if path in self._pending:
+            self.add(path, now)
+
+    def timeout(self, now: float) -> Optional[float]:
+        """Seconds until a batch may be due, or None when nothing is pending."""
+        if not self._pending:
+            return None
+        last = max(l for _, l in self._pending.values())
+        oldest = min(f for f, _ in self._pending.values())
+        quietest = min(l for _, l in self._pending.values())
+        deadline = min(last + self.quiet, max(oldest + self.max_delay, quietest + self.quiet))
+        return max(0.0, deadline - now)
+
+    def due(self, now: float) -> List[Path]:
+        """Pop and return the paths of the batch that is due (possibly none), in path order."""
+        if not self._pending:
+            return []
+        last = max(l for _, l in self._pending.values())
+        oldest = min(f for f, _ in self._pending.values())
+        if now - last >= self.quiet:
+            ready = sorted(self._pending)
+        elif now - oldest >= self.max_delay:
+            ready = sorted(p for p, (_, l) in self._pending.items() if now - l >= self.quiet)
+        else:
+            return []
+        for p in ready:
+            del self._pending[p]
+        return ready
@@ -0,0 +1,78 @@
+"""`dgap dedup`: hardlinking registered duplicates into the `_cas` store."""
+import os
+
+import pytest
+
+from benchmarks import synthetic
+from dgap.api import Ingestor
+from dgap.dedup import cas_relpath, dedup_files
+from dgap.events import RecordingSink
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    """Three registered months with identical content, and the ingestor holding them."""
+    raw = tmp_path / "raw"
+    first, *rest = synthetic.make_raw_root(raw, ["yellow_tripdata"], 3, 4096)
+    for path in rest:
+        path.write_bytes(first.read_bytes())
+    with Ingestor(raw, tmp_path / "ledger.db") as ingestor:
+        result = ingestor.ingest()
+        assert result.ok
+        yield ingestor, [first, *rest], result.files[0].checksum_sha256
+
+
+def inodes(paths):
+    return {os.stat(p).st_ino for p in paths}
+
+
+def test_dry_run_changes_nothing(ledger):
+    ingestor, paths, checksum = ledger
+    sink = RecordingSink()
+    counts = dedup_files(ingestor.conn, ingestor.raw_root, sink, dry_run=True)
+    assert counts == {"groups": 1, "linked": 2, "already_linked": 1, "skipped": 0, "bytes_reclaimed": 2 * 4096}
+    assert len(inodes(paths)) == 3
+    assert not (ingestor.raw_root / "_cas").exists()
+    assert ingestor.conn.execute("SELECT COUNT(*) FROM file_aliases").fetchone()[0] == 0
+    assert [r["event"] for r in sink.records] == ["would_link", "would_link"]
+
+
+def test_links_duplicates_to_one_object(ledger):
+    ingestor, paths, checksum = ledger
+    counts = dedup_files(ingestor.conn, ingestor.raw_root, RecordingSink())
+    assert counts == {"groups": 1, "linked": 2, "already_linked": 1, "skipped": 0, "bytes_reclaimed": 2 * 4096}
+    cas = ingestor.raw_root / cas_relpath(checksum)
+    assert inodes(paths) == inodes([cas])
+    assert ingestor.conn.execute("SELECT COUNT(*) FROM file_aliases WHERE cas_path = ?", (cas_relpath(checksum),)).fetchone()[0] == 3
+    # Refreshed fingerprints let the next ingest skip them, and a second pass has nothing to do
+    assert [f.status for f in ingestor.ingest().files] == ["skipped"] * 3
+    assert dedup_files(ingestor.conn, ingestor.raw_root, RecordingSink())["already_linked"] == 3
+
+
+class RewritingSink(RecordingSink):
+    """Rewrites `victim` in place when the first file is linked, as a concurrent writer would."""
+
+    def __init__(self, victim):
+        super().__init__()
+        self.victim = victim
+
+    def emit(self, base, **fields):
+        super().emit(base, **fields)
+        if fields.get("event") == "linked" and self.victim.read_bytes()[:1] != b"!":
+            with self.victim.open("r+b") as fh:
+                fh.write(b"!")
+            st = self.victim.stat()
+            os.utime(self.victim, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_file_changed_mid_run_is_not_replaced(ledger):
+    ingestor, paths, checksum = ledger
+    victim = paths[2]
+    sink = RewritingSink(victim)
+    counts = dedup_files(ingestor.conn, ingestor.raw_root, sink)
+    assert (counts["linked"], counts["already_linked"], counts["skipped"]) == (1, 1, 1)
+    assert [(r["event"], r.get("reason")) for r in sink.records][-1] == ("skipped", "changed")
+    assert victim.read_bytes()[:1] == b"!"
+    assert os.stat(victim).st_ino not in inodes([ingestor.raw_root / cas_relpath(checksum)])
+    aliased = [r[0] for r in ingestor.conn.execute("SELECT raw_path FROM file_aliases ORDER BY raw_path")]
+    assert aliased == [p.relative_to(ingestor.raw_root).as_posix() for p in paths[:2]]
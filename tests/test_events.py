@@ -0,0 +1,77 @@
+"""Records written by the event sinks: every one carries a UTC `ts`, and none is lost to close()."""
+import io
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+
+from dgap.events import EventSink, RecordingSink
+
+
+def parse(ts):
+    stamp = datetime.fromisoformat(ts)
+    assert stamp.utcoffset() == timedelta(0)
+    return stamp
+
+
+def test_console_and_file_records_are_stamped(tmp_path):
+    out = io.StringIO()
+    before = datetime.now(timezone.utc)
+    with EventSink(stream=out, path=tmp_path / "events.ndjson") as sink:
+        base = {"action": "ingest", "run_id": "r1"}
+        sink.emit(base, event="ingested", raw_path="a")
+        sink.emit(base, event="run_end")
+    after = datetime.now(timezone.utc)
+
+    console = [json.loads(line) for line in out.getvalue().splitlines()]
+    on_disk = [json.loads(line) for line in (tmp_path / "events.ndjson").read_text().splitlines()]
+    assert console == on_disk
+    assert [list(r)[0] for r in console] == ["ts", "ts"]
+    stamps = [parse(r["ts"]) for r in console]
+    assert before <= stamps[0] <= stamps[1] <= after
+    assert "ts" not in base
+
+
+def test_text_console_is_unchanged():
+    out = io.StringIO()
+    with EventSink(console="text", stream=out) as sink:
+        sink.emit({"action": "ingest"}, event="skipped", message="SKIPPED: a")
+    assert out.getvalue() == "SKIPPED: a\n"
+
+
+def test_explicit_ts_wins():
+    out = io.StringIO()
+    with EventSink(stream=out) as sink:
+        sink.emit({"action": "x"}, ts="2024-01-01T00:00:00+00:00")
+    assert json.loads(out.getvalue())["ts"] == "2024-01-01T00:00:00+00:00"
+
+
+def test_recording_sink_forwards_the_same_ts():
+    out = io.StringIO()
+    with EventSink(stream=out) as forward:
+        recording = RecordingSink(forward)
+        recording.emit({"action": "fetch"}, status="success")
+        recording.flush()
+        (record,) = recording.records
+        parse(record["ts"])
+        assert json.loads(out.getvalue()) == record
+
+
+def test_no_event_is_lost_to_a_concurrent_close():
+    out = io.StringIO()
+    sink = EventSink(stream=out, queue_size=64, batch_size=8)
+    started = threading.Barrier(5)
+
+    def emitter(n):
+        started.wait()
+        for i in range(2000):
+            sink.emit({"action": "x"}, n=n, i=i)
+
+    threads = [threading.Thread(target=emitter, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    started.wait()
+    sink.close()
+    for t in threads:
+        t.join()
+    assert len(out.getvalue().splitlines()) == 4 * 2000
+    sink.flush()  # returns at once after close
@@ -0,0 +1,199 @@
+"""`fetch --refresh` against the synthetic CDN, and the ingest side of a superseded file."""
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+from benchmarks import synthetic
+from dgap.api import Fetcher, Ingestor
+from dgap.events import RecordingSink
+from dgap.fetch_raw import fetch_range
+from dgap.metadata import RegistryWriter, init_db, insert_file_registry, insert_run_start
+
+DATASET = "yellow_tripdata"
+
+
+@pytest.fixture
+def cdn(tmp_path):
+    src = tmp_path / "src"
+    synthetic.make_source_tree(src, [DATASET], 1, 64 * 1024)
+    server, base = synthetic.serve(src)
+    yield src / synthetic.URL_PATH.lstrip("/").format(dataset=DATASET, year=2015, month=1), base + synthetic.URL_PATH
+    server.shutdown()
+
+
+def fetch(raw, template, refresh=True):
+    sink = RecordingSink()
+    rc = fetch_range(raw, DATASET, 2015, 1, 2015, 1, url_template=template, events=sink, refresh=refresh)
+    assert rc == 0
+    (record,) = sink.records
+    return record
+
+
+def final_path(raw):
+    return raw / "source=tlc" / f"dataset={DATASET}" / "year=2015" / "month=01" / f"{DATASET}_2015-01.parquet"
+
+
+def sidecar_path(raw):
+    return final_path(raw).with_name(final_path(raw).name + ".meta.json")
+
+
+def sha256(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def bump_mtime(path, seconds=10):
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + seconds * 1_000_000_000))
+
+
+def change_body(path):
+    with path.open("r+b") as fh:
+        fh.seek(100)
+        fh.write(os.urandom(16))
+    bump_mtime(path)
+
+
+def test_not_modified_leaves_file_and_sidecar_alone(tmp_path, cdn):
+    src, template = cdn
+    raw = tmp_path / "raw"
+    assert fetch(raw, template, refresh=False)["status"] == "success"
+    st, sidecar = final_path(raw).stat(), sidecar_path(raw).read_bytes()
+
+    record = fetch(raw, template)
+    assert (record["status"], record["reason"]) == ("skipped", "not_modified")
+    assert final_path(raw).stat().st_ino == st.st_ino and final_path(raw).stat().st_mtime_ns == st.st_mtime_ns
+    assert sidecar_path(raw).read_bytes() == sidecar
+
+
+def test_identical_body_only_rewrites_sidecar(tmp_path, cdn):
+    src, template = cdn
+    raw = tmp_path / "raw"
+    fetch(raw, template, refresh=False)
+    st, before = final_path(raw).stat(), json.loads(sidecar_path(raw).read_text())
+    bump_mtime(src)  # new validators, same bytes
+
+    record = fetch(raw, template)
+    assert (record["status"], record["reason"]) == ("skipped", "unchanged")
+    assert final_path(raw).stat().st_ino == st.st_ino
+    after = json.loads(sidecar_path(raw).read_text())
+    assert after["etag"] != before["etag"] and after["sha256"] == before["sha256"]
+    assert "supersedes_sha256" not in after
+    assert not (raw / "_superseded").exists()
+
+
+def test_changed_body_archives_previous_version(tmp_path, cdn):
+    src, template = cdn
+    raw = tmp_path / "raw"
+    fetch(raw, template, refresh=False)
+    old = sha256(final_path(raw))
+    change_body(src)
+
+    record = fetch(raw, template)
+    assert (record["status"], record["reason"]) == ("success", "refreshed")
+    assert sha256(final_path(raw)) == sha256(src) != old
+    sidecar = json.loads(sidecar_path(raw).read_text())
+    assert sidecar["sha256"] == sha256(src)
+    assert sidecar["supersedes_sha256"] == record["supersedes_sha256"] == old
+    archive = raw / sidecar["superseded_path"]
+    assert sidecar["superseded_path"].startswith("_superseded/") and sha256(archive) == old
+    assert json.loads(archive.with_name(archive.name + ".meta.json").read_text())["sha256"] == old
+
+
+def test_ingest_supersedes_registered_file(tmp_path, cdn):
+    src, template = cdn
+    raw, db = tmp_path / "raw", tmp_path / "ledger.db"
+    fetch(raw, template, refresh=False)
+    with Ingestor(raw, db) as ingestor:
+        first = ingestor.ingest()
+        old = first.files[0].checksum_sha256
+        change_body(src)
+        fetch(raw, template)
+        result = ingestor.ingest()
+
+        assert result.ok
+        (file_result,) = result.files
+        assert (file_result.status, file_result.checksum_sha256) == ("superseded", sha256(src))
+        raw_path = file_result.raw_path
+        assert ingestor.conn.execute("SELECT checksum_sha256 FROM file_registry WHERE raw_path = ?", (raw_path,)).fetchone()[0] == sha256(src)
+        revision = ingestor.conn.execute(
+            "SELECT previous_sha256, new_sha256, superseded_path, ingestion_run_id FROM file_revisions WHERE raw_path = ?", (raw_path,)
+        ).fetchall()
+        sidecar = json.loads(sidecar_path(raw).read_text())
+        assert revision == [(old, sha256(src), sidecar["superseded_path"], result.run_id)]
+        # A second pass has nothing left to supersede
+        assert [f.status for f in ingestor.ingest().files] == ["skipped"]
+
+
+def test_supersede_drops_footer_of_old_content(tmp_path):
+    conn = init_db(tmp_path / "ledger.db")
+    insert_run_start(conn, "run-1", "now")
+    insert_file_registry(conn, "a.parquet", "a.parquet", "0" * 64, 1, 1, 0, None, "now", "run-1")
+    footer = {
+        "num_rows": 1, "num_row_groups": 1, "schema_fingerprint": "f", "schema": [], "created_by": None, "footer_bytes": 8,
+        "columns": {"x": {"physical_type": "INT32", "logical_type": None, "min": 1, "max": 2, "null_count": 0}},
+    }
+    writer = RegistryWriter(conn)
+    writer.add_footer("a.parquet", footer, "now")
+    writer.flush()
+
+    writer.supersede("a.parquet", "1" * 64, 2, 2, 0, None, 0, 0, 0, "0" * 64, 1, None, "later", "run-1")
+    writer.flush()
+    assert conn.execute("SELECT COUNT(*) FROM parquet_footers").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM parquet_column_stats").fetchone()[0] == 0
+
+    # A footer for the new content queued in the same batch survives
+    writer.supersede("a.parquet", "2" * 64, 3, 3, 0, None, 0, 0, 0, "1" * 64, 2, None, "later", "run-1")
+    writer.add_footer("a.parquet", dict(footer, schema_fingerprint="g"), "later")
+    writer.flush()
+    assert conn.execute("SELECT schema_fingerprint FROM parquet_footers").fetchall() == [("g",)]
+    assert conn.execute("SELECT COUNT(*) FROM parquet_column_stats").fetchone()[0] == 1
+
+
+def test_pre_validator_sidecar_falls_back_to_fetch_time(tmp_path, cdn):
+    src, template = cdn
+    raw = tmp_path / "raw"
+    fetch(raw, template, refresh=False)
+    fetched_at = datetime(2024, 3, 1, 12, 0, 0, tzinfo=timezone.utc)
+    # Upstream last modified exactly when the old sidecar says the file was fetched
+    os.utime(src, (fetched_at.timestamp(), fetched_at.timestamp()))
+    sidecar = json.loads(sidecar_path(raw).read_text())
+    for key in ("etag", "last_modified", "content_length"):
+        sidecar.pop(key)
+    sidecar["fetched_at_utc"] = fetched_at.isoformat()
+    sidecar_path(raw).write_text(json.dumps(sidecar))
+
+    record = fetch(raw, template)
+    assert (record["status"], record["reason"]) == ("skipped", "not_modified")
+    assert "etag" not in json.loads(sidecar_path(raw).read_text())
+
+    # Modified after that fetch: re-downloaded, content unchanged, validators recorded now
+    bump_mtime(src)
+    record = fetch(raw, template)
+    assert (record["status"], record["reason"]) == ("skipped", "unchanged")
+    assert json.loads(sidecar_path(raw).read_text())["etag"]
+
+
+def test_fetcher_reuses_connections_across_calls(tmp_path):
+    src = tmp_path / "src"
+    synthetic.make_source_tree(src, [DATASET], 6, 64 * 1024)
+    server, base = synthetic.serve(src)
+    accepted = []
+    process_request = server.process_request
+
+    def count_connection(request, client_address):
+        accepted.append(client_address)
+        process_request(request, client_address)
+
+    server.process_request = count_connection
+    try:
+        with Fetcher(tmp_path / "raw", base + synthetic.URL_PATH, concurrency=3) as fetcher:
+            for _ in range(5):
+                assert fetcher.fetch(DATASET, (2015, 1), (2015, 6), refresh=True).ok
+            assert len(fetcher.session._all) <= 3
+    finally:
+        server.shutdown()
+    # One connection per concurrent download, not a new set for every call's worker threads
+    assert len(accepted) <= 3
@@ -0,0 +1,167 @@
+"""Resuming a leftover `.partial` against a local HTTP server with range support."""
+import hashlib
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from dgap.events import RecordingSink
+from dgap.fetch_raw import HttpSession, IncompleteDownload, _download, _make_targets, _write_partial_state, fetch_range
+
+BODY = os.urandom(300 * 1024)
+ETAG = '"v1"'
+LAST_MODIFIED = "Wed, 01 May 2024 10:00:00 GMT"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serves BODY; `server.mode` selects how a Range request is (mis)handled."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        size = len(BODY)
+        match = re.match(r"bytes=(\d+)-$", self.headers.get("Range", ""))
+        honour = match is not None and server.mode != "ignore_range"
+        if honour and server.mode != "ignore_if_range":
+            honour = self.headers.get("If-Range") in (None, server.etag, LAST_MODIFIED)
+        start = int(match.group(1)) if honour else 0
+        if honour and start >= size:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if honour and server.mode == "wrong_offset":
+            start = 0
+        self.send_response(206 if honour else 200)
+        self.send_header("ETag", server.etag)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.send_header("Content-Length", str(size - start))
+        if honour:
+            self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+        self.end_headers()
+        payload = BODY[start:]
+        if server.mode == "truncate":
+            # Announce the full length, then drop the connection halfway
+            payload = payload[: len(payload) // 2]
+            self.close_connection = True
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    srv.daemon_threads = True
+    srv.handle_error = lambda request, client_address: None  # the client hangs up on purpose in some cases
+    srv.mode, srv.etag, srv.requests = "normal", ETAG, []
+    srv.uri = f"http://127.0.0.1:{srv.server_address[1]}/trip-data/yellow_tripdata_2015-01.parquet"
+    threading.Thread(target=srv.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    yield srv
+    srv.shutdown()
+
+
+@pytest.fixture
+def session():
+    s = HttpSession(timeout=5)
+    yield s
+    s.close()
+
+
+def leftover_partial(path, uri, nbytes, etag=ETAG, last_modified=LAST_MODIFIED):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(BODY[:nbytes])
+    _write_partial_state(path, uri, {"ETag": etag, "Last-Modified": last_modified}, len(BODY))
+    return path
+
+
+SHA256 = hashlib.sha256(BODY).hexdigest()
+
+
+def test_truncated_partial_resumes_at_its_offset(tmp_path, server):
+    raw = tmp_path / "raw"
+    final, _, partial = _make_targets(raw, "yellow_tripdata", 2015, 1)
+    leftover_partial(partial, server.uri, 100_000)
+    sink = RecordingSink()
+    assert fetch_range(raw, "yellow_tripdata", 2015, 1, 2015, 1, url_template=server.uri, events=sink) == 0
+
+    (record,) = sink.records
+    assert (record["status"], record["resumed_from"], record["bytes"]) == ("success", 100_000, len(BODY))
+    assert [(r.get("Range"), r.get("If-Range")) for r in server.requests] == [("bytes=100000-", ETAG)]
+    assert hashlib.sha256(final.read_bytes()).hexdigest() == SHA256
+    assert not partial.exists() and not partial.with_name(partial.name + ".json").exists()
+
+
+def test_weak_etag_resumes_with_last_modified(tmp_path, server, session):
+    server.etag = 'W/"v1"'
+    partial = leftover_partial(tmp_path / "x.partial", server.uri, 50_000, etag='W/"v1"')
+    assert _download(session, server.uri, partial) == (len(BODY), 50_000, SHA256)
+    assert server.requests[0]["If-Range"] == LAST_MODIFIED
+
+
+def test_server_ignoring_range_restarts(tmp_path, server, session):
+    server.mode = "ignore_range"
+    partial = leftover_partial(tmp_path / "x.partial", server.uri, 100_000)
+    assert _download(session, server.uri, partial) == (len(BODY), 0, SHA256)
+    assert partial.read_bytes() == BODY
+    assert len(server.requests) == 1
+
+
+@pytest.mark.parametrize("mode", ["normal", "ignore_if_range"])
+def test_changed_etag_restarts(tmp_path, server, session, mode):
+    # The partial came from an older version of the object
+    server.mode, server.etag = mode, '"v2"'
+    partial = leftover_partial(tmp_path / "x.partial", server.uri, 100_000, etag='"v1"')
+    assert _download(session, server.uri, partial) == (len(BODY), 0, SHA256)
+    assert partial.read_bytes() == BODY
+    # A 206 for the new version is discarded and the body re-requested without a range
+    assert [r.get("Range") for r in server.requests] == (["bytes=100000-"] if mode == "normal" else ["bytes=100000-", None])
+
+
+def test_changed_last_modified_restarts(tmp_path, server, session):
+    partial = leftover_partial(tmp_path / "x.partial", server.uri, 100_000, etag=None, last_modified="Tue, 30 Apr 2024 10:00:00 GMT")
+    assert _download(session, server.uri, partial) == (len(BODY), 0, SHA256)
+    assert server.requests[0]["If-Range"] == "Tue, 30 Apr 2024 10:00:00 GMT"
+
+
+def test_wrong_content_range_offset_restarts(tmp_path, server, session):
+    server.mode = "wrong_offset"
+    partial = leftover_partial(tmp_path / "x.partial", server.uri, 100_000)
+    assert _download(session, server.uri, partial) == (len(BODY), 0, SHA256)
+    assert partial.read_bytes() == BODY
+    assert [r.get("Range") for r in server.requests] == ["bytes=100000-", None]
+
+
+def test_416_on_complete_partial_restarts(tmp_path, server, session):
+    partial = leftover_partial(tmp_path / "x.partial", server.uri, len(BODY))
+    assert _download(session, server.uri, partial) == (len(BODY), 0, SHA256)
+    assert [r.get("Range") for r in server.requests] == [f"bytes={len(BODY)}-", None]
+
+
+def test_incomplete_download_keeps_partial_for_next_run(tmp_path, server, session):
+    server.mode = "truncate"
+    partial = tmp_path / "x.partial"
+    with pytest.raises(IncompleteDownload):
+        _download(session, server.uri, partial)
+    assert partial.read_bytes() == BODY[: len(BODY) // 2]
+    assert partial.with_name(partial.name + ".json").exists()
+
+    server.mode = "normal"
+    assert _download(session, server.uri, partial) == (len(BODY), len(BODY) // 2, SHA256)
+
+
+def test_incomplete_download_is_reported_and_not_committed(tmp_path, server):
+    server.mode = "truncate"
+    raw = tmp_path / "raw"
+    final, _, partial = _make_targets(raw, "yellow_tripdata", 2015, 1)
+    sink = RecordingSink()
+    assert fetch_range(raw, "yellow_tripdata", 2015, 1, 2015, 1, url_template=server.uri, events=sink) == 1
+    (record,) = sink.records
+    assert (record["status"], record["reason"]) == ("error", "incomplete")
+    assert partial.exists() and not final.exists()
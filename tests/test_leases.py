@@ -0,0 +1,114 @@
+"""Partition claiming for concurrent ingest workers (`ingest --lease-seconds`)."""
+import time
+
+import pytest
+
+from benchmarks import synthetic
+from dgap import ingest
+from dgap.api import Ingestor
+from dgap.events import RecordingSink
+from dgap.ingest import run_ingest
+from dgap.ingest_raw import discover_raw_files, utc_now
+from dgap.metadata import LeaseHeartbeat, claim_partition, complete_partition, init_db
+from dgap.metrics import RunMetrics
+
+PARTITION = "source=tlc/dataset=yellow_tripdata/year=2015/month=01"
+
+
+@pytest.fixture
+def raw(tmp_path):
+    root = tmp_path / "raw"
+    synthetic.make_raw_root(root, ["yellow_tripdata"], 2, 1024)
+    return root
+
+
+def claims(conn):
+    return {r[0]: r[1:] for r in conn.execute("SELECT partition, owner, status, attempts FROM partition_claims")}
+
+
+def test_claim_outcomes(tmp_path):
+    conn = init_db(tmp_path / "ledger.db")
+    generation = time.time()
+    assert claim_partition(conn, "p", "a", "run-a", 30, generation) == "claimed"
+    assert claim_partition(conn, "p", "b", "run-b", 30, generation) == "held"
+    assert not complete_partition(conn, "p", "b")
+    assert complete_partition(conn, "p", "a")
+    assert claim_partition(conn, "p", "b", "run-b", 30, generation) == "done"
+    # A later round of work claims it again
+    assert claim_partition(conn, "p", "b", "run-b", 30, time.time() + 1) == "claimed"
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    conn = init_db(tmp_path / "ledger.db")
+    assert claim_partition(conn, "p", "a", "run-a", 0.01, time.time()) == "claimed"
+    time.sleep(0.05)
+    assert claim_partition(conn, "p", "b", "run-b", 30, time.time()) == "reclaimed"
+    assert claims(conn) == {"p": ("b", "claimed", 2)}
+    assert not complete_partition(conn, "p", "a")
+
+
+def test_ingest_claims_and_completes_every_partition(raw, tmp_path):
+    with Ingestor(raw, tmp_path / "ledger.db", lease_seconds=30) as ingestor:
+        result = ingestor.ingest()
+        assert result.ok and result.files_ingested == 2
+        assert [status for _, status, _ in claims(ingestor.conn).values()] == ["done", "done"]
+
+
+def test_ingest_reclaims_a_stalled_workers_partition(raw, tmp_path):
+    db = tmp_path / "ledger.db"
+    conn = init_db(db)
+    claim_partition(conn, PARTITION, "stalled", "run-x", 0.01, time.time())
+    conn.close()
+    time.sleep(0.05)
+
+    sink = RecordingSink()
+    with Ingestor(raw, db, lease_seconds=30, events=sink) as ingestor:
+        result = ingestor.ingest()
+        assert result.ok and result.files_ingested == 2
+        assert claims(ingestor.conn)[PARTITION][1:] == ("done", 2)
+    assert [r["partition"] for r in sink.records if r.get("event") == "reclaimed"] == [PARTITION]
+
+
+def run_with_leases(conn, raw, leases):
+    sink = RecordingSink()
+    rc = run_ingest(conn, discover_raw_files(raw), raw, "run-1", utc_now(), sink, RunMetrics(), batch_size=1, leases=leases, print_errors=False)
+    return rc, sink
+
+
+def test_lost_lease_commits_nothing(raw, tmp_path):
+    db = tmp_path / "ledger.db"
+    conn = init_db(db)
+    leases = LeaseHeartbeat(db, "me", 30)
+    leases.lost.set()  # as the heartbeat does once another worker took a partition over
+    try:
+        rc, sink = run_with_leases(conn, raw, leases)
+    finally:
+        leases.close()
+    assert rc == 2
+    assert conn.execute("SELECT COUNT(*) FROM file_registry").fetchone()[0] == 0
+    assert conn.execute("SELECT status, files_ingested FROM ingestion_runs").fetchone() == ("failure", 0)
+    assert claims(conn) == {}  # released for the other workers
+    assert "not committing it" in sink.records[-1]["error"]
+
+
+def test_takeover_before_completion_rolls_back_partition(raw, tmp_path, monkeypatch):
+    db = tmp_path / "ledger.db"
+    conn = init_db(db)
+    register_files = ingest.register_files
+
+    def register_then_lose_lease(files, *args, **kwargs):
+        register_files(files, *args, **kwargs)
+        # Another worker reclaims the partition before the heartbeat notices
+        with conn:
+            conn.execute("UPDATE partition_claims SET owner = 'other' WHERE status = 'claimed'")
+
+    monkeypatch.setattr(ingest, "register_files", register_then_lose_lease)
+    leases = LeaseHeartbeat(db, "me", 30)
+    try:
+        rc, sink = run_with_leases(conn, raw, leases)
+    finally:
+        leases.close()
+    assert rc == 2
+    assert conn.execute("SELECT COUNT(*) FROM file_registry").fetchone()[0] == 0
+    assert claims(conn) == {PARTITION: ("other", "claimed", 1)}
+    assert "before completion" in sink.records[-1]["error"]
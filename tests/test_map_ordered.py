@@ -0,0 +1,78 @@
+"""`map_ordered`: results in input order, handed back as soon as they are done."""
+import random
+import threading
+import time
+
+import pytest
+
+from dgap.idempotency import map_ordered
+
+
+def slow_square(x):
+    time.sleep(random.random() / 200)
+    return x * x
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@pytest.mark.parametrize("workers", [1, 4])
+def test_results_keep_input_order(workers, stream):
+    assert list(map_ordered(slow_square, range(50), workers, stream=stream)) == [x * x for x in range(50)]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_error_surfaces_at_its_turn(stream):
+    def fn(x):
+        if x == 3:
+            raise ValueError(x)
+        return x
+
+    got = []
+    with pytest.raises(ValueError):
+        for r in map_ordered(fn, range(10), 4, stream=stream):
+            got.append(r)
+    assert got == [0, 1, 2]
+
+
+def test_stream_error_from_items_comes_after_earlier_results():
+    def items():
+        yield from range(3)
+        raise RuntimeError("source failed")
+
+    got = []
+    with pytest.raises(RuntimeError):
+        for r in map_ordered(slow_square, items(), 4, stream=True):
+            got.append(r)
+    assert got == [0, 1, 4]
+
+
+def test_stream_yields_result_before_next_item_arrives():
+    handed_back = threading.Event()
+    waited = []
+
+    def items():
+        yield 1
+        # A slow producer: the next file lands only after the first is registered
+        waited.append(handed_back.wait(timeout=2))
+        yield 2
+
+    got = []
+    for r in map_ordered(slow_square, items(), 4, stream=True):
+        got.append(r)
+        handed_back.set()
+    assert got == [1, 4]
+    assert waited == [True]
+
+
+def test_stream_consumer_can_stop_while_items_block():
+    never = threading.Event()
+
+    def items():
+        yield 1
+        never.wait()
+        yield 2  # pragma: no cover
+
+    started = time.monotonic()
+    for r in map_ordered(slow_square, items(), 4, stream=True):
+        break
+    assert r == 1 and time.monotonic() - started < 1
+    never.set()
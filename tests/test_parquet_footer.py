@@ -0,0 +1,164 @@
+"""Decoder tests for dgap.parquet_footer on hand-built Thrift compact footers."""
+import struct
+from datetime import datetime
+
+import pytest
+
+from dgap.parquet_footer import TAIL_READ_SIZE, FooterError, parse_footer, read_footer, schema_fingerprint
+
+# Thrift compact types
+BOOL_TRUE, I32, I64, BINARY, LIST, STRUCT = 1, 5, 6, 8, 9, 12
+
+
+def varint(n):
+    out = bytearray()
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+
+def zigzag(n):
+    return varint((n << 1) ^ (n >> 63))
+
+
+def value(ctype, v):
+    if ctype in (I32, I64):
+        return zigzag(v)
+    if ctype == BINARY:
+        v = v.encode("utf-8") if isinstance(v, str) else v
+        return varint(len(v)) + v
+    if ctype == LIST:
+        etype, items = v
+        header = bytes([(len(items) << 4) | etype]) if len(items) < 15 else bytes([0xF0 | etype]) + varint(len(items))
+        return header + b"".join(value(etype, item) for item in items)
+    if ctype == STRUCT:
+        return encode_struct(v)
+    raise AssertionError(ctype)
+
+
+def encode_struct(fields):
+    """`fields` is a list of (field_id, compact type, value); a struct value is such a list."""
+    out = bytearray()
+    last = 0
+    for fid, ctype, v in fields:
+        if 0 < fid - last <= 15:
+            out.append(((fid - last) << 4) | ctype)
+        else:
+            out.append(ctype)
+            out += zigzag(fid)
+        if ctype != BOOL_TRUE:
+            out += value(ctype, v)
+        last = fid
+    out.append(0)
+    return bytes(out)
+
+
+def element(name, physical=None, converted=None, children=None, logical=None, repetition=1):
+    fields = []
+    if physical is not None:
+        fields.append((1, I32, physical))
+    fields.append((3, I32, repetition))
+    fields.append((4, BINARY, name))
+    if children is not None:
+        fields.append((5, I32, children))
+    if converted is not None:
+        fields.append((6, I32, converted))
+    if logical is not None:
+        fields.append((10, STRUCT, logical))
+    return fields
+
+
+def chunk(path, physical, lo, hi, nulls):
+    stats = [(3, I64, nulls), (5, BINARY, hi), (6, BINARY, lo)]
+    meta = [(1, I32, physical), (2, LIST, (I32, [0])), (3, LIST, (BINARY, [path])), (4, I32, 0), (5, I64, 10),
+            (6, I64, 100), (7, I64, 100), (9, I64, 4), (12, STRUCT, stats)]
+    return [(2, I64, 4), (3, STRUCT, meta)]
+
+
+MICROS_TIMESTAMP = [(8, STRUCT, [(1, BOOL_TRUE, True), (2, STRUCT, [(2, STRUCT, [])])])]
+
+
+def footer_bytes(created_by="dgap-test", extra_fields=()):
+    schema = [
+        element("schema", children=4, repetition=0),
+        element("small", physical=1, converted=16),
+        element("big", physical=2, converted=18),
+        element("name", physical=6, converted=0),
+        element("ts", physical=2, logical=MICROS_TIMESTAMP),
+    ]
+    ts = lambda s: struct.pack("<q", int((datetime.fromisoformat(s) - datetime(1970, 1, 1)).total_seconds() * 1_000_000))
+    row_groups = [
+        [(1, LIST, (STRUCT, [
+            chunk("small", 1, struct.pack("<i", -5), struct.pack("<i", 7), 1),
+            chunk("big", 2, struct.pack("<q", 10), struct.pack("<q", 2 ** 40), 0),
+            chunk("name", 6, b"apple", b"kiwi", 0),
+            chunk("ts", 2, ts("2024-01-01T00:00:00"), ts("2024-01-15T12:00:00"), 0),
+        ])), (2, I64, 400), (3, I64, 10)],
+        [(1, LIST, (STRUCT, [
+            chunk("small", 1, struct.pack("<i", -9), struct.pack("<i", 3), 2),
+            chunk("big", 2, struct.pack("<q", 5), struct.pack("<q", 99), 0),
+            chunk("name", 6, b"banana", b"zucchini", 0),
+            chunk("ts", 2, ts("2024-01-10T00:00:00"), ts("2024-01-31T23:59:59"), 0),
+        ])), (2, I64, 400), (3, I64, 15)],
+    ]
+    fields = [(1, I32, 1), (2, LIST, (STRUCT, schema)), (3, I64, 25), (4, LIST, (STRUCT, row_groups)), (6, BINARY, created_by)]
+    return encode_struct(fields + list(extra_fields))
+
+
+def write_parquet(path, footer):
+    path.write_bytes(b"PAR1" + b"\0" * 32 + footer + struct.pack("<I", len(footer)) + b"PAR1")
+    return path
+
+
+def test_schema_and_converted_types():
+    meta = parse_footer(footer_bytes())
+    assert meta["num_rows"] == 25
+    assert meta["num_row_groups"] == 2
+    assert meta["created_by"] == "dgap-test"
+    by_name = {e["name"]: e for e in meta["schema"]}
+    assert by_name["schema"]["num_children"] == 4
+    assert by_name["small"]["type"] == "INT32" and by_name["small"]["converted_type"] == "INT_16"
+    assert by_name["big"]["type"] == "INT64" and by_name["big"]["converted_type"] == "INT_64"
+    assert by_name["name"]["converted_type"] == "UTF8"
+    assert by_name["ts"]["logical_type"] == "TIMESTAMP(MICROS)"
+    assert meta["schema_fingerprint"] == schema_fingerprint(meta["schema"])
+
+
+def test_column_stats_aggregate_across_row_groups():
+    cols = parse_footer(footer_bytes())["columns"]
+    assert (cols["small"]["min"], cols["small"]["max"], cols["small"]["null_count"]) == (-9, 7, 3)
+    assert (cols["big"]["min"], cols["big"]["max"]) == (5, 2 ** 40)
+    assert cols["name"]["logical_type"] == "STRING"
+    assert (cols["name"]["min"], cols["name"]["max"]) == ("apple", "zucchini")
+    assert cols["ts"]["min"] == datetime(2024, 1, 1)
+    assert cols["ts"]["max"] == datetime(2024, 1, 31, 23, 59, 59)
+
+
+def test_unknown_fields_and_long_list_headers_are_skipped():
+    extra = [(40, LIST, (I32, list(range(20)))), (41, STRUCT, [(1, BINARY, "x")])]
+    meta = parse_footer(footer_bytes(extra_fields=extra))
+    assert meta["schema_fingerprint"] == parse_footer(footer_bytes())["schema_fingerprint"]
+
+
+def test_read_footer_small_and_beyond_tail_read(tmp_path):
+    assert read_footer(write_parquet(tmp_path / "a.parquet", footer_bytes()))["num_rows"] == 25
+    big = footer_bytes(created_by="x" * (TAIL_READ_SIZE + 100))
+    assert read_footer(write_parquet(tmp_path / "b.parquet", big))["created_by"] == "x" * (TAIL_READ_SIZE + 100)
+
+
+def test_malformed_input_raises_footer_error(tmp_path):
+    good = footer_bytes()
+    (tmp_path / "magic.parquet").write_bytes(b"PAR1" + good + struct.pack("<I", len(good)) + b"NOPE")
+    (tmp_path / "short.parquet").write_bytes(b"PAR1")
+    (tmp_path / "length.parquet").write_bytes(b"PAR1" + good + struct.pack("<I", 10 ** 6) + b"PAR1")
+    for name in ("magic", "short", "length"):
+        with pytest.raises(FooterError):
+            read_footer(tmp_path / f"{name}.parquet")
+    with pytest.raises(FooterError):
+        parse_footer(good[: len(good) // 2])
+
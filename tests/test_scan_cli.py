@@ -0,0 +1,52 @@
+"""`dgap scan` and the month arguments report bad input with exit code 2, not a traceback."""
+import importlib.util
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from benchmarks import synthetic
+from dgap.api import Ingestor
+
+REPO = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    raw, db = tmp_path / "raw", tmp_path / "ledger.db"
+    synthetic.make_raw_root(raw, ["yellow_tripdata"], 2, 1024)
+    with Ingestor(raw, db, index_footers=False) as ingestor:
+        assert ingestor.ingest().ok
+    return raw, db
+
+
+def scan(ledger, *args):
+    raw, db = ledger
+    return subprocess.run(
+        [sys.executable, "-m", "dgap.main", "scan", "--raw-root", str(raw), "--db-path", str(db), "--dataset", "yellow_tripdata", *args],
+        cwd=REPO, capture_output=True, text=True,
+    )
+
+
+def test_files_in_range(ledger):
+    proc = scan(ledger, "--format", "files", "--from", "2015-02")
+    assert proc.returncode == 0
+    assert proc.stdout.splitlines() == ["source=tlc/dataset=yellow_tripdata/year=2015/month=02/yellow_tripdata_2015-02.parquet"]
+
+
+@pytest.mark.parametrize("command", ["fetch", "sync", "ingest", "scan"])
+@pytest.mark.parametrize("flag", ["--from", "--to"])
+@pytest.mark.parametrize("value, reason", [("2015", "expected YYYY-MM"), ("2015-13", "month must be 01-12")])
+def test_bad_month_is_a_usage_error(command, flag, value, reason):
+    proc = subprocess.run([sys.executable, "-m", "dgap.main", command, flag, value], cwd=REPO, capture_output=True, text=True)
+    assert proc.returncode == 2
+    assert proc.stderr.startswith("usage: ")
+    assert proc.stderr.splitlines()[-1].endswith(f"argument {flag}: invalid month '{value}', {reason}")
+
+
+@pytest.mark.skipif(importlib.util.find_spec("pyarrow") is not None, reason="pyarrow is installed")
+def test_csv_without_pyarrow(ledger):
+    proc = scan(ledger, "--format", "csv")
+    assert proc.returncode == 2
+    assert proc.stderr.startswith("scan failed: Reading record batches needs pyarrow")
@@ -0,0 +1,40 @@
+"""Read throttling and `--loop` pacing of `dgap verify`."""
+import time
+
+import pytest
+
+from benchmarks import synthetic
+from dgap.api import Ingestor
+from dgap.events import RecordingSink
+from dgap.idempotency import available_hash_backends, compute_checksum
+from dgap.verify import run_verify
+
+
+@pytest.mark.parametrize("backend", [b for b in available_hash_backends() if b != "file_digest"])
+@pytest.mark.parametrize("size", [0, 1000, 4096, 10_000])
+def test_throttle_is_charged_bytes_actually_read(tmp_path, backend, size):
+    path = tmp_path / "f.bin"
+    path.write_bytes(b"x" * size)
+    charged = []
+    _, bytes_hashed, _ = compute_checksum(path, throttle=charged.append, backend=backend, chunk_size=4096)
+    assert bytes_hashed == size
+    assert sum(charged) == size
+    assert len(charged) == -(-size // 4096)
+
+
+def test_loop_waits_for_interval_between_passes(tmp_path):
+    raw, db = tmp_path / "raw", tmp_path / "ledger.db"
+    synthetic.make_raw_root(raw, ["yellow_tripdata"], 2, 1024)
+    with Ingestor(raw, db) as ingestor:
+        assert ingestor.ingest().ok
+        sink = RecordingSink()
+        started = time.monotonic()
+        found = run_verify(ingestor.conn, raw, sink, loop=True, loop_interval=0.4, max_seconds=1.0)
+        elapsed = time.monotonic() - started
+        passes = ingestor.conn.execute("SELECT passes_completed FROM verify_cursors").fetchone()[0]
+
+    assert found == 0
+    # Passes start at 0, 0.4 and 0.8s; the idle time after the last one is cut to the budget
+    assert passes == 3
+    assert 0.9 <= elapsed < 2
+    assert [r["event"] for r in sink.records].count("idle") == 3